@@ -80,6 +80,15 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # WAL: las lecturas no se bloquean mientras una importación en
+            # segundo plano escribe (ver app1/trabajos.py). IMMEDIATE toma el
+            # bloqueo de escritura al abrir la transacción, así una escritura
+            # concurrente espera `timeout` en vez de fallar al instante.
+            'init_command': 'PRAGMA journal_mode=WAL;',
+            'transaction_mode': 'IMMEDIATE',
+            'timeout': 20,
+        },
     }
 }
 
@@ -146,6 +155,46 @@ DATA_UPLOAD_MAX_MEMORY_SIZE = 10485760
 # Tipos de archivo permitidos
 ALLOWED_FILE_TYPES = ['pdf', 'doc', 'docx']
 
+# Quién envía los bytes de los documentos (ver app1/descargas.py). Django
+# busca el documento y valida ETag / Last-Modified; después:
+# - 'python': FileResponse (con gunicorn o uWSGI sale por sendfile)
+# - 'nginx': X-Accel-Redirect hacia MEDIA_INTERNA_URL, que en nginx es
+#       location /media-interna/ { internal; alias /ruta/a/media/; }
+# - 'apache': X-Sendfile con la ruta absoluta (mod_xsendfile, con
+#   XSendFilePath apuntando a MEDIA_ROOT)
+# Lo que está fuera de MEDIA_ROOT (PDF_PEDIDOS_DIR) sale siempre por FileResponse.
+MEDIA_SERVIDOR = 'python'
+MEDIA_INTERNA_URL = '/media-interna/'
+
+# PDF de pedidos de compra generados en el servidor (caché por versión,
+# ver app1/pdf_pedidos.py). Se puede borrar: se regeneran a pedido. Va fuera
+# de MEDIA_ROOT para que el servidor web que publique /media/ no la exponga.
+PDF_PEDIDOS_DIR = os.path.join(BASE_DIR, 'cache', 'pedidos')
+
+# Procesos que generan los PDF con reportlab (0 = en el mismo proceso del
+# request) y segundos máximos de espera por PDF
+PDF_WORKERS = 2
+PDF_TIMEOUT = 120
+
+# ========================================
+# INVENTARIO
+# ========================================
+# Umbral de "Stock Bajo" cuando ni el producto ni su unidad definen stock_minimo
+STOCK_MINIMO_DEFECTO = 5
+
+# Días que tarda en llegar una reposición: un producto se marca para reponer
+# cuando su stock no cubre el consumo estimado de ese plazo
+DIAS_REPOSICION = 14
+
+# Hilos que ejecutan las importaciones de Excel en segundo plano. SQLite
+# admite un solo escritor a la vez, así que más de uno solo compite por el
+# bloqueo de la base de datos.
+IMPORTACION_WORKERS = 1
+
+# Segundos sin confirmar un bloque tras los que un trabajo "Procesando" se
+# da por abandonado (su worker murió) y se puede reanudar
+IMPORTACION_ABANDONO = 15 * 60
+
 # ========================================
 # CONFIGURACIÓN PARA VISUALIZACIÓN DE DOCUMENTOS
 # ========================================
@@ -160,7 +209,7 @@ SECURE_CONTENT_TYPE_NOSNIFF = True
 # ========================================
 # Cuando pases a producción, considera:
 # - Cambiar DEBUG = False
-# - Usar un servidor web como Nginx para servir archivos media
+# - Usar un servidor web como Nginx para servir archivos media (MEDIA_SERVIDOR = 'nginx')
 # - Configurar CORS correctamente si necesitas acceso desde otros dominios
 # - Usar HTTPS para mayor seguridad
 # - Configurar X_FRAME_OPTIONS de manera más restrictiva si es necesario
\ No newline at end of file
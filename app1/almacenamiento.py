@@ -0,0 +1,181 @@
+"""
+Almacenamiento por contenido de los documentos subidos (documento de la
+cotización, archivo y documento de entrega del pedido).
+
+Cada contenido se guarda una sola vez, con su SHA-256 como nombre, en
+MEDIA_ROOT/contenido/ab/cd/<sha256>: dos niveles de 256 carpetas, así
+ningún directorio crece sin límite. En el FileField queda
+`contenido/ab/cd/<sha256>/<nombre original>`; `path()` resuelve el archivo
+por el hash y el nombre original es con el que se descarga (ver
+descargas.py y zip_pedidos.py).
+
+ContenidoArchivo cuenta cuántos campos apuntan a cada contenido. Subir un
+archivo repetido solo suma una referencia, sin escribir en disco, y
+`delete()` resta una y borra el archivo cuando llega a cero. Las señales
+liberan la referencia al borrar o reemplazar un documento.
+
+Los nombres anteriores (cotizaciones/..., pedidos_compra/...) se siguen
+resolviendo como en FileSystemStorage; el comando deduplicar_documentos
+los pasa a este esquema y recuenta las referencias.
+
+Si la transacción de una subida se revierte, el archivo ya escrito queda
+sin su fila de ContenidoArchivo; `recontar` borra esos huérfanos.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from collections import Counter
+
+from django.apps import apps
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from django.db.models import F
+
+PREFIJO = 'contenido'
+
+# max_length de los FileField que usan este almacenamiento
+LONGITUD_NOMBRE = 255
+
+# Un archivo sin fila más nuevo que esto (segundos) puede ser de una subida
+# cuya transacción aún no terminó: no se trata como huérfano
+ANTIGUEDAD_HUERFANOS = 60 * 60
+
+_HASH = re.compile(r'[0-9a-f]{64}')
+_NOMBRE = re.compile(rf'{PREFIJO}/[0-9a-f]{{2}}/[0-9a-f]{{2}}/([0-9a-f]{{64}})/')
+
+
+def sha256_de(nombre):
+    """SHA-256 de un nombre de este almacenamiento, o None si es un nombre anterior"""
+    coincidencia = _NOMBRE.match(nombre or '')
+    return coincidencia.group(1) if coincidencia else None
+
+
+def directorio(sha256):
+    return f'{PREFIJO}/{sha256[:2]}/{sha256[2:4]}/{sha256}'
+
+
+def nombre_para(sha256, nombre_original):
+    """Nombre del FileField: el hash y el nombre original (recortado si no cabe)"""
+    prefijo = directorio(sha256) + '/'
+    base, extension = os.path.splitext(os.path.basename(nombre_original))
+    return prefijo + base[:LONGITUD_NOMBRE - len(prefijo) - len(extension)] + extension
+
+
+def hash_contenido(contenido):
+    """(SHA-256, tamaño) del archivo, leído por bloques"""
+    sha = hashlib.sha256()
+    tamano = 0
+    for bloque in contenido.chunks():
+        sha.update(bloque)
+        tamano += len(bloque)
+    return sha.hexdigest(), tamano
+
+
+class AlmacenamientoContenido(FileSystemStorage):
+    """FileSystemStorage que guarda cada contenido una vez, por su SHA-256"""
+
+    def path(self, name):
+        sha256 = sha256_de(name)
+        return super().path(directorio(sha256) if sha256 else name)
+
+    def get_available_name(self, name, max_length=None):
+        # El nombre definitivo sale del hash en _save; nunca choca con otro
+        return name
+
+    def _save(self, name, content):
+        sha256, tamano = hash_contenido(content)
+        ContenidoArchivo = apps.get_model('app1', 'ContenidoArchivo')
+        with transaction.atomic():
+            existente = ContenidoArchivo.objects.filter(pk=sha256).update(referencias=F('referencias') + 1)
+            if not existente:
+                ContenidoArchivo.objects.create(sha256=sha256, tamano=tamano, referencias=1)
+            ruta = self.path(directorio(sha256))
+            if not os.path.exists(ruta):
+                self._escribir(content, ruta)
+        return nombre_para(sha256, name)
+
+    def _escribir(self, content, ruta):
+        # Temporal en la misma carpeta + os.replace: nadie ve el archivo a medias
+        carpeta = os.path.dirname(ruta)
+        os.makedirs(carpeta, exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=carpeta, suffix='.tmp')
+        try:
+            with os.fdopen(descriptor, 'wb') as destino:
+                for bloque in content.chunks():
+                    destino.write(bloque)
+            if self.file_permissions_mode is not None:
+                os.chmod(temporal, self.file_permissions_mode)
+            os.replace(temporal, ruta)
+        except BaseException:
+            os.unlink(temporal)
+            raise
+
+    def delete(self, name):
+        """Resta una referencia; el archivo se borra cuando ya nadie lo usa"""
+        sha256 = sha256_de(name)
+        if sha256 is None:
+            return super().delete(name)
+        ContenidoArchivo = apps.get_model('app1', 'ContenidoArchivo')
+        with transaction.atomic():
+            ContenidoArchivo.objects.filter(pk=sha256, referencias__gt=0).update(referencias=F('referencias') - 1)
+            borrados, _ = ContenidoArchivo.objects.filter(pk=sha256, referencias=0).delete()
+            if borrados:
+                super().delete(directorio(sha256))
+
+
+documentos = AlmacenamientoContenido()
+
+
+def recontar(nombres):
+    """
+    Ajusta ContenidoArchivo a los nombres de FileField en uso: corrige los
+    conteos, borra los contenidos que nadie usa (con su archivo), da de
+    alta los que faltan y borra los archivos que quedaron sin fila (ver
+    _huerfanos). Devuelve (corregidos, borrados, sin archivo).
+    """
+    ContenidoArchivo = apps.get_model('app1', 'ContenidoArchivo')
+    usados = Counter(sha256 for sha256 in map(sha256_de, nombres) if sha256)
+    corregidos = borrados = 0
+    sin_archivo = []
+
+    for sha256, referencias in list(ContenidoArchivo.objects.values_list('sha256', 'referencias')):
+        en_uso = usados.pop(sha256, 0)
+        if not en_uso:
+            ContenidoArchivo.objects.filter(pk=sha256).delete()
+            # Sin nombre original es la ruta física: se borra sin tocar conteos
+            documentos.delete(directorio(sha256))
+            borrados += 1
+        elif en_uso != referencias:
+            ContenidoArchivo.objects.filter(pk=sha256).update(referencias=en_uso)
+            corregidos += 1
+
+    for sha256, en_uso in usados.items():
+        ruta = documentos.path(directorio(sha256))
+        if os.path.exists(ruta):
+            ContenidoArchivo.objects.create(sha256=sha256, tamano=os.path.getsize(ruta), referencias=en_uso)
+            corregidos += 1
+        else:
+            sin_archivo.append(sha256)
+
+    conocidos = set(ContenidoArchivo.objects.values_list('sha256', flat=True))
+    for ruta in _huerfanos(conocidos):
+        os.remove(ruta)
+        borrados += 1
+    return corregidos, borrados, sin_archivo
+
+
+def _huerfanos(conocidos):
+    """
+    Rutas bajo contenido/ sin fila en ContenidoArchivo (su subida se
+    revirtió) y temporales de escrituras interrumpidas, con más de
+    ANTIGUEDAD_HUERFANOS segundos.
+    """
+    limite = time.time() - ANTIGUEDAD_HUERFANOS
+    for carpeta, _, archivos in os.walk(documentos.path(PREFIJO)):
+        for nombre in archivos:
+            if (_HASH.fullmatch(nombre) and nombre not in conocidos) or nombre.endswith('.tmp'):
+                ruta = os.path.join(carpeta, nombre)
+                if os.path.getmtime(ruta) < limite:
+                    yield ruta
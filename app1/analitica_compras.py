@@ -0,0 +1,235 @@
+"""
+Analítica de compras: gasto por proveedor, gasto por almacén e historial de
+precios por producto.
+
+Los reportes leen tablas de resumen por mes (GastoProveedorMes,
+GastoAlmacenMes y PrecioProductoMes), así el panel cuesta lo mismo con
+cien pedidos que con cien mil: depende de los meses y proveedores del
+periodo, no del historial.
+
+Los meses se cuentan por la fecha de creación del pedido (hora local). Las
+señales marcan en MesCompraPendiente el mes de cada pedido, item o
+cotización que cambia, y `actualizar()` recalcula solo esos meses con
+consultas GROUP BY, reemplazando sus filas en la misma transacción. Cambiar
+el almacén de un producto no marca nada: `actualizar(completo=True)` (o el
+comando actualizar_analitica_compras --completo) reconstruye todo.
+"""
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, DateField, DecimalField, F, Max, Min, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import (
+    Cotizacion, GastoAlmacenMes, GastoProveedorMes, ItemPedido, MesCompraPendiente, PedidoCompra,
+    PrecioProductoMes, ProductoAlmacen,
+)
+
+TAMANO_LOTE = 500
+MESES_POR_DEFECTO = 12
+
+_CENTIMOS = Decimal('0.01')
+
+
+def mes_de(fecha):
+    """Primer día del mes (hora local) de un datetime"""
+    return timezone.localtime(fecha).date().replace(day=1)
+
+
+def _mes_siguiente(mes):
+    return (mes + timedelta(days=32)).replace(day=1)
+
+
+def _dinero(valor):
+    return Decimal(valor or 0).quantize(_CENTIMOS)
+
+
+# ==============================================================================
+# MESES PENDIENTES
+# ==============================================================================
+
+def marcar(*fechas):
+    """Marca para recalcular los meses de las fechas de creación indicadas"""
+    meses = {mes_de(fecha) for fecha in fechas if fecha}
+    MesCompraPendiente.objects.bulk_create(
+        [MesCompraPendiente(mes=mes) for mes in meses], ignore_conflicts=True
+    )
+
+
+def marcar_pedido(id_pedido):
+    """Marca el mes del pedido (si todavía existe)"""
+    marcar(PedidoCompra.objects.filter(pk=id_pedido).values_list('fecha_creacion', flat=True).first())
+
+
+# ==============================================================================
+# RECÁLCULO
+# ==============================================================================
+
+def _rangos(campo, meses):
+    """Q con los rangos [inicio, fin) en hora local de los meses"""
+    filtro = Q()
+    for mes in meses:
+        inicio = timezone.make_aware(datetime(mes.year, mes.month, 1))
+        fin = timezone.make_aware(datetime.combine(_mes_siguiente(mes), datetime.min.time()))
+        filtro |= Q(**{f'{campo}__gte': inicio, f'{campo}__lt': fin})
+    return filtro
+
+
+def _mes():
+    return TruncMonth('pedido__fecha_creacion', output_field=DateField())
+
+
+def _monto_items():
+    return Sum(F('cantidad_solicitada') * F('precio_unitario'), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def _gasto_proveedor(filtro, ahora):
+    # Mismo criterio que PedidoCompra.cotizacion_seleccionada(): la SELEC más reciente del pedido
+    seleccionada = Cotizacion.objects.filter(
+        pedido=OuterRef('pedido'), estado='SELEC'
+    ).order_by('-fecha_creacion').values('id_cotizacion')[:1]
+    filas = Cotizacion.objects.filter(filtro, id_cotizacion=Subquery(seleccionada)).annotate(
+        mes=_mes()
+    ).values('mes', 'proveedor').annotate(
+        n_pedidos=Count('pedido', distinct=True), total=Sum('monto'),
+    ).order_by()
+    return [
+        GastoProveedorMes(
+            mes=fila['mes'], proveedor=fila['proveedor'], pedidos=fila['n_pedidos'],
+            monto=_dinero(fila['total']), fecha_calculo=ahora,
+        )
+        for fila in filas
+    ]
+
+
+def _gasto_almacen(filtro, ahora):
+    filas = ItemPedido.objects.filter(filtro).annotate(mes=_mes()).values(
+        'mes', 'producto__ubicacion_almacen'
+    ).annotate(
+        n_items=Count('pk'), total_cantidad=Sum('cantidad_solicitada'), total=_monto_items(),
+    ).order_by()
+    return [
+        GastoAlmacenMes(
+            mes=fila['mes'], ubicacion_almacen=fila['producto__ubicacion_almacen'], items=fila['n_items'],
+            cantidad=fila['total_cantidad'], monto=_dinero(fila['total']), fecha_calculo=ahora,
+        )
+        for fila in filas
+    ]
+
+
+def _precios_producto(filtro, ahora):
+    filas = ItemPedido.objects.filter(filtro).annotate(mes=_mes()).values('mes', 'producto_id').annotate(
+        n_pedidos=Count('pedido', distinct=True),
+        total_cantidad=Sum('cantidad_solicitada'),
+        total=_monto_items(),
+        minimo=Min('precio_unitario'),
+        maximo=Max('precio_unitario'),
+    ).order_by()
+    return [
+        PrecioProductoMes(
+            producto_id=fila['producto_id'], mes=fila['mes'], pedidos=fila['n_pedidos'],
+            cantidad=fila['total_cantidad'], monto=_dinero(fila['total']),
+            precio_min=_dinero(fila['minimo']), precio_max=_dinero(fila['maximo']), fecha_calculo=ahora,
+        )
+        for fila in filas
+    ]
+
+
+def actualizar(completo=False):
+    """
+    Recalcula los resúmenes de los meses pendientes (o de todos con
+    `completo`). Devuelve cuántos meses se recalcularon; sin meses
+    pendientes cuesta una consulta.
+    """
+    if not completo and not MesCompraPendiente.objects.exists():
+        return 0
+    ahora = timezone.now()
+    modelos = (GastoProveedorMes, GastoAlmacenMes, PrecioProductoMes)
+
+    with transaction.atomic():
+        if completo:
+            meses = set(
+                PedidoCompra.objects.annotate(mes=TruncMonth('fecha_creacion', output_field=DateField()))
+                .values_list('mes', flat=True).distinct().order_by()
+            )
+            for modelo in modelos:
+                modelo.objects.all().delete()
+            filtro = Q()
+        else:
+            meses = set(MesCompraPendiente.objects.values_list('mes', flat=True))
+            for modelo in modelos:
+                modelo.objects.filter(mes__in=meses).delete()
+            filtro = _rangos('pedido__fecha_creacion', meses)
+
+        if meses:
+            GastoProveedorMes.objects.bulk_create(_gasto_proveedor(filtro, ahora), batch_size=TAMANO_LOTE)
+            GastoAlmacenMes.objects.bulk_create(_gasto_almacen(filtro, ahora), batch_size=TAMANO_LOTE)
+            PrecioProductoMes.objects.bulk_create(_precios_producto(filtro, ahora), batch_size=TAMANO_LOTE)
+
+        pendientes = MesCompraPendiente.objects.all()
+        if not completo:
+            pendientes = pendientes.filter(mes__in=meses)
+        pendientes.delete()
+
+    return len(meses)
+
+
+# ==============================================================================
+# REPORTES (solo leen los resúmenes)
+# ==============================================================================
+
+def periodo(desde=None, hasta=None):
+    """(primer mes, último mes) del periodo; por defecto los últimos 12 meses"""
+    hasta = (hasta or timezone.localdate()).replace(day=1)
+    if desde:
+        desde = desde.replace(day=1)
+    else:
+        desde = hasta
+        for _ in range(MESES_POR_DEFECTO - 1):
+            desde = (desde - timedelta(days=1)).replace(day=1)
+    return desde, hasta
+
+
+def gasto_por_proveedor(desde, hasta, limite=20):
+    """Proveedores con más gasto seleccionado en el periodo"""
+    return list(
+        GastoProveedorMes.objects.filter(mes__range=(desde, hasta)).values('proveedor').annotate(
+            total_pedidos=Sum('pedidos'), total=Sum('monto'),
+        ).order_by('-total', 'proveedor')[:limite]
+    )
+
+
+def gasto_por_almacen(desde, hasta):
+    """
+    Una fila por mes con el monto de cada almacén y el total:
+    [{'mes': date, 'almacenes': [monto AG, monto AD, monto IU], 'total': ...}]
+    """
+    ubicaciones = [codigo for codigo, _ in ProductoAlmacen.UBICACION_CHOICES]
+    meses = {}
+    for gasto in GastoAlmacenMes.objects.filter(mes__range=(desde, hasta)):
+        meses.setdefault(gasto.mes, {})[gasto.ubicacion_almacen] = gasto.monto
+    filas = []
+    for mes in sorted(meses):
+        montos = [meses[mes].get(codigo, Decimal('0.00')) for codigo in ubicaciones]
+        filas.append({'mes': mes, 'almacenes': montos, 'total': sum(montos, Decimal('0.00'))})
+    return filas
+
+
+def historial_precios(producto, desde=None, hasta=None):
+    """Precios de un producto por mes, del más antiguo al más reciente"""
+    precios = PrecioProductoMes.objects.filter(producto=producto)
+    if desde:
+        precios = precios.filter(mes__gte=desde)
+    if hasta:
+        precios = precios.filter(mes__lte=hasta)
+    return list(precios.order_by('mes'))
+
+
+def parse_mes(valor):
+    """'AAAA-MM' (input type=month) a date del día 1, o None"""
+    try:
+        return date.fromisoformat(f'{valor}-01') if valor else None
+    except ValueError:
+        return None
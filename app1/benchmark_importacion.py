@@ -0,0 +1,313 @@
+"""
+Benchmark de las importaciones de Excel con libros sintéticos.
+
+Genera catálogos de productos (mezcla de códigos nuevos y existentes, con
+unidades de medida que todavía no existen y algunas filas inválidas) y
+reportes de matrícula con el formato de importar_excel_alumnos (datos desde
+la fila 6). Cada escenario se importa en una copia nueva de una base SQLite
+temporal ya migrada, por el mismo camino que usa el trabajo en segundo
+plano (lector_excel + importacion, confirmando por bloque), y se mide:
+
+- tiempo de pared
+- número de consultas SQL
+- pico de memoria de Python (tracemalloc), en una segunda pasada para no
+  inflar el tiempo medido
+
+La base real no se toca. El resultado es un dict serializable a JSON para
+comparar entre commits (ver el comando benchmark_importacion).
+"""
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import django
+import openpyxl
+from django.conf import settings
+from django.db import connection
+
+from . import importacion, lector_excel
+from .models import ProductoAlmacen, Unidad, Salon, UtilEscolar
+
+FILAS_PRODUCTOS = (1000, 10000, 100000)
+FILAS_ALUMNOS = (1000, 10000)
+
+# Fracción de códigos del catálogo que ya existen antes de importar
+PROPORCION_EXISTENTES = 0.3
+# Fracción de filas con un error de validación
+PROPORCION_INVALIDAS = 0.01
+# Unidades que ya existen / que la importación tendrá que crear
+UNIDADES_EXISTENTES = ['Unidad', 'Caja', 'Paquete', 'Docena', 'Millar']
+UNIDADES_NUEVAS = ['Rollo', 'Galón', 'Resma', 'Bolsa', 'Juego']
+
+# Matrícula: fracción de filas de otra aula y de DNIs repetidos
+PROPORCION_OTRA_AULA = 0.1
+PROPORCION_DNI_REPETIDO = 0.02
+AULA = '1A'
+UTILES_POR_SALON = 5
+
+
+# ==============================================================================
+# LIBROS SINTÉTICOS
+# ==============================================================================
+
+def codigo_sintetico(i):
+    return f'BM-{i:06d}'
+
+
+def generar_catalogo(destino, filas, semilla=0):
+    """Catálogo de `filas` productos; los primeros códigos son los que se precargan"""
+    aleatorio = random.Random(semilla)
+    unidades = UNIDADES_EXISTENTES + UNIDADES_NUEVAS
+    codigos_almacen = list(importacion.CODIGO_A_UBICACION)
+
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Productos')
+    hoja.append(importacion.COLUMNAS_REQUERIDAS + ['stock_minimo', 'estante', 'descripcion', 'observaciones'])
+    for i in range(filas):
+        cantidad = aleatorio.randint(0, 500)
+        if aleatorio.random() < PROPORCION_INVALIDAS:
+            cantidad = 'no es número'
+        hoja.append([
+            aleatorio.choice(codigos_almacen),
+            codigo_sintetico(i),
+            f'Producto sintético {i}',
+            cantidad,
+            aleatorio.choice(unidades),
+            aleatorio.choice([None, 5, 10, 20]),
+            f'E-{aleatorio.randint(1, 40)}',
+            'Generado para el benchmark',
+            None,
+        ])
+    libro.save(destino)
+
+
+def generar_matricula(destino, filas, semilla=0):
+    """Reporte de matrícula: cabecera libre y alumnos desde la fila 6"""
+    aleatorio = random.Random(semilla)
+    ancho = importacion.COL_SEXO + 1
+
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Matrícula')
+    hoja.append(['Reporte de matrícula (benchmark)'])
+    for _ in range(importacion.FILA_INICIO_ALUMNOS - 2):
+        hoja.append([])
+    for i in range(filas):
+        fila = [None] * ancho
+        fila[importacion.COL_AULA] = AULA if aleatorio.random() >= PROPORCION_OTRA_AULA else '2B'
+        fila[importacion.COL_NOMBRE] = f'Alumno Sintético {i}'
+        dni = i - 1 if i and aleatorio.random() < PROPORCION_DNI_REPETIDO else i
+        fila[importacion.COL_DNI] = f'{70000000 + dni}'
+        fila[importacion.COL_SEXO] = aleatorio.choice('MF')
+        hoja.append(fila)
+    libro.save(destino)
+
+
+# ==============================================================================
+# BASE TEMPORAL
+# ==============================================================================
+
+@contextmanager
+def base_temporal(directorio):
+    """
+    Crea y migra una base SQLite en `directorio` y la deja como plantilla.
+    Devuelve una función que apunta la conexión a una copia nueva de ella.
+    """
+    plantilla = os.path.join(directorio, 'plantilla.sqlite3')
+    connection.settings_dict.setdefault('TEST', {})['NAME'] = plantilla
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+    connection.close()
+    copias = []
+
+    def nueva_copia():
+        connection.close()
+        copia = os.path.join(directorio, f'escenario_{len(copias)}.sqlite3')
+        shutil.copyfile(plantilla, copia)
+        copias.append(copia)
+        connection.settings_dict['NAME'] = copia
+        return copia
+
+    try:
+        yield nueva_copia
+    finally:
+        connection.close()
+        connection.settings_dict['NAME'] = plantilla
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+
+
+def _precargar_productos(filas):
+    unidades = Unidad.objects.bulk_create([
+        Unidad(nombre=nombre, abreviatura=nombre, activo=True) for nombre in UNIDADES_EXISTENTES
+    ])
+    ubicaciones = list(ProductoAlmacen.CODIGOS_ALMACEN)
+    existentes = int(filas * PROPORCION_EXISTENTES)
+    ProductoAlmacen.objects.bulk_create([
+        ProductoAlmacen(
+            codigo_producto=codigo_sintetico(i),
+            codigo_almacen=ProductoAlmacen.CODIGOS_ALMACEN[ubicaciones[i % 3]],
+            nombre=f'Producto sintético {i}',
+            ubicacion_almacen=ubicaciones[i % 3],
+            cantidad=10,
+            unidad=unidades[i % len(unidades)],
+        )
+        for i in range(existentes)
+    ], batch_size=importacion.TAMANO_LOTE)
+    return existentes
+
+
+def _precargar_salon():
+    salon = Salon.objects.create(nombre=AULA, codigo=AULA, grado=1, profesora='Benchmark')
+    UtilEscolar.objects.bulk_create([
+        UtilEscolar(salon=salon, nombre=f'Útil {i}', cantidad=i + 1, orden=i) for i in range(UTILES_POR_SALON)
+    ])
+    return salon
+
+
+# ==============================================================================
+# MEDICIÓN
+# ==============================================================================
+
+@contextmanager
+def contar_consultas():
+    """Cuenta las consultas sin guardar su SQL (no ensucia la medición de memoria)"""
+    contador = {'consultas': 0}
+
+    def envoltura(execute, sql, params, many, context):
+        contador['consultas'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(envoltura):
+        yield contador
+
+
+def _medir(importar, con_memoria):
+    if con_memoria:
+        tracemalloc.start()
+    try:
+        with contar_consultas() as contador:
+            inicio = time.perf_counter()
+            resultado = importar()
+            segundos = time.perf_counter() - inicio
+        pico = tracemalloc.get_traced_memory()[1] if con_memoria else None
+    finally:
+        if con_memoria:
+            tracemalloc.stop()
+    return resultado, segundos, contador['consultas'], pico
+
+
+def _importar_productos(ruta, _precargados):
+    with open(ruta, 'rb') as archivo:
+        bloques = lector_excel.leer_bloques(archivo, requeridas=importacion.COLUMNAS_REQUERIDAS)
+        return importacion.importar_productos(bloques, usuario='Benchmark', por_bloque=True)
+
+
+def _importar_alumnos(ruta, salon):
+    with open(ruta, 'rb') as archivo:
+        bloques = lector_excel.leer_bloques(archivo, fila_inicio=importacion.FILA_INICIO_ALUMNOS, encabezado=None)
+        return importacion.importar_alumnos(salon, bloques)
+
+
+def _escenario(nueva_copia, tipo, ruta, filas, con_memoria):
+    """Corre un escenario en una copia limpia por pasada y devuelve sus métricas"""
+    importar = _importar_productos if tipo == 'productos' else _importar_alumnos
+    datos = {'tipo': tipo, 'filas': filas, 'archivo_bytes': os.path.getsize(ruta)}
+
+    pasadas = [False, True] if con_memoria else [False]
+    for memoria in pasadas:
+        nueva_copia()
+        if tipo == 'productos':
+            precargado = datos['precargados'] = _precargar_productos(filas)
+        else:
+            precargado = _precargar_salon()
+        resultado, segundos, consultas, pico = _medir(lambda: importar(ruta, precargado), memoria)
+        if memoria:
+            datos['pico_memoria_bytes'] = pico
+        else:
+            datos['segundos'] = round(segundos, 4)
+            datos['filas_por_segundo'] = round(filas / segundos, 1) if segundos else None
+            datos['consultas'] = consultas
+            datos['resultado'] = _resumen(tipo, resultado)
+    return datos
+
+
+def _resumen(tipo, resultado):
+    if tipo == 'productos':
+        return {
+            'creados': resultado['creados'],
+            'actualizados': resultado['actualizados'],
+            'unidades_creadas': resultado['unidades_creadas'],
+            'errores': len(resultado['errores']),
+        }
+    return {campo: resultado[campo] for campo in ('creados', 'duplicados', 'ignorados')}
+
+
+def _commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(filas_productos=FILAS_PRODUCTOS, filas_alumnos=FILAS_ALUMNOS, con_memoria=True, al_terminar=None):
+    """
+    Corre todos los escenarios y devuelve el informe. `al_terminar(datos)`
+    se llama tras cada escenario (para ir mostrando avance).
+    """
+    informe = {
+        'commit': _commit_actual(),
+        'fecha': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'entorno': {
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'plataforma': platform.platform(),
+        },
+        'parametros': {
+            'tamano_bloque': lector_excel.TAMANO_BLOQUE,
+            'tamano_lote': importacion.TAMANO_LOTE,
+            'proporcion_existentes': PROPORCION_EXISTENTES,
+            'proporcion_invalidas': PROPORCION_INVALIDAS,
+            'utiles_por_salon': UTILES_POR_SALON,
+        },
+        'escenarios': [],
+    }
+
+    with tempfile.TemporaryDirectory(prefix='benchmark_importacion_') as directorio:
+        with base_temporal(directorio) as nueva_copia:
+            for tipo, tamanos, generar in (
+                ('productos', filas_productos, generar_catalogo),
+                ('alumnos', filas_alumnos, generar_matricula),
+            ):
+                for filas in tamanos:
+                    ruta = os.path.join(directorio, f'{tipo}_{filas}.xlsx')
+                    generar(ruta, filas)
+                    datos = _escenario(nueva_copia, tipo, ruta, filas, con_memoria)
+                    informe['escenarios'].append(datos)
+                    if al_terminar:
+                        al_terminar(datos)
+    return informe
+
+
+def comparar(anterior, actual):
+    """Cociente actual/anterior de tiempo, consultas y memoria por escenario"""
+    previos = {(e['tipo'], e['filas']): e for e in anterior.get('escenarios', [])}
+    comparacion = []
+    for escenario in actual['escenarios']:
+        previo = previos.get((escenario['tipo'], escenario['filas']))
+        if not previo:
+            continue
+        fila = {'tipo': escenario['tipo'], 'filas': escenario['filas']}
+        for metrica in ('segundos', 'consultas', 'pico_memoria_bytes'):
+            if escenario.get(metrica) is not None and previo.get(metrica):
+                fila[metrica] = round(escenario[metrica] / previo[metrica], 3)
+        comparacion.append(fila)
+    return comparacion
@@ -0,0 +1,139 @@
+"""
+Benchmark del servicio de PDF de pedidos (servicio_pdf).
+
+Genera pedidos sintéticos de distintos tamaños y los envía al servicio
+desde varios hilos a la vez, como lo harían varios requests concurrentes.
+Por tamaño mide PDFs por segundo, latencia p50/p95/máxima por PDF y el
+tamaño y número de páginas del documento. Se mide con el pool de procesos
+(PDF_WORKERS) y, para comparar, generando en el mismo proceso.
+
+No usa la base de datos. El resultado es un dict serializable a JSON (ver
+el comando benchmark_pdf).
+"""
+import os
+import platform
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from decimal import Decimal
+
+import reportlab
+from django.test.utils import override_settings
+
+from . import servicio_pdf
+
+TAMANOS = (10, 1000, 10000)
+# PDFs generados por tamaño (los grandes tardan segundos cada uno)
+PEDIDOS_POR_TAMANO = {10: 200, 1000: 20, 10000: 4}
+
+
+def pedido_sintetico(items):
+    """(info, productos) de un pedido de `items` líneas"""
+    info = [
+        ['Código:', 'PC-9999'],
+        ['Nombre del Pedido:', f'Pedido sintético de {items} líneas'],
+        ['Estado:', 'Pendiente'],
+        ['Descripción:', 'Generado para el benchmark'],
+    ]
+    productos = [
+        {
+            'codigo': f'BM-{i:06d}',
+            'nombre': f'Producto sintético {i}',
+            'cantidad': i % 12 + 1,
+            'unidad': 'und',
+            'precio': Decimal(i % 500) / 4,
+        }
+        for i in range(items)
+    ]
+    return info, productos
+
+
+def _percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(round(p / 100 * (len(ordenados) - 1))))]
+
+
+def medir(items, pedidos, concurrencia):
+    """Genera `pedidos` PDFs de `items` líneas con `concurrencia` hilos"""
+    info, productos = pedido_sintetico(items)
+    latencias = []
+    tamano = {}
+
+    def uno(_):
+        inicio = time.perf_counter()
+        contenido = servicio_pdf.generar(info, productos)
+        latencias.append(time.perf_counter() - inicio)
+        tamano['bytes'] = len(contenido)
+        tamano['paginas'] = contenido.count(b'/Type /Page\n')
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrencia) as hilos:
+        list(hilos.map(uno, range(pedidos)))
+    segundos = time.perf_counter() - inicio
+
+    return {
+        'items': items,
+        'pedidos': pedidos,
+        'segundos': round(segundos, 3),
+        'pdfs_por_segundo': round(pedidos / segundos, 2),
+        'latencia_p50': round(statistics.median(latencias), 4),
+        'latencia_p95': round(_percentil(latencias, 95), 4),
+        'latencia_max': round(max(latencias), 4),
+        'bytes': tamano['bytes'],
+        'paginas': tamano['paginas'],
+    }
+
+
+def ejecutar(tamanos=TAMANOS, workers=None, concurrencia=None, pedidos=None, al_terminar=None):
+    """
+    Corre el benchmark con el pool (`workers` procesos, por defecto
+    PDF_WORKERS) y en el mismo proceso. `concurrencia` son los hilos que
+    piden PDFs a la vez (por defecto, uno por proceso del pool).
+    """
+    from django.conf import settings
+    workers = workers or settings.PDF_WORKERS or os.cpu_count()
+    concurrencia = concurrencia or workers
+
+    informe = {
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'entorno': {
+            'python': platform.python_version(),
+            'reportlab': reportlab.Version,
+            'cpus': os.cpu_count(),
+            'plataforma': platform.platform(),
+        },
+        'parametros': {'workers': workers, 'concurrencia': concurrencia},
+        'escenarios': [],
+    }
+    for modo, procesos in (('pool', workers), ('en_proceso', 0)):
+        with override_settings(PDF_WORKERS=procesos):
+            try:
+                if procesos:
+                    # Arranque del pool fuera de la medición
+                    servicio_pdf.generar(*pedido_sintetico(1))
+                for items in tamanos:
+                    cantidad = pedidos or PEDIDOS_POR_TAMANO.get(items, 10)
+                    datos = {'modo': modo, **medir(items, cantidad, concurrencia)}
+                    informe['escenarios'].append(datos)
+                    if al_terminar:
+                        al_terminar(datos)
+            finally:
+                servicio_pdf.cerrar()
+    return informe
+
+
+def comparar(anterior, actual):
+    """Cociente actual/anterior de PDFs por segundo y latencia p95 por escenario"""
+    previos = {(e['modo'], e['items']): e for e in anterior.get('escenarios', [])}
+    comparacion = []
+    for escenario in actual['escenarios']:
+        previo = previos.get((escenario['modo'], escenario['items']))
+        if not previo:
+            continue
+        fila = {'modo': escenario['modo'], 'items': escenario['items']}
+        for metrica in ('pdfs_por_segundo', 'latencia_p95'):
+            if previo.get(metrica):
+                fila[metrica] = round(escenario[metrica] / previo[metrica], 3)
+        comparacion.append(fila)
+    return comparacion
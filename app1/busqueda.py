@@ -0,0 +1,224 @@
+"""
+Búsqueda global con SQLite FTS5 sobre productos, alumnos, salones y pedidos.
+
+Todas las entidades comparten una tabla virtual `busqueda_fts`. El rowid de
+cada fila codifica el tipo y el id del objeto (id * 4 + tipo), así las
+altas, cambios y bajas incrementales se resuelven por rowid sin recorrer
+el índice. El tokenizador `unicode61 remove_diacritics 2` hace que
+"lapiz" encuentre "Lápiz".
+"""
+import re
+from urllib.parse import urlencode
+
+from django.db import connection
+from django.urls import reverse
+
+from .models import ProductoAlmacen, Alumno, Salon, PedidoCompra
+
+TABLA = 'busqueda_fts'
+
+# tipo -> código usado en el rowid
+TIPOS = {
+    'producto': 0,
+    'alumno': 1,
+    'salon': 2,
+    'pedido': 3,
+}
+MODELOS = {
+    'producto': ProductoAlmacen,
+    'alumno': Alumno,
+    'salon': Salon,
+    'pedido': PedidoCompra,
+}
+
+# Pesos bm25 para (titulo, codigo, contenido)
+PESOS = (10.0, 5.0, 1.0)
+
+RESULTADOS_POR_PAGINA = 20
+
+# Selects para reconstruir el índice completo en SQL (columnas: rowid, titulo, codigo, contenido)
+_SELECT_REINDEXAR = {
+    'producto': (
+        f"SELECT id_producto * 4 + {TIPOS['producto']}, nombre, codigo_producto, COALESCE(descripcion, '') "
+        f"FROM {ProductoAlmacen._meta.db_table}"
+    ),
+    'alumno': (
+        f"SELECT id * 4 + {TIPOS['alumno']}, nombre, dni, '' "
+        f"FROM {Alumno._meta.db_table}"
+    ),
+    'salon': (
+        f"SELECT id * 4 + {TIPOS['salon']}, nombre, codigo, profesora "
+        f"FROM {Salon._meta.db_table}"
+    ),
+    'pedido': (
+        f"SELECT id_pedido * 4 + {TIPOS['pedido']}, nombre, printf('PC-%04d', id_pedido), COALESCE(descripcion, '') "
+        f"FROM {PedidoCompra._meta.db_table}"
+    ),
+}
+
+
+def disponible():
+    """FTS5 solo existe en SQLite"""
+    return connection.vendor == 'sqlite'
+
+
+def _tipo_de_instancia(instancia):
+    for tipo, modelo in MODELOS.items():
+        if isinstance(instancia, modelo):
+            return tipo
+    raise ValueError(f'Modelo no indexado: {type(instancia).__name__}')
+
+
+def _rowid(tipo, pk):
+    return pk * 4 + TIPOS[tipo]
+
+
+def _columnas(tipo, instancia):
+    """(titulo, codigo, contenido) que se indexan para cada tipo"""
+    if tipo == 'producto':
+        return instancia.nombre, instancia.codigo_producto, instancia.descripcion or ''
+    if tipo == 'alumno':
+        return instancia.nombre, instancia.dni, ''
+    if tipo == 'salon':
+        return instancia.nombre, instancia.codigo, instancia.profesora
+    return instancia.nombre, f'PC-{instancia.id_pedido:04d}', instancia.descripcion or ''
+
+
+def indexar(instancias):
+    """Inserta o reemplaza en el índice una o varias instancias"""
+    if not disponible():
+        return
+    if not isinstance(instancias, (list, tuple)):
+        instancias = [instancias]
+
+    filas_borrar = []
+    filas_insertar = []
+    for instancia in instancias:
+        tipo = _tipo_de_instancia(instancia)
+        rowid = _rowid(tipo, instancia.pk)
+        filas_borrar.append((rowid,))
+        filas_insertar.append((rowid, *_columnas(tipo, instancia)))
+
+    with connection.cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {TABLA} WHERE rowid = %s', filas_borrar)
+        cursor.executemany(
+            f'INSERT INTO {TABLA} (rowid, titulo, codigo, contenido) VALUES (%s, %s, %s, %s)',
+            filas_insertar
+        )
+
+
+def desindexar(instancia):
+    """Quita una instancia del índice"""
+    if not disponible():
+        return
+    rowid = _rowid(_tipo_de_instancia(instancia), instancia.pk)
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA} WHERE rowid = %s', [rowid])
+
+
+def reconstruir_indice():
+    """Vacía y vuelve a llenar el índice con un INSERT ... SELECT por tipo"""
+    if not disponible():
+        return {}
+    totales = {}
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {TABLA}')
+        for tipo, select in _SELECT_REINDEXAR.items():
+            cursor.execute(f'INSERT INTO {TABLA} (rowid, titulo, codigo, contenido) {select}')
+            totales[tipo] = cursor.rowcount
+        cursor.execute(f"INSERT INTO {TABLA} ({TABLA}) VALUES ('optimize')")
+    return totales
+
+
+def _consulta_fts(texto):
+    """
+    Convierte el texto del usuario en una consulta FTS5 segura: cada palabra
+    se busca como prefijo y todas deben aparecer.
+    """
+    palabras = re.findall(r'\w+', texto)
+    return ' '.join(f'"{palabra}"*' for palabra in palabras)
+
+
+def buscar(texto, tipo=None, pagina=1, por_pagina=RESULTADOS_POR_PAGINA):
+    """
+    Devuelve una página de resultados ordenados por relevancia (bm25) y si
+    hay página siguiente.
+    """
+    consulta = _consulta_fts(texto)
+    if not consulta or not disponible():
+        return [], False
+
+    sql = f'SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s'
+    parametros = [consulta]
+    if tipo in TIPOS:
+        sql += ' AND rowid %% 4 = %s'
+        parametros.append(TIPOS[tipo])
+    sql += f' ORDER BY bm25({TABLA}, %s, %s, %s) LIMIT %s OFFSET %s'
+    parametros += [*PESOS, por_pagina + 1, (pagina - 1) * por_pagina]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, parametros)
+        rowids = [fila[0] for fila in cursor.fetchall()]
+
+    hay_siguiente = len(rowids) > por_pagina
+    rowids = rowids[:por_pagina]
+
+    # Hidratar con una consulta por tipo presente en la página
+    codigo_a_tipo = {codigo: nombre for nombre, codigo in TIPOS.items()}
+    ids_por_tipo = {}
+    for rowid in rowids:
+        ids_por_tipo.setdefault(codigo_a_tipo[rowid % 4], []).append(rowid // 4)
+    objetos = {}
+    for nombre, ids in ids_por_tipo.items():
+        queryset = MODELOS[nombre].objects.all()
+        if nombre == 'alumno':
+            queryset = queryset.select_related('salon')
+        objetos[nombre] = queryset.in_bulk(ids)
+
+    resultados = []
+    for rowid in rowids:
+        nombre = codigo_a_tipo[rowid % 4]
+        instancia = objetos[nombre].get(rowid // 4)
+        if instancia is not None:
+            resultados.append(_serializar(nombre, instancia))
+    return resultados, hay_siguiente
+
+
+def _serializar(tipo, instancia):
+    if tipo == 'producto':
+        rutas = {'AG': 'InventarioAG', 'IU': 'inventario_utiles'}
+        ruta = rutas.get(instancia.ubicacion_almacen)
+        return {
+            'tipo': tipo,
+            'id': instancia.pk,
+            'titulo': instancia.nombre,
+            'codigo': instancia.codigo_producto,
+            'detalle': instancia.get_ubicacion_almacen_display(),
+            'url': f"{reverse(ruta)}?{urlencode({'q': instancia.codigo_producto})}" if ruta else None,
+        }
+    if tipo == 'alumno':
+        return {
+            'tipo': tipo,
+            'id': instancia.pk,
+            'titulo': instancia.nombre,
+            'codigo': instancia.dni,
+            'detalle': instancia.salon.nombre,
+            'url': reverse('detalle_alumno', kwargs={'alumno_id': instancia.pk}),
+        }
+    if tipo == 'salon':
+        return {
+            'tipo': tipo,
+            'id': instancia.pk,
+            'titulo': instancia.nombre,
+            'codigo': instancia.codigo,
+            'detalle': instancia.profesora,
+            'url': reverse('detalle_salon', kwargs={'pk': instancia.pk}),
+        }
+    return {
+        'tipo': tipo,
+        'id': instancia.pk,
+        'titulo': instancia.nombre,
+        'codigo': f'PC-{instancia.id_pedido:04d}',
+        'detalle': instancia.get_estado_display(),
+        'url': reverse('DetallePedido', kwargs={'id_pedido': instancia.pk}),
+    }
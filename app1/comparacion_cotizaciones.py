@@ -0,0 +1,134 @@
+"""
+Comparación de cotizaciones de un pedido por item.
+
+Con los precios por item (PrecioCotizacion) se arma la matriz items x
+cotizaciones y se calcula:
+
+- la cotización completa más barata (la que cotiza todos los items)
+- la división más barata: cada item con el proveedor que lo cotiza más barato
+- el ahorro de la división frente a la mejor completa y frente a la
+  cotización seleccionada
+
+Las cotizaciones sin precios por item se comparan por su monto global como
+si cotizaran el pedido completo (no se pueden dividir).
+
+`comparar(pedido)` hace tres consultas (items, cotizaciones y precios) y
+`calcular()` recorre las filas de precios una sola vez acumulando el total
+y la cobertura de cada cotización y el mejor precio de cada item; lo demás
+es lineal en items + cotizaciones.
+"""
+from decimal import Decimal
+
+from .models import PrecioCotizacion
+
+_CERO = Decimal('0.00')
+
+
+def comparar(pedido):
+    """Comparación de las cotizaciones del pedido (ver calcular)"""
+    items = list(pedido.items.select_related('producto__unidad').order_by('id_item'))
+    cotizaciones = list(pedido.cotizaciones.order_by('id_cotizacion'))
+    precios = PrecioCotizacion.objects.filter(cotizacion__pedido=pedido).values_list(
+        'item_id', 'cotizacion_id', 'precio_unitario'
+    )
+    return calcular(items, cotizaciones, precios)
+
+
+def calcular(items, cotizaciones, precios):
+    """
+    `precios` son tuplas (item_id, cotizacion_id, precio_unitario). Devuelve
+    un dict con:
+
+    - items: por item, su precio en cada cotización (None si no lo cotiza,
+      en el orden de `cotizaciones`) y la mejor oferta
+    - cotizaciones: total, items cubiertos, si es completa y diferencia con
+      la mejor completa
+    - mejor_completa: la entrada de `cotizaciones` más barata entre las completas
+    - division: total, proveedores con sus subtotales e items sin precio
+    - ahorro_division / ahorro_seleccionada: None si no aplica
+    """
+    cantidades = {item.pk: item.cantidad_solicitada for item in items}
+    columnas = {cotizacion.pk: indice for indice, cotizacion in enumerate(cotizaciones)}
+    totales = [_CERO] * len(cotizaciones)
+    cubiertos = [0] * len(cotizaciones)
+    matriz = {item_id: [None] * len(cotizaciones) for item_id in cantidades}
+    mejores = {}
+
+    # Una pasada por la matriz
+    for item_id, cotizacion_id, precio in precios:
+        columna = columnas.get(cotizacion_id)
+        if columna is None or item_id not in cantidades:
+            continue
+        matriz[item_id][columna] = precio
+        totales[columna] += precio * cantidades[item_id]
+        cubiertos[columna] += 1
+        mejor = mejores.get(item_id)
+        if mejor is None or precio < mejor[0]:
+            mejores[item_id] = (precio, columna)
+
+    resumen_cotizaciones = []
+    for columna, cotizacion in enumerate(cotizaciones):
+        por_item = cubiertos[columna] > 0
+        resumen_cotizaciones.append({
+            'cotizacion': cotizacion,
+            'por_item': por_item,
+            'total': totales[columna] if por_item else cotizacion.monto,
+            'cubiertos': cubiertos[columna] if por_item else len(items),
+            'completa': not por_item or cubiertos[columna] == len(items),
+            'diferencia': None,
+        })
+
+    completas = [resumen for resumen in resumen_cotizaciones if resumen['completa']]
+    mejor_completa = min(completas, key=lambda resumen: resumen['total'], default=None)
+    if mejor_completa:
+        for resumen in completas:
+            resumen['diferencia'] = resumen['total'] - mejor_completa['total']
+
+    filas = []
+    proveedores = {}
+    sin_precio = []
+    total_division = _CERO
+    for item in items:
+        mejor = mejores.get(item.pk)
+        fila = {'item': item, 'precios': matriz[item.pk], 'mejor_precio': None, 'mejor_columna': None, 'subtotal': None}
+        if mejor is None:
+            sin_precio.append(item)
+        else:
+            precio, columna = mejor
+            subtotal = precio * item.cantidad_solicitada
+            fila.update(mejor_precio=precio, mejor_columna=columna, subtotal=subtotal)
+            total_division += subtotal
+            proveedor = proveedores.setdefault(columna, {'cotizacion': cotizaciones[columna], 'items': 0, 'subtotal': _CERO})
+            proveedor['items'] += 1
+            proveedor['subtotal'] += subtotal
+        filas.append(fila)
+
+    division = {
+        'total': total_division,
+        'completa': bool(items) and not sin_precio,
+        'sin_precio': sin_precio,
+        'proveedores': sorted(proveedores.values(), key=lambda proveedor: -proveedor['subtotal']),
+    }
+
+    ahorro_division = None
+    if mejor_completa and division['completa']:
+        ahorro_division = mejor_completa['total'] - total_division
+
+    ahorro_seleccionada = None
+    # Mismo criterio que PedidoCompra.cotizacion_seleccionada(): la SELEC más reciente
+    seleccionada = max(
+        (resumen for resumen in resumen_cotizaciones if resumen['cotizacion'].estado == 'SELEC'),
+        key=lambda resumen: resumen['cotizacion'].fecha_creacion,
+        default=None,
+    )
+    if seleccionada and seleccionada['completa'] and mejor_completa:
+        ahorro_seleccionada = seleccionada['total'] - mejor_completa['total']
+
+    return {
+        'items': filas,
+        'cotizaciones': resumen_cotizaciones,
+        'mejor_completa': mejor_completa,
+        'division': division,
+        'ahorro_division': ahorro_division,
+        'ahorro_seleccionada': ahorro_seleccionada,
+    }
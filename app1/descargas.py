@@ -0,0 +1,265 @@
+"""
+Entrega de los archivos subidos (documentos de cotización, archivo del
+pedido y documento de entrega) con peticiones condicionales y rangos.
+
+- ETag (tamaño y fecha de modificación del archivo, como nginx) y
+  Last-Modified: If-None-Match / If-Modified-Since responden 304 sin abrir
+  el archivo.
+- Range: un rango responde 206 con Content-Range; varios, 206
+  multipart/byteranges. Los rangos solapados se unen, un If-Range con un
+  validador viejo devuelve el archivo entero y un rango fuera del archivo
+  responde 416.
+
+Así los visores de PDF en iframe piden el documento por trozos y al
+reabrirlo solo lo revalidan, en vez de descargarlo entero cada vez.
+
+Django resuelve el documento y valida la petición; los bytes los envía el
+servidor indicado en settings.MEDIA_SERVIDOR (ver `entregar`):
+
+- 'python': FileResponse. Con gunicorn o uWSGI el wsgi.file_wrapper manda
+  el archivo (o el tramo de un rango) con sendfile, sin copiarlo por Python.
+- 'nginx': cabecera X-Accel-Redirect hacia MEDIA_INTERNA_URL, una location
+  `internal` con alias a MEDIA_ROOT. nginx atiende Range por su cuenta.
+- 'apache': cabecera X-Sendfile con la ruta absoluta (mod_xsendfile).
+"""
+import mimetypes
+import os
+import re
+import uuid
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, parse_http_date_safe
+
+TAMANO_CHUNK = 64 * 1024
+
+# Con más rangos que esto (tras unir los solapados) se envía el archivo entero
+MAX_RANGOS = 16
+
+TIPOS_CONTENIDO = {
+    'pdf': 'application/pdf',
+    'doc': 'application/msword',
+    'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+}
+
+_RANGO = re.compile(r'(\d*)-(\d*)')
+
+
+def _rangos(cabecera, tamano):
+    """
+    Rangos (inicio, fin) inclusivos pedidos en `Range`, ordenados y sin
+    solaparse. Devuelve None si la cabecera no es válida (se ignora) y []
+    si ningún rango cae dentro del archivo.
+    """
+    unidad, _, especificacion = cabecera.partition('=')
+    if unidad.strip().lower() != 'bytes':
+        return None
+    rangos = []
+    for parte in especificacion.split(','):
+        parte = parte.strip()
+        if not parte:
+            continue
+        coincidencia = _RANGO.fullmatch(parte)
+        if not coincidencia or parte == '-':
+            return None
+        inicio, fin = coincidencia.groups()
+        if not inicio:
+            # Sufijo: los últimos N bytes
+            if int(fin) > 0 and tamano:
+                rangos.append((max(0, tamano - int(fin)), tamano - 1))
+        else:
+            inicio = int(inicio)
+            if fin and int(fin) < inicio:
+                return None
+            if inicio < tamano:
+                fin = min(int(fin), tamano - 1) if fin else tamano - 1
+                rangos.append((inicio, fin))
+
+    unidos = []
+    for inicio, fin in sorted(rangos):
+        if unidos and inicio <= unidos[-1][1] + 1:
+            unidos[-1] = (unidos[-1][0], max(fin, unidos[-1][1]))
+        else:
+            unidos.append((inicio, fin))
+    return unidos
+
+
+def _if_range_valido(request, etag, modificado):
+    """If-Range: el rango solo vale si el validador sigue siendo el actual"""
+    valor = request.META.get('HTTP_IF_RANGE')
+    if not valor:
+        return True
+    if valor.startswith(('"', 'W/')):
+        return valor == etag
+    return parse_http_date_safe(valor) == modificado
+
+
+class _Tramo:
+    """
+    Archivo abierto en `inicio` del que solo se leen `longitud` bytes.
+    Expone fileno() para que el wsgi.file_wrapper del servidor envíe el
+    tramo con sendfile; al resto le basta read().
+    """
+
+    def __init__(self, ruta, inicio, longitud):
+        self.archivo = open(ruta, 'rb')
+        self.archivo.seek(inicio)
+        self.restante = longitud
+
+    def read(self, tamano=-1):
+        if tamano < 0 or tamano > self.restante:
+            tamano = self.restante
+        bloque = self.archivo.read(tamano)
+        self.restante -= len(bloque)
+        return bloque
+
+    def fileno(self):
+        return self.archivo.fileno()
+
+    def close(self):
+        self.archivo.close()
+
+
+def _leer(ruta, rangos):
+    with open(ruta, 'rb') as archivo:
+        for inicio, fin in rangos:
+            archivo.seek(inicio)
+            restante = fin - inicio + 1
+            while restante > 0:
+                bloque = archivo.read(min(TAMANO_CHUNK, restante))
+                if not bloque:
+                    return
+                restante -= len(bloque)
+                yield bloque
+
+
+def _partes(ruta, rangos, tamano, content_type, separador):
+    """Cuerpo multipart/byteranges como (trozos, longitud total)"""
+    encabezados = [
+        (f'\r\n--{separador}\r\nContent-Type: {content_type}\r\n'
+         f'Content-Range: bytes {inicio}-{fin}/{tamano}\r\n\r\n').encode('ascii')
+        for inicio, fin in rangos
+    ]
+    cierre = f'\r\n--{separador}--\r\n'.encode('ascii')
+    longitud = sum(len(e) for e in encabezados) + sum(fin - inicio + 1 for inicio, fin in rangos) + len(cierre)
+
+    def trozos():
+        for encabezado, rango in zip(encabezados, rangos):
+            yield encabezado
+            yield from _leer(ruta, [rango])
+        yield cierre
+
+    return trozos(), longitud
+
+
+def _relativa_media(ruta):
+    """Ruta relativa a MEDIA_ROOT, o None si el archivo está fuera de ella"""
+    relativa = os.path.relpath(ruta, settings.MEDIA_ROOT)
+    if relativa == os.pardir or relativa.startswith(os.pardir + os.sep):
+        return None
+    return relativa
+
+
+def _url_interna(ruta):
+    """URL de la location interna de nginx para un archivo de MEDIA_ROOT"""
+    relativa = _relativa_media(ruta)
+    if relativa is None:
+        return None
+    return settings.MEDIA_INTERNA_URL + quote(relativa.replace(os.sep, '/'))
+
+
+def entregar(ruta, content_type, nombre, adjunto=False):
+    """
+    Respuesta 200 con el archivo entero, enviado por el servidor de
+    settings.MEDIA_SERVIDOR. Los archivos fuera de MEDIA_ROOT (p. ej. la
+    caché de PDF de pedidos) no se pueden delegar: nginx solo tiene la
+    location interna y mod_xsendfile solo XSendFilePath, así que salen por
+    FileResponse.
+    """
+    servidor = getattr(settings, 'MEDIA_SERVIDOR', 'python')
+    interna = _url_interna(ruta) if servidor == 'nginx' else None
+    if interna:
+        respuesta = HttpResponse(content_type=content_type)
+        respuesta['X-Accel-Redirect'] = interna
+    elif servidor == 'apache' and _relativa_media(ruta) is not None:
+        respuesta = HttpResponse(content_type=content_type)
+        respuesta['X-Sendfile'] = os.path.abspath(ruta)
+    else:
+        respuesta = FileResponse(open(ruta, 'rb'), content_type=content_type)
+    respuesta['Content-Disposition'] = content_disposition_header(adjunto, nombre)
+    return respuesta
+
+
+def _delegado():
+    """True si los bytes los envía nginx o Apache (ellos atienden Range)"""
+    return getattr(settings, 'MEDIA_SERVIDOR', 'python') in ('nginx', 'apache')
+
+
+def servir(request, campo, adjunto=False):
+    """
+    Respuesta para el FileField `campo`: 304, 206, 416 o el archivo entero.
+    Lanza Http404 si el campo está vacío o el archivo no existe.
+    """
+    if not campo:
+        raise Http404('Documento no encontrado')
+    ruta = campo.path
+    try:
+        estado = os.stat(ruta)
+    except OSError:
+        raise Http404('Archivo físico no encontrado')
+
+    tamano = estado.st_size
+    modificado = int(estado.st_mtime)
+    # Mismo formato que el ETag de nginx, que sirve el archivo en modo 'nginx'
+    etag = f'"{modificado:x}-{tamano:x}"'
+    # Nombre con el que se subió; la ruta física puede ser solo el hash (almacenamiento.py)
+    nombre = os.path.basename(campo.name)
+    content_type = TIPOS_CONTENIDO.get(nombre.rsplit('.', 1)[-1].lower())
+    if content_type is None:
+        content_type = mimetypes.guess_type(nombre)[0] or 'application/octet-stream'
+
+    def encabezados(respuesta):
+        respuesta['ETag'] = etag
+        respuesta['Last-Modified'] = http_date(modificado)
+        respuesta['Accept-Ranges'] = 'bytes'
+        respuesta['X-Content-Type-Options'] = 'nosniff'
+        return respuesta
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=modificado)
+    if condicional is not None:
+        return encabezados(condicional)
+
+    if _delegado():
+        return encabezados(entregar(ruta, content_type, nombre, adjunto))
+
+    rangos = None
+    if 'HTTP_RANGE' in request.META and request.method in ('GET', 'HEAD') and _if_range_valido(request, etag, modificado):
+        rangos = _rangos(request.META['HTTP_RANGE'], tamano)
+        if rangos is not None and len(rangos) > MAX_RANGOS:
+            rangos = None
+
+    if rangos == []:
+        respuesta = HttpResponse(status=416)
+        respuesta['Content-Range'] = f'bytes */{tamano}'
+        return encabezados(respuesta)
+
+    if not rangos:
+        return encabezados(entregar(ruta, content_type, nombre, adjunto))
+
+    if len(rangos) == 1:
+        inicio, fin = rangos[0]
+        respuesta = FileResponse(_Tramo(ruta, inicio, fin - inicio + 1), status=206, content_type=content_type)
+        respuesta['Content-Range'] = f'bytes {inicio}-{fin}/{tamano}'
+        respuesta['Content-Length'] = fin - inicio + 1
+    else:
+        separador = uuid.uuid4().hex
+        trozos, longitud = _partes(ruta, rangos, tamano, content_type, separador)
+        respuesta = StreamingHttpResponse(
+            trozos, status=206, content_type=f'multipart/byteranges; boundary={separador}'
+        )
+        respuesta['Content-Length'] = longitud
+
+    respuesta['Content-Disposition'] = content_disposition_header(adjunto, nombre)
+    return encabezados(respuesta)
@@ -0,0 +1,44 @@
+"""
+Recalculo masivo de ProductoAlmacen.estado (DISP / BAJO / AGOT).
+
+Replica en SQL la regla de ProductoAlmacen.calcular_estado(): el umbral es
+el stock_minimo del producto, si no el de su unidad, si no
+STOCK_MINIMO_DEFECTO. Se ejecuta una UPDATE por almacén que solo toca las
+filas cuyo estado cambia.
+"""
+from django.conf import settings
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import ProductoAlmacen, Unidad
+
+
+def expresion_umbral():
+    stock_minimo_unidad = Unidad.objects.filter(pk=OuterRef('unidad_id')).order_by().values('stock_minimo')[:1]
+    return Coalesce('stock_minimo', Subquery(stock_minimo_unidad), Value(settings.STOCK_MINIMO_DEFECTO))
+
+
+def expresion_estado():
+    return Case(
+        When(cantidad__lte=0, then=Value('AGOT')),
+        When(Q(cantidad__lte=expresion_umbral()), then=Value('BAJO')),
+        default=Value('DISP'),
+    )
+
+
+def recalcular_estados(productos=None):
+    """
+    Corrige el estado de los productos indicados (por defecto todo el
+    catálogo). Devuelve {ubicacion: filas corregidas}.
+    """
+    if productos is None:
+        productos = ProductoAlmacen.objects.all()
+
+    corregidos = {}
+    for ubicacion, _ in ProductoAlmacen.UBICACION_CHOICES:
+        corregidos[ubicacion] = productos.filter(
+            ubicacion_almacen=ubicacion
+        ).exclude(
+            estado=expresion_estado()
+        ).update(estado=expresion_estado())
+    return corregidos
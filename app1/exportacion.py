@@ -0,0 +1,195 @@
+"""
+Exportación por streaming de inventario, movimientos y pedidos de compra.
+
+Las filas salen de `values_list(...).iterator()` en bloques, sin instanciar
+modelos, y se escriben a la respuesta a medida que se leen, así la memoria
+no crece con el número de filas. CSV y JSONL envían los primeros bytes de
+inmediato. XLSX usa el modo write-only de openpyxl (las filas van a un
+archivo temporal en disco) y el libro terminado se envía por bloques.
+"""
+import csv
+import json
+import tempfile
+from datetime import date, datetime
+from decimal import Decimal
+
+import openpyxl
+from django.db.models import DecimalField, ExpressionWrapper, F
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import ProductoAlmacen, MovimientoInventario, PedidoCompra
+
+TAMANO_BLOQUE = 2000
+TAMANO_CHUNK_ARCHIVO = 64 * 1024
+
+FORMATOS = {
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'jsonl': ('application/x-ndjson; charset=utf-8', 'jsonl'),
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+}
+
+
+# ==============================================================================
+# DEFINICIÓN DE EXPORTACIONES
+# ==============================================================================
+
+def _productos(params):
+    productos = ProductoAlmacen.objects.order_by('id_producto')
+    if params.get('ubicacion') in dict(ProductoAlmacen.UBICACION_CHOICES):
+        productos = productos.filter(ubicacion_almacen=params['ubicacion'])
+    return productos, [
+        ('id_producto', 'id_producto'),
+        ('codigo_almacen', 'codigo_almacen'),
+        ('codigo_producto', 'codigo_producto'),
+        ('nombre', 'nombre'),
+        ('descripcion', 'descripcion'),
+        ('ubicacion_almacen', 'ubicacion_almacen'),
+        ('estante', 'estante'),
+        ('cantidad', 'cantidad'),
+        ('unidad', 'unidad__nombre'),
+        ('estado', 'estado'),
+        ('stock_minimo', 'stock_minimo'),
+        ('fecha_ingreso', 'fecha_ingreso'),
+        ('ultima_actualizacion', 'ultima_actualizacion'),
+        ('observaciones', 'observaciones'),
+    ]
+
+
+def _movimientos(params):
+    movimientos = MovimientoInventario.objects.order_by('id')
+    desde = parse_date(params.get('desde') or '')
+    hasta = parse_date(params.get('hasta') or '')
+    if desde:
+        movimientos = movimientos.filter(fecha_movimiento__date__gte=desde)
+    if hasta:
+        movimientos = movimientos.filter(fecha_movimiento__date__lte=hasta)
+    return movimientos, [
+        ('id', 'id'),
+        ('codigo_producto', 'producto__codigo_producto'),
+        ('producto', 'producto__nombre'),
+        ('tipo_movimiento', 'tipo_movimiento'),
+        ('cantidad', 'cantidad'),
+        ('cantidad_anterior', 'cantidad_anterior'),
+        ('cantidad_nueva', 'cantidad_nueva'),
+        ('estante_anterior', 'estante_anterior'),
+        ('estante_nuevo', 'estante_nuevo'),
+        ('fecha_movimiento', 'fecha_movimiento'),
+        ('usuario', 'usuario'),
+        ('observacion', 'observacion'),
+    ]
+
+
+def _pedidos(params):
+    """Una fila por item; los pedidos sin items salen con las columnas de item vacías"""
+    pedidos = PedidoCompra.objects.order_by('id_pedido', 'items__id_item').annotate(
+        item_subtotal=ExpressionWrapper(
+            F('items__cantidad_solicitada') * F('items__precio_unitario'),
+            output_field=DecimalField(max_digits=14, decimal_places=2),
+        )
+    )
+    if params.get('estado') in dict(PedidoCompra.ESTADO_CHOICES):
+        pedidos = pedidos.filter(estado=params['estado'])
+    return pedidos, [
+        ('id_pedido', 'id_pedido'),
+        ('pedido', 'nombre'),
+        ('estado', 'estado'),
+        ('fecha_creacion', 'fecha_creacion'),
+        ('fecha_entrega', 'fecha_entrega'),
+        ('id_item', 'items__id_item'),
+        ('codigo_producto', 'items__producto__codigo_producto'),
+        ('producto', 'items__producto__nombre'),
+        ('cantidad_solicitada', 'items__cantidad_solicitada'),
+        ('precio_unitario', 'items__precio_unitario'),
+        ('subtotal', 'item_subtotal'),
+    ]
+
+
+EXPORTACIONES = {
+    'productos': _productos,
+    'movimientos': _movimientos,
+    'pedidos': _pedidos,
+}
+
+
+# ==============================================================================
+# ESCRITORES
+# ==============================================================================
+
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en vez de guardarla"""
+    def write(self, valor):
+        return valor
+
+
+def _texto(valor):
+    if valor is None:
+        return ''
+    if isinstance(valor, datetime):
+        return timezone.localtime(valor).isoformat() if timezone.is_aware(valor) else valor.isoformat()
+    if isinstance(valor, date):
+        return valor.isoformat()
+    return str(valor) if isinstance(valor, Decimal) else valor
+
+
+def _celda(valor):
+    # openpyxl no admite datetimes con zona horaria
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.make_naive(valor)
+    return valor
+
+
+def _filas(queryset, columnas, tamano_bloque):
+    campos = [campo for _, campo in columnas]
+    return queryset.values_list(*campos).iterator(chunk_size=tamano_bloque)
+
+
+def _generar_csv(queryset, columnas, tamano_bloque):
+    escritor = csv.writer(_Eco())
+    yield '\ufeff'  # BOM para que Excel detecte UTF-8
+    yield escritor.writerow([titulo for titulo, _ in columnas])
+    for fila in _filas(queryset, columnas, tamano_bloque):
+        yield escritor.writerow([_texto(valor) for valor in fila])
+
+
+def _generar_jsonl(queryset, columnas, tamano_bloque):
+    titulos = [titulo for titulo, _ in columnas]
+    for fila in _filas(queryset, columnas, tamano_bloque):
+        registro = dict(zip(titulos, (_texto(valor) for valor in fila)))
+        yield json.dumps(registro, ensure_ascii=False) + '\n'
+
+
+def _generar_xlsx(queryset, columnas, tamano_bloque, titulo_hoja):
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet(title=titulo_hoja[:31])
+    hoja.append([titulo for titulo, _ in columnas])
+    for fila in _filas(queryset, columnas, tamano_bloque):
+        hoja.append([_celda(valor) for valor in fila])
+
+    with tempfile.TemporaryFile() as archivo:
+        libro.save(archivo)
+        archivo.seek(0)
+        while True:
+            bloque = archivo.read(TAMANO_CHUNK_ARCHIVO)
+            if not bloque:
+                break
+            yield bloque
+
+
+def generar(recurso, formato, params=None, tamano_bloque=TAMANO_BLOQUE):
+    """
+    Devuelve (iterador de bytes/str, content_type, nombre de archivo).
+    Lanza KeyError si el recurso o el formato no existen.
+    """
+    queryset, columnas = EXPORTACIONES[recurso](params or {})
+    content_type, extension = FORMATOS[formato]
+
+    if formato == 'csv':
+        contenido = _generar_csv(queryset, columnas, tamano_bloque)
+    elif formato == 'jsonl':
+        contenido = _generar_jsonl(queryset, columnas, tamano_bloque)
+    else:
+        contenido = _generar_xlsx(queryset, columnas, tamano_bloque, recurso)
+
+    nombre = f"{recurso}_{timezone.localtime().strftime('%Y%m%d_%H%M')}.{extension}"
+    return contenido, content_type, nombre
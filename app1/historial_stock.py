@@ -0,0 +1,121 @@
+"""
+Historial de stock a partir de puntos de control diarios.
+
+`actualizar_puntos_control()` recorre una sola vez los movimientos nuevos
+(id mayor al último consolidado) y guarda, por producto y día, el stock al
+cierre. Las consultas parten del punto de control más cercano y solo leen
+los pocos movimientos posteriores, en vez de recorrer todo
+MovimientoInventario.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import MovimientoInventario, PuntoControlStock
+
+TAMANO_LOTE = 2000
+
+
+def ultimo_movimiento_consolidado():
+    return PuntoControlStock.objects.aggregate(ultimo=Max('ultimo_movimiento_id'))['ultimo'] or 0
+
+
+def actualizar_puntos_control(tamano_lote=TAMANO_LOTE):
+    """
+    Consolida los movimientos aún no procesados. Devuelve (movimientos
+    leídos, puntos de control escritos).
+    """
+    desde_id = ultimo_movimiento_consolidado()
+    movimientos = MovimientoInventario.objects.filter(
+        id__gt=desde_id
+    ).order_by('id').values_list('id', 'producto_id', 'fecha_movimiento', 'cantidad_nueva')
+
+    # (producto, día) -> (cantidad al cierre, último movimiento)
+    cierres = {}
+    leidos = 0
+    for mov_id, producto_id, fecha, cantidad_nueva in movimientos.iterator(chunk_size=tamano_lote):
+        cierres[(producto_id, timezone.localdate(fecha))] = (cantidad_nueva, mov_id)
+        leidos += 1
+
+    puntos = [
+        PuntoControlStock(producto_id=producto_id, fecha=dia, cantidad=cantidad, ultimo_movimiento_id=mov_id)
+        for (producto_id, dia), (cantidad, mov_id) in cierres.items()
+    ]
+    with transaction.atomic():
+        PuntoControlStock.objects.bulk_create(
+            puntos,
+            batch_size=tamano_lote,
+            update_conflicts=True,
+            unique_fields=['producto', 'fecha'],
+            update_fields=['cantidad', 'ultimo_movimiento_id'],
+        )
+    return leidos, len(puntos)
+
+
+def _como_datetime(momento):
+    """Acepta date o datetime; una fecha se interpreta como el cierre de ese día"""
+    if isinstance(momento, datetime):
+        return momento if timezone.is_aware(momento) else timezone.make_aware(momento)
+    return timezone.make_aware(datetime.combine(momento, time.max))
+
+
+def stock_en_fecha(producto, momento):
+    """Stock del producto en un momento dado (date o datetime)"""
+    momento = _como_datetime(momento)
+    dia = timezone.localdate(momento)
+
+    punto = PuntoControlStock.objects.filter(
+        producto=producto, fecha__lt=dia
+    ).order_by('-fecha').values_list('cantidad', 'ultimo_movimiento_id').first()
+    cantidad, desde_id = punto if punto else (None, 0)
+
+    posterior = MovimientoInventario.objects.filter(
+        producto=producto, id__gt=desde_id, fecha_movimiento__lte=momento
+    ).order_by('-id').values_list('cantidad_nueva', flat=True).first()
+    if posterior is not None:
+        return posterior
+    if cantidad is not None:
+        return cantidad
+
+    # Sin movimientos hasta ese momento: el siguiente indica de dónde partió
+    siguiente = MovimientoInventario.objects.filter(
+        producto=producto, fecha_movimiento__gt=momento
+    ).order_by('id').values_list('cantidad_anterior', flat=True).first()
+    if siguiente is not None:
+        return siguiente
+    return producto.cantidad if producto.fecha_ingreso <= momento else 0
+
+
+def serie_stock(producto, desde, hasta):
+    """
+    Stock al cierre de cada día entre `desde` y `hasta` (fechas incluidas),
+    como lista de (fecha, cantidad).
+    """
+    cierres = dict(
+        PuntoControlStock.objects.filter(
+            producto=producto, fecha__range=(desde, hasta)
+        ).values_list('fecha', 'cantidad')
+    )
+
+    # Movimientos aún no consolidados dentro del rango
+    pendientes = MovimientoInventario.objects.filter(
+        producto=producto,
+        id__gt=ultimo_movimiento_consolidado(),
+        fecha_movimiento__gte=_como_datetime(desde) - timedelta(days=1),
+        fecha_movimiento__lte=_como_datetime(hasta),
+    ).order_by('id').values_list('fecha_movimiento', 'cantidad_nueva')
+    for fecha, cantidad_nueva in pendientes:
+        dia = timezone.localdate(fecha)
+        if desde <= dia <= hasta:
+            cierres[dia] = cantidad_nueva
+
+    serie = []
+    cantidad = stock_en_fecha(producto, desde - timedelta(days=1))
+    dia = desde
+    while dia <= hasta:
+        cantidad = cierres.get(dia, cantidad)
+        serie.append((dia, cantidad))
+        dia += timedelta(days=1)
+    return serie
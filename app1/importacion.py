@@ -0,0 +1,343 @@
+"""
+Importación de productos desde Excel en bloque.
+
+Las filas llegan por bloques, se validan en memoria y se separan en
+productos nuevos y existentes. Unidades y productos se precargan en
+diccionarios (una consulta por bloque, no una por fila) y se escriben con
+bulk_create / bulk_update.
+
+Llamada directamente, la importación entera va en una sola transacción: si
+algo falla no queda nada a medias. Los trabajos en segundo plano (ver
+trabajos.py) usan por_bloque=True: cada bloque se confirma por separado
+junto con su punto de control (ultima_fila del TrabajoImportacion), de modo
+que si el proceso falla quedan escritos los bloques ya confirmados y la
+importación se reanuda desde la fila siguiente, sin repetirlos.
+"""
+from contextlib import nullcontext
+
+import pandas as pd
+from django.db import transaction
+from django.utils import timezone
+
+from . import busqueda, pdf_pedidos
+from .models import ProductoAlmacen, Unidad, MovimientoInventario, Alumno, EntregaUtil, ItemPedido
+
+TAMANO_LOTE = 500
+
+COLUMNAS_REQUERIDAS = ['codigo_almacen', 'codigo_producto', 'nombre', 'cantidad', 'unidad']
+
+# '01' -> 'AG', '02' -> 'AD', '03' -> 'IU'
+CODIGO_A_UBICACION = {codigo: ubicacion for ubicacion, codigo in ProductoAlmacen.CODIGOS_ALMACEN.items()}
+
+ESTADOS_VALIDOS = ['', 'NAN', 'DISP', 'AGOT', 'BAJO']
+
+CAMPOS_ACTUALIZABLES = ['cantidad', 'estante', 'unidad', 'stock_minimo', 'observaciones', 'estado', 'ultima_actualizacion']
+
+
+class ErrorFila(ValueError):
+    """Fila del Excel que no pasa la validación"""
+
+    def __init__(self, numero, mensaje):
+        super().__init__(f"Fila {numero}: {mensaje}")
+
+
+def _texto(valor):
+    texto = str(valor if valor is not None else '').strip()
+    return '' if texto.lower() == 'nan' else texto
+
+
+def nuevo_resultado():
+    return {
+        'filas': 0,
+        'creados': 0,
+        'actualizados': 0,
+        'unidades_creadas': 0,
+        'errores': [],
+        'por_almacen': {ubicacion: {'creados': 0, 'actualizados': 0} for ubicacion in ProductoAlmacen.CODIGOS_ALMACEN},
+    }
+
+
+def limpiar_fila(numero, fila):
+    """Valida una fila (dict columna -> valor) y devuelve sus valores normalizados"""
+    codigo_almacen = _texto(fila['codigo_almacen'])
+    if codigo_almacen.isdigit():
+        # Excel guarda '01' como el número 1
+        codigo_almacen = codigo_almacen.zfill(2)
+    if codigo_almacen not in CODIGO_A_UBICACION:
+        raise ErrorFila(numero, f"Código de almacén '{codigo_almacen}' no válido (debe ser 01, 02 o 03)")
+
+    codigo_producto = _texto(fila['codigo_producto'])
+    if not codigo_producto:
+        raise ErrorFila(numero, "El código de producto es obligatorio")
+
+    nombre = _texto(fila['nombre'])
+    if not nombre:
+        raise ErrorFila(numero, "El nombre es obligatorio")
+
+    try:
+        cantidad = int(fila['cantidad'])
+    except (ValueError, TypeError):
+        raise ErrorFila(numero, "Cantidad inválida")
+    if cantidad < 0:
+        raise ErrorFila(numero, "La cantidad no puede ser negativa")
+
+    unidad = _texto(fila['unidad'])
+    if not unidad:
+        raise ErrorFila(numero, "La unidad es obligatoria")
+
+    # Estado (opcional): se recalcula según cantidad y stock mínimo
+    estado = _texto(fila.get('estado')).upper()
+    if estado not in ESTADOS_VALIDOS:
+        raise ErrorFila(numero, f"Estado '{estado}' no válido (debe ser DISP, AGOT o BAJO)")
+
+    stock_minimo = None
+    if not pd.isna(fila.get('stock_minimo')):
+        try:
+            stock_minimo = int(fila['stock_minimo'])
+            if stock_minimo < 0:
+                raise ValueError
+        except (ValueError, TypeError):
+            raise ErrorFila(numero, "Stock mínimo inválido")
+
+    return {
+        'ubicacion': CODIGO_A_UBICACION[codigo_almacen],
+        'codigo_producto': codigo_producto,
+        'nombre': nombre,
+        'cantidad': cantidad,
+        'unidad': unidad,
+        'stock_minimo': stock_minimo,
+        'descripcion': _texto(fila.get('descripcion')),
+        'estante': _texto(fila.get('estante')),
+        'observaciones': _texto(fila.get('observaciones')),
+    }
+
+
+def _unidades_por_nombre():
+    """nombre y abreviatura en minúsculas -> Unidad (la primera por nombre gana)"""
+    unidades = {}
+    for unidad in Unidad.objects.all():
+        unidades.setdefault(unidad.nombre.lower(), unidad)
+        if unidad.abreviatura:
+            unidades.setdefault(unidad.abreviatura.lower(), unidad)
+    return unidades
+
+
+def stock_minimo_unidades():
+    """nombre y abreviatura en minúsculas -> stock mínimo de las unidades que lo definen"""
+    return {
+        clave: unidad.stock_minimo
+        for clave, unidad in _unidades_por_nombre().items()
+        if unidad.stock_minimo is not None
+    }
+
+
+def importar_productos(bloques, usuario='Sistema', tamano_lote=TAMANO_LOTE, al_avanzar=None,
+                       por_bloque=False, resultado=None):
+    """
+    Importa bloques de filas [(número de fila, dict), ...] como los de
+    lector_excel.leer_bloques y devuelve el resumen (ver nuevo_resultado).
+    Las filas inválidas se informan en 'errores' y no impiden importar las
+    demás.
+
+    Por defecto todos los bloques se escriben en una sola transacción y un
+    fallo no deja nada escrito. Con por_bloque=True cada bloque se confirma
+    por separado y `al_avanzar(resultado, ultima_fila)` se llama dentro de
+    su transacción, así el punto de control que guarde queda siempre de
+    acuerdo con lo escrito: ante un fallo los bloques anteriores ya están
+    confirmados y basta reanudar con los bloques posteriores a ultima_fila.
+    `resultado` permite continuar el resumen de una importación reanudada.
+    """
+    resultado = resultado or nuevo_resultado()
+    with nullcontext() if por_bloque else transaction.atomic():
+        unidades = _unidades_por_nombre()
+        for bloque in bloques:
+            with transaction.atomic() if por_bloque else nullcontext():
+                validas = []
+                for numero, fila in bloque:
+                    try:
+                        validas.append(limpiar_fila(numero, fila))
+                    except ErrorFila as e:
+                        resultado['errores'].append(str(e))
+                if validas:
+                    _aplicar(validas, unidades, usuario, resultado, tamano_lote)
+                resultado['filas'] += len(bloque)
+                if al_avanzar:
+                    al_avanzar(resultado, bloque[-1][0])
+    return resultado
+
+
+def _aplicar(filas, unidades, usuario, resultado, tamano_lote):
+    ahora = timezone.now()
+    marca = timezone.localtime(ahora).strftime('%Y-%m-%d %H:%M')
+
+    # Unidades: crear de una vez las que no existen
+    unidades_nuevas = {}
+    for fila in filas:
+        clave = fila['unidad'].lower()
+        if clave not in unidades and clave not in unidades_nuevas:
+            unidades_nuevas[clave] = Unidad(
+                nombre=fila['unidad'],
+                abreviatura=fila['unidad'] if len(fila['unidad']) <= 10 else '',
+                activo=True,
+            )
+    if unidades_nuevas:
+        Unidad.objects.bulk_create(unidades_nuevas.values(), batch_size=tamano_lote)
+        unidades.update(unidades_nuevas)
+        resultado['unidades_creadas'] += len(unidades_nuevas)
+
+    existentes = ProductoAlmacen.objects.select_related('unidad').in_bulk(
+        {fila['codigo_producto'] for fila in filas}, field_name='codigo_producto'
+    )
+
+    nuevos = {}
+    actualizados = {}
+    cambio_unidad = []
+    movimientos = []
+    for fila in filas:
+        codigo = fila['codigo_producto']
+        unidad = unidades[fila['unidad'].lower()]
+        estante = fila['estante']
+        observaciones = fila['observaciones']
+        producto = existentes.get(codigo) or nuevos.get(codigo)
+
+        if producto is None:
+            producto = ProductoAlmacen(
+                codigo_producto=codigo,
+                codigo_almacen=ProductoAlmacen.CODIGOS_ALMACEN[fila['ubicacion']],
+                nombre=fila['nombre'],
+                descripcion=fila['descripcion'],
+                ubicacion_almacen=fila['ubicacion'],
+                estante=estante or None,
+                cantidad=fila['cantidad'],
+                unidad=unidad,
+                stock_minimo=fila['stock_minimo'],
+                observaciones=observaciones or None,
+            )
+            nuevos[codigo] = producto
+            movimientos.append(MovimientoInventario(
+                producto=producto,
+                tipo_movimiento='ENTRADA',
+                cantidad=fila['cantidad'],
+                cantidad_anterior=0,
+                cantidad_nueva=fila['cantidad'],
+                estante_anterior=None,
+                estante_nuevo=estante or None,
+                observacion=f"Creación inicial: {observaciones}" if observaciones else "Creación inicial",
+                usuario=usuario,
+            ))
+            resultado['creados'] += 1
+            resultado['por_almacen'][fila['ubicacion']]['creados'] += 1
+            continue
+
+        cantidad_anterior = producto.cantidad
+        estante_anterior = producto.estante
+        producto.cantidad += fila['cantidad']
+        if estante:
+            producto.estante = estante
+        if codigo in existentes and producto.unidad_id != unidad.pk:
+            cambio_unidad.append(producto.pk)
+        producto.unidad = unidad
+        if fila['stock_minimo'] is not None:
+            producto.stock_minimo = fila['stock_minimo']
+        if observaciones:
+            if producto.observaciones:
+                producto.observaciones += f"\n[{marca}] {observaciones}"
+            else:
+                producto.observaciones = observaciones
+        if codigo in existentes:
+            actualizados[codigo] = producto
+
+        movimientos.append(MovimientoInventario(
+            producto=producto,
+            tipo_movimiento='ENTRADA',
+            cantidad=fila['cantidad'],
+            cantidad_anterior=cantidad_anterior,
+            cantidad_nueva=producto.cantidad,
+            estante_anterior=estante_anterior,
+            estante_nuevo=producto.estante,
+            observacion=f"Importación Excel: {observaciones}" if observaciones else "Importación Excel",
+            usuario=usuario,
+        ))
+        resultado['actualizados'] += 1
+        resultado['por_almacen'][fila['ubicacion']]['actualizados'] += 1
+
+    # bulk_create / bulk_update no pasan por save(): estado y fechas a mano
+    if nuevos:
+        for producto in nuevos.values():
+            producto.estado = producto.calcular_estado()
+        ProductoAlmacen.objects.bulk_create(nuevos.values(), batch_size=tamano_lote)
+        busqueda.indexar(list(nuevos.values()))
+
+    if actualizados:
+        for producto in actualizados.values():
+            producto.estado = producto.calcular_estado()
+            producto.ultima_actualizacion = ahora
+        ProductoAlmacen.objects.bulk_update(actualizados.values(), CAMPOS_ACTUALIZABLES, batch_size=tamano_lote)
+    if cambio_unidad:
+        # La unidad sale en el PDF de los pedidos y bulk_update no dispara señales
+        pdf_pedidos.invalidar_items(ItemPedido.objects.filter(producto_id__in=cambio_unidad))
+
+    # Los productos nuevos ya tienen id, bulk_create lo toma de movimiento.producto
+    MovimientoInventario.objects.bulk_create(movimientos, batch_size=tamano_lote)
+
+
+# ==============================================================================
+# ALUMNOS
+# ==============================================================================
+
+# Columnas (base 0) del reporte de matrícula; los datos empiezan en la fila 6
+COL_AULA, COL_NOMBRE, COL_DNI, COL_SEXO = 4, 8, 10, 11
+FILA_INICIO_ALUMNOS = 6
+
+
+def importar_alumnos(salon, bloques, al_avanzar=None, resultado=None):
+    """
+    Importa al salón los alumnos de su aula, un bloque por transacción.
+    Devuelve {'filas', 'creados', 'duplicados', 'ignorados'}.
+    `al_avanzar(resultado, ultima_fila)` se llama dentro de la transacción
+    de cada bloque (ver importar_productos).
+    """
+    resultado = resultado or {'filas': 0, 'creados': 0, 'duplicados': 0, 'ignorados': 0}
+    utiles = list(salon.utiles.all())
+
+    for bloque in bloques:
+        with transaction.atomic():
+            _aplicar_alumnos(salon, utiles, bloque, resultado)
+            resultado['filas'] += len(bloque)
+            if al_avanzar:
+                al_avanzar(resultado, bloque[-1][0])
+    return resultado
+
+
+def _aplicar_alumnos(salon, utiles, bloque, resultado):
+    dnis = {str(row[COL_DNI]).strip() for _, row in bloque if len(row) > COL_DNI and row[COL_DNI]}
+    registrados = set(Alumno.objects.filter(dni__in=dnis).values_list('dni', flat=True))
+
+    for _, row in bloque:
+        if not row or len(row) <= COL_SEXO:
+            resultado['ignorados'] += 1
+            continue
+
+        aula = str(row[COL_AULA]).strip().upper() if row[COL_AULA] else ''
+        nombre = str(row[COL_NOMBRE]).strip() if row[COL_NOMBRE] else ''
+        dni = str(row[COL_DNI]).strip() if row[COL_DNI] else ''
+        sexo = str(row[COL_SEXO]).strip().upper() if row[COL_SEXO] else ''
+
+        if aula != salon.nombre.upper() or not nombre or not dni:
+            resultado['ignorados'] += 1
+            continue
+
+        if sexo not in ('M', 'F'):
+            sexo = ''
+
+        if dni in registrados:
+            resultado['duplicados'] += 1
+            continue
+
+        alumno = Alumno.objects.create(salon=salon, nombre=nombre, dni=dni, sexo=sexo)
+        registrados.add(dni)
+
+        # Crear entregas con cantidad_entregada = 0
+        for util in utiles:
+            EntregaUtil.objects.create(alumno=alumno, util=util, cantidad_entregada=0, entregado=False)
+        resultado['creados'] += 1
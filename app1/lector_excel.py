@@ -0,0 +1,63 @@
+"""
+Lectura de Excel por bloques con memoria constante.
+
+Usa el modo read-only de openpyxl, que recorre la hoja sin cargar el libro
+completo, y entrega las filas en listas de `tamano_bloque`. La memoria
+depende del tamaño del bloque y no del tamaño del archivo.
+"""
+import openpyxl
+
+TAMANO_BLOQUE = 1000
+
+
+class ErrorArchivo(ValueError):
+    """El archivo no se puede leer o no tiene el formato esperado"""
+
+
+def _abrir(archivo):
+    try:
+        libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+    except Exception as e:
+        raise ErrorArchivo(f'No se pudo leer el archivo Excel: {e}')
+    return libro
+
+
+def _vacia(fila):
+    return all(valor is None or (isinstance(valor, str) and not valor.strip()) for valor in fila)
+
+
+def leer_bloques(archivo, fila_inicio=2, encabezado=1, requeridas=(), tamano_bloque=TAMANO_BLOQUE):
+    """
+    Genera bloques (listas) de (número de fila, fila) de la hoja activa.
+
+    Si `encabezado` es un número de fila, cada fila es un dict
+    columna -> valor y se comprueba que estén las columnas `requeridas`
+    (si falta alguna se lanza ErrorArchivo antes de entregar filas). Con
+    encabezado=None cada fila es la tupla de valores. Las filas vacías se
+    omiten.
+    """
+    libro = _abrir(archivo)
+    try:
+        hoja = libro.active
+        columnas = None
+        if encabezado is not None:
+            fila = next(hoja.iter_rows(min_row=encabezado, max_row=encabezado, values_only=True), ())
+            columnas = [str(valor).strip() if valor is not None else None for valor in fila]
+            faltantes = [col for col in requeridas if col not in columnas]
+            if faltantes:
+                raise ErrorArchivo(f'Faltan columnas obligatorias: {", ".join(faltantes)}')
+
+        bloque = []
+        for numero, fila in enumerate(hoja.iter_rows(min_row=fila_inicio, values_only=True), start=fila_inicio):
+            if _vacia(fila):
+                continue
+            if columnas is not None:
+                fila = {col: fila[i] if i < len(fila) else None for i, col in enumerate(columnas) if col}
+            bloque.append((numero, fila))
+            if len(bloque) >= tamano_bloque:
+                yield bloque
+                bloque = []
+        if bloque:
+            yield bloque
+    finally:
+        libro.close()
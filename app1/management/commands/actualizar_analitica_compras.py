@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app1 import analitica_compras
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los resúmenes de compras (proveedores, almacenes, precios) de los meses con cambios'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--completo', action='store_true',
+                            help='Reconstruye los resúmenes de todos los meses')
+
+    def handle(self, *args, **options):
+        meses = analitica_compras.actualizar(completo=options['completo'])
+        self.stdout.write(self.style.SUCCESS(f'{meses} meses recalculados'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from app1.historial_stock import actualizar_puntos_control
+
+
+class Command(BaseCommand):
+    help = 'Consolida los movimientos de inventario nuevos en puntos de control diarios de stock'
+
+    def handle(self, *args, **options):
+        leidos, puntos = actualizar_puntos_control()
+        self.stdout.write(self.style.SUCCESS(
+            f'{leidos} movimientos consolidados en {puntos} puntos de control'
+        ))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from app1.reabastecimiento import actualizar_reabastecimiento
+
+
+class Command(BaseCommand):
+    help = 'Actualiza el consumo diario y los puntos de reorden con los movimientos nuevos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias-reposicion', type=int, default=None,
+                            help='Plazo de reposición en días (por defecto DIAS_REPOSICION)')
+
+    def handle(self, *args, **options):
+        nuevos, recalculados = actualizar_reabastecimiento(dias_reposicion=options['dias_reposicion'])
+        self.stdout.write(self.style.SUCCESS(
+            f'{nuevos} productos con consumo nuevo, {recalculados} productos recalculados'
+        ))
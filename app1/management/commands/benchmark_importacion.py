@@ -0,0 +1,54 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app1 import benchmark_importacion
+
+
+class Command(BaseCommand):
+    help = 'Mide tiempo, consultas y memoria de las importaciones de Excel con libros sintéticos (en una base temporal)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--productos', type=int, nargs='*', default=list(benchmark_importacion.FILAS_PRODUCTOS),
+                            help='Tamaños del catálogo de productos (filas)')
+        parser.add_argument('--alumnos', type=int, nargs='*', default=list(benchmark_importacion.FILAS_ALUMNOS),
+                            help='Tamaños del reporte de matrícula (filas)')
+        parser.add_argument('--sin-memoria', action='store_true',
+                            help='No hace la pasada con tracemalloc')
+        parser.add_argument('--salida', default='benchmark_importacion.json',
+                            help='Archivo JSON donde guardar el informe')
+        parser.add_argument('--comparar', metavar='JSON',
+                            help='Informe anterior contra el que comparar (cocientes actual/anterior)')
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        informe = benchmark_importacion.ejecutar(
+            filas_productos=options['productos'],
+            filas_alumnos=options['alumnos'],
+            con_memoria=not options['sin_memoria'],
+            al_terminar=self._mostrar,
+        )
+        if anterior:
+            informe['comparacion'] = benchmark_importacion.comparar(anterior, informe)
+            for fila in informe['comparacion']:
+                cocientes = ', '.join(f'{metrica} x{valor}' for metrica, valor in fila.items() if metrica not in ('tipo', 'filas'))
+                self.stdout.write(f'  {fila["tipo"]} {fila["filas"]}: {cocientes}')
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(informe, archivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Informe guardado en {options["salida"]}'))
+
+    def _mostrar(self, datos):
+        memoria = datos.get('pico_memoria_bytes')
+        memoria = f', pico {memoria / 1024 / 1024:.1f} MB' if memoria is not None else ''
+        self.stdout.write(
+            f'{datos["tipo"]} {datos["filas"]} filas: {datos["segundos"]:.2f} s, '
+            f'{datos["consultas"]} consultas{memoria}'
+        )
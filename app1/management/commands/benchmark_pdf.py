@@ -0,0 +1,55 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app1 import benchmark_pdf
+
+
+class Command(BaseCommand):
+    help = 'Mide PDFs por segundo y latencia del servicio de PDF de pedidos con pedidos sintéticos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tamanos', type=int, nargs='*', default=list(benchmark_pdf.TAMANOS),
+                            help='Líneas por pedido')
+        parser.add_argument('--pedidos', type=int,
+                            help='PDFs a generar por tamaño (por defecto depende del tamaño)')
+        parser.add_argument('--workers', type=int,
+                            help='Procesos del pool (por defecto PDF_WORKERS)')
+        parser.add_argument('--concurrencia', type=int,
+                            help='Hilos que piden PDFs a la vez (por defecto, uno por worker)')
+        parser.add_argument('--salida', default='benchmark_pdf.json',
+                            help='Archivo JSON donde guardar el informe')
+        parser.add_argument('--comparar', metavar='JSON',
+                            help='Informe anterior contra el que comparar (cocientes actual/anterior)')
+
+    def handle(self, *args, **options):
+        anterior = None
+        if options['comparar']:
+            try:
+                with open(options['comparar'], encoding='utf-8') as archivo:
+                    anterior = json.load(archivo)
+            except (OSError, ValueError) as e:
+                raise CommandError(f'No se pudo leer {options["comparar"]}: {e}')
+
+        informe = benchmark_pdf.ejecutar(
+            tamanos=options['tamanos'],
+            workers=options['workers'],
+            concurrencia=options['concurrencia'],
+            pedidos=options['pedidos'],
+            al_terminar=self._mostrar,
+        )
+        if anterior:
+            informe['comparacion'] = benchmark_pdf.comparar(anterior, informe)
+            for fila in informe['comparacion']:
+                cocientes = ', '.join(f'{metrica} x{valor}' for metrica, valor in fila.items() if metrica not in ('modo', 'items'))
+                self.stdout.write(f'  {fila["modo"]} {fila["items"]}: {cocientes}')
+
+        with open(options['salida'], 'w', encoding='utf-8') as archivo:
+            json.dump(informe, archivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f'Informe guardado en {options["salida"]}'))
+
+    def _mostrar(self, datos):
+        self.stdout.write(
+            f'{datos["modo"]} {datos["items"]} líneas: {datos["pdfs_por_segundo"]} PDF/s, '
+            f'p50 {datos["latencia_p50"]:.3f} s, p95 {datos["latencia_p95"]:.3f} s, {datos["paginas"]} páginas'
+        )
@@ -0,0 +1,57 @@
+from django.core.files import File
+from django.core.management.base import BaseCommand
+
+from app1 import almacenamiento
+from app1.models import Cotizacion, PedidoCompra
+
+CAMPOS = (
+    (PedidoCompra, 'archivo'),
+    (PedidoCompra, 'documento_entrega'),
+    (Cotizacion, 'documento'),
+)
+
+
+class Command(BaseCommand):
+    help = ('Pasa los documentos subidos al almacenamiento por contenido (un archivo por SHA-256) '
+            'y recuenta sus referencias')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--conservar', action='store_true',
+                            help='No borra los archivos anteriores después de copiarlos')
+
+    def handle(self, *args, **options):
+        documentos = almacenamiento.documentos
+        prefijo = almacenamiento.PREFIJO + '/'
+        movidos = faltantes = 0
+        anteriores = set()
+
+        for modelo, campo in CAMPOS:
+            filas = modelo.objects.exclude(**{f'{campo}__startswith': prefijo}).exclude(
+                **{f'{campo}__isnull': True}
+            ).exclude(**{campo: ''}).values_list('pk', campo)
+            for pk, nombre in filas.iterator():
+                if not documentos.exists(nombre):
+                    faltantes += 1
+                    continue
+                with documentos.open(nombre, 'rb') as archivo:
+                    nuevo = documentos.save(nombre, File(archivo))
+                # update(): sin señales, el nombre anterior no tiene referencias que liberar
+                modelo.objects.filter(pk=pk).update(**{campo: nuevo})
+                anteriores.add(nombre)
+                movidos += 1
+
+        if not options['conservar']:
+            for nombre in anteriores:
+                documentos.delete(nombre)
+
+        nombres = []
+        for modelo, campo in CAMPOS:
+            nombres.extend(modelo.objects.filter(**{f'{campo}__startswith': prefijo}).values_list(campo, flat=True))
+        corregidos, borrados, sin_archivo = almacenamiento.recontar(nombres)
+        for sha256 in sin_archivo:
+            self.stderr.write(f'Falta el archivo de {almacenamiento.directorio(sha256)}')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{movidos} documentos movidos ({faltantes} sin archivo), '
+            f'{corregidos} conteos corregidos, {borrados} contenidos sin uso borrados'
+        ))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from app1 import trabajos
+from app1.models import TrabajoImportacion
+
+
+class Command(BaseCommand):
+    help = 'Ejecuta las importaciones de Excel pendientes (p. ej. las encoladas antes de un reinicio)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reintentar', action='store_true',
+                            help='Reanuda los trabajos con error o abandonados ("Procesando" sin avanzar '
+                                 'en IMPORTACION_ABANDONO segundos)')
+
+    def handle(self, *args, **options):
+        if options['reintentar']:
+            # Cada trabajo continúa desde su último bloque confirmado (ultima_fila);
+            # los que un worker vivo sigue procesando no se tocan
+            reiniciados = trabajos.reencolar(TrabajoImportacion.objects.all())
+            self.stdout.write(f'{reiniciados} trabajos reencolados')
+
+        procesados = trabajos.procesar_pendientes()
+        self.stdout.write(self.style.SUCCESS(f'{procesados} importaciones procesadas'))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from app1.estados_stock import recalcular_estados
+
+
+class Command(BaseCommand):
+    help = 'Recalcula el estado (DISP/BAJO/AGOT) de todo el catálogo según cantidad y stock mínimo'
+
+    def handle(self, *args, **options):
+        corregidos = recalcular_estados()
+        for ubicacion, total in corregidos.items():
+            self.stdout.write(f'{ubicacion}: {total} productos corregidos')
+        self.stdout.write(self.style.SUCCESS('Estados recalculados'))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from app1.models import PedidoCompra
+
+
+class Command(BaseCommand):
+    help = 'Recalcula los totales guardados de los pedidos de compra (items, monto y cotizaciones)'
+
+    def handle(self, *args, **options):
+        pedidos = PedidoCompra.objects.all()
+        total = pedidos.count()
+        desfasados = pedidos.recalcular_totales()
+        self.stdout.write(self.style.SUCCESS(
+            f'{total} pedidos recalculados, {desfasados} tenían totales desfasados'
+        ))
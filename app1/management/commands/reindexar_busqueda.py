@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app1 import busqueda
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero el índice de búsqueda global (FTS5)'
+
+    def handle(self, *args, **options):
+        if not busqueda.disponible():
+            raise CommandError('La búsqueda global requiere SQLite con FTS5')
+
+        totales = busqueda.reconstruir_indice()
+        for tipo, total in totales.items():
+            self.stdout.write(f'{tipo}: {total} registros indexados')
+        self.stdout.write(self.style.SUCCESS('Índice de búsqueda reconstruido'))
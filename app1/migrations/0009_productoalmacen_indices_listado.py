@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0008_entregautil_cantidad_entregada'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productoalmacen',
+            index=models.Index(fields=['ubicacion_almacen', '-fecha_ingreso', '-id_producto'], name='prod_ubic_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoalmacen',
+            index=models.Index(fields=['ubicacion_almacen', 'estado', '-fecha_ingreso', '-id_producto'], name='prod_ubic_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoalmacen',
+            index=models.Index(fields=['ubicacion_almacen', 'estante'], name='prod_ubic_estante_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoalmacen',
+            index=models.Index(fields=['ubicacion_almacen', 'nombre', 'id_producto'], name='prod_ubic_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productoalmacen',
+            index=models.Index(fields=['ubicacion_almacen', 'cantidad', 'id_producto'], name='prod_ubic_cantidad_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0009_productoalmacen_indices_listado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SecuenciaProducto',
+            fields=[
+                ('ubicacion_almacen', models.CharField(choices=[('AG', 'Almacén General'), ('AD', 'Almacén de Deporte'), ('IU', 'Almacén de Útiles')], max_length=2, primary_key=True, serialize=False)),
+                ('ultimo_numero', models.PositiveIntegerField(default=0)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Secuencia de Códigos',
+                'verbose_name_plural': 'Secuencias de Códigos',
+                'db_table': 'app1_secuenciaproducto',
+            },
+        ),
+    ]
@@ -0,0 +1,49 @@
+from django.db import migrations
+
+
+CREAR_TABLA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS busqueda_fts USING fts5(
+    titulo,
+    codigo,
+    contenido,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+# rowid = id * 4 + tipo (0 producto, 1 alumno, 2 salón, 3 pedido)
+LLENAR_TABLA = [
+    "INSERT INTO busqueda_fts (rowid, titulo, codigo, contenido) "
+    "SELECT id_producto * 4 + 0, nombre, codigo_producto, COALESCE(descripcion, '') FROM app1_productoalmacen",
+    "INSERT INTO busqueda_fts (rowid, titulo, codigo, contenido) "
+    "SELECT id * 4 + 1, nombre, dni, '' FROM app1_alumno",
+    "INSERT INTO busqueda_fts (rowid, titulo, codigo, contenido) "
+    "SELECT id * 4 + 2, nombre, codigo, profesora FROM app1_salon",
+    "INSERT INTO busqueda_fts (rowid, titulo, codigo, contenido) "
+    "SELECT id_pedido * 4 + 3, nombre, printf('PC-%04d', id_pedido), COALESCE(descripcion, '') FROM pedidos_compra",
+]
+
+
+def crear_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(CREAR_TABLA)
+    for sql in LLENAR_TABLA:
+        schema_editor.execute(sql, params=None)
+
+
+def borrar_indice(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute('DROP TABLE IF EXISTS busqueda_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0010_secuenciaproducto'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indice, borrar_indice),
+    ]
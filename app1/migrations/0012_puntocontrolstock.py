@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0011_busqueda_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PuntoControlStock',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('cantidad', models.PositiveIntegerField()),
+                ('ultimo_movimiento_id', models.BigIntegerField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='puntos_control', to='app1.productoalmacen')),
+            ],
+            options={
+                'verbose_name': 'Punto de Control de Stock',
+                'verbose_name_plural': 'Puntos de Control de Stock',
+                'db_table': 'app1_puntocontrolstock',
+                'ordering': ['producto', 'fecha'],
+                'indexes': [models.Index(fields=['ultimo_movimiento_id'], name='ptocontrol_ultmov_idx')],
+                'unique_together': {('producto', 'fecha')},
+            },
+        ),
+    ]
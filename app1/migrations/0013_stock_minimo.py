@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0012_puntocontrolstock'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='productoalmacen',
+            name='stock_minimo',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='unidad',
+            name='stock_minimo',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+    ]
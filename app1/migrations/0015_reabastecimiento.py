@@ -0,0 +1,47 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0014_versionrecurso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProcesoIncremental',
+            fields=[
+                ('nombre', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('ultimo_id', models.BigIntegerField(default=0)),
+                ('fecha_ejecucion', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Proceso Incremental',
+                'verbose_name_plural': 'Procesos Incrementales',
+                'db_table': 'app1_procesoincremental',
+            },
+        ),
+        migrations.CreateModel(
+            name='ReabastecimientoProducto',
+            fields=[
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reabastecimiento', serialize=False, to='app1.productoalmacen')),
+                ('consumo_total', models.PositiveIntegerField(default=0)),
+                ('fecha_primer_consumo', models.DateTimeField(blank=True, null=True)),
+                ('fecha_ultimo_consumo', models.DateTimeField(blank=True, null=True)),
+                ('consumo_diario', models.FloatField(default=0)),
+                ('dias_hasta_agotar', models.FloatField(blank=True, null=True)),
+                ('punto_reorden', models.PositiveIntegerField(default=0)),
+                ('requiere_reposicion', models.BooleanField(db_index=True, default=False)),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Reabastecimiento de Producto',
+                'verbose_name_plural': 'Reabastecimiento de Productos',
+                'db_table': 'app1_reabastecimientoproducto',
+            },
+        ),
+    ]
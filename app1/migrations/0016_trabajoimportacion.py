@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0015_reabastecimiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrabajoImportacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('PRODUCTOS', 'Productos'), ('ALUMNOS', 'Alumnos')], max_length=10)),
+                ('archivo', models.FileField(upload_to='importaciones/')),
+                ('nombre_archivo', models.CharField(max_length=255)),
+                ('usuario', models.CharField(blank=True, max_length=100, null=True)),
+                ('estado', models.CharField(choices=[('PEND', 'Pendiente'), ('PROC', 'Procesando'), ('COMP', 'Completado'), ('ERROR', 'Error')], db_index=True, default='PEND', max_length=5)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('creados', models.PositiveIntegerField(default=0)),
+                ('actualizados', models.PositiveIntegerField(default=0)),
+                ('errores', models.PositiveIntegerField(default=0)),
+                ('resumen', models.JSONField(blank=True, default=dict)),
+                ('mensaje_error', models.TextField(blank=True, null=True)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('salon', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='importaciones', to='app1.salon')),
+            ],
+            options={
+                'verbose_name': 'Trabajo de Importación',
+                'verbose_name_plural': 'Trabajos de Importación',
+                'db_table': 'app1_trabajoimportacion',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0016_trabajoimportacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='hash_contenido',
+            field=models.CharField(blank=True, db_index=True, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='trabajoimportacion',
+            name='ultima_fila',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
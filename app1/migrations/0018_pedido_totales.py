@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:11
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def calcular_totales(apps, schema_editor):
+    """Llena los totales de los pedidos existentes (mismo cálculo que recalcular_totales)"""
+    PedidoCompra = apps.get_model('app1', 'PedidoCompra')
+    ItemPedido = apps.get_model('app1', 'ItemPedido')
+    Cotizacion = apps.get_model('app1', 'Cotizacion')
+    decimal = models.DecimalField(max_digits=14, decimal_places=2)
+    items = ItemPedido.objects.filter(pedido=models.OuterRef('pk')).order_by().values('pedido')
+    cotizaciones = Cotizacion.objects.filter(pedido=models.OuterRef('pk')).order_by().values('pedido')
+    monto = models.Sum(models.F('cantidad_solicitada') * models.F('precio_unitario'), output_field=decimal)
+    PedidoCompra.objects.update(
+        total_items=Coalesce(models.Subquery(items.annotate(n=models.Count('pk')).values('n')), 0),
+        total_general=Coalesce(
+            models.Subquery(items.annotate(total=monto).values('total')),
+            models.Value(0, output_field=decimal),
+        ),
+        total_cotizaciones=Coalesce(models.Subquery(cotizaciones.annotate(n=models.Count('pk')).values('n')), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0017_importacion_hash_punto_control'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pedidocompra',
+            name='total_cotizaciones',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='pedidocompra',
+            name='total_general',
+            field=models.DecimalField(db_index=True, decimal_places=2, default=0, editable=False, max_digits=14),
+        ),
+        migrations.AddField(
+            model_name='pedidocompra',
+            name='total_items',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(calcular_totales, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,95 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:23
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import TruncMonth
+
+
+def marcar_meses(apps, schema_editor):
+    """Deja pendientes todos los meses con pedidos: el primer actualizar() llena los resúmenes"""
+    PedidoCompra = apps.get_model('app1', 'PedidoCompra')
+    MesCompraPendiente = apps.get_model('app1', 'MesCompraPendiente')
+    meses = PedidoCompra.objects.annotate(
+        mes=TruncMonth('fecha_creacion', output_field=models.DateField())
+    ).values_list('mes', flat=True).distinct().order_by()
+    MesCompraPendiente.objects.bulk_create([MesCompraPendiente(mes=mes) for mes in meses], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0018_pedido_totales'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MesCompraPendiente',
+            fields=[
+                ('mes', models.DateField(primary_key=True, serialize=False)),
+            ],
+            options={
+                'verbose_name': 'Mes de Compras Pendiente',
+                'verbose_name_plural': 'Meses de Compras Pendientes',
+                'db_table': 'app1_mescomprapendiente',
+            },
+        ),
+        migrations.CreateModel(
+            name='GastoAlmacenMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('ubicacion_almacen', models.CharField(choices=[('AG', 'Almacén General'), ('AD', 'Almacén de Deporte'), ('IU', 'Almacén de Útiles')], max_length=2)),
+                ('items', models.PositiveIntegerField(default=0)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Gasto por Almacén',
+                'verbose_name_plural': 'Gastos por Almacén',
+                'db_table': 'app1_gastoalmacenmes',
+                'ordering': ['mes', 'ubicacion_almacen'],
+                'unique_together': {('mes', 'ubicacion_almacen')},
+            },
+        ),
+        migrations.CreateModel(
+            name='GastoProveedorMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('proveedor', models.CharField(max_length=200)),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'verbose_name': 'Gasto por Proveedor',
+                'verbose_name_plural': 'Gastos por Proveedor',
+                'db_table': 'app1_gastoproveedormes',
+                'ordering': ['mes', 'proveedor'],
+                'unique_together': {('mes', 'proveedor')},
+            },
+        ),
+        migrations.CreateModel(
+            name='PrecioProductoMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('pedidos', models.PositiveIntegerField(default=0)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('monto', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('precio_min', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('precio_max', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='precios_mes', to='app1.productoalmacen')),
+            ],
+            options={
+                'verbose_name': 'Precio de Producto por Mes',
+                'verbose_name_plural': 'Precios de Productos por Mes',
+                'db_table': 'app1_precioproductomes',
+                'ordering': ['producto', 'mes'],
+                'unique_together': {('producto', 'mes')},
+            },
+        ),        migrations.RunPython(marcar_meses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0019_analitica_compras'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecioCotizacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('precio_unitario', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('cotizacion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='precios', to='app1.cotizacion')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='precios_cotizados', to='app1.itempedido')),
+            ],
+            options={
+                'verbose_name': 'Precio Cotizado',
+                'verbose_name_plural': 'Precios Cotizados',
+                'db_table': 'precios_cotizacion',
+                'unique_together': {('cotizacion', 'item')},
+            },
+        ),
+    ]
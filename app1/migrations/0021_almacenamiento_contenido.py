@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:32
+
+import app1.almacenamiento
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0020_precios_cotizacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContenidoArchivo',
+            fields=[
+                ('sha256', models.CharField(max_length=64, primary_key=True, serialize=False)),
+                ('tamano', models.PositiveBigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Contenido de Archivo',
+                'verbose_name_plural': 'Contenidos de Archivos',
+                'db_table': 'contenido_archivos',
+            },
+        ),
+        migrations.AlterField(
+            model_name='cotizacion',
+            name='documento',
+            field=models.FileField(max_length=255, storage=app1.almacenamiento.AlmacenamientoContenido(), upload_to='cotizaciones/'),
+        ),
+        migrations.AlterField(
+            model_name='pedidocompra',
+            name='archivo',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=app1.almacenamiento.AlmacenamientoContenido(), upload_to='pedidos_compra/'),
+        ),
+        migrations.AlterField(
+            model_name='pedidocompra',
+            name='documento_entrega',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=app1.almacenamiento.AlmacenamientoContenido(), upload_to='documentos_entrega/'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.18 on 2026-10-18 14:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app1', '0021_almacenamiento_contenido'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productoalmacen',
+            index=models.Index(fields=['ubicacion_almacen', 'codigo_producto', 'id_producto'], name='prod_ubic_codigo_idx'),
+        ),
+    ]
@@ -1,11 +1,19 @@
-from django.db import models
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Coalesce, Round
 from django.utils import timezone
 
+from .almacenamiento import LONGITUD_NOMBRE, documentos
+
 # MODELO DE UNIDADES - VERSIÓN SIMPLE
 class Unidad(models.Model):
     nombre = models.CharField(max_length=50, unique=True)
     abreviatura = models.CharField(max_length=10, blank=True)
     activo = models.BooleanField(default=True)
+    # Umbral de stock bajo para los productos de esta unidad (si el producto no define uno)
+    stock_minimo = models.PositiveIntegerField(null=True, blank=True)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     
     def __str__(self):
@@ -45,35 +53,50 @@ class ProductoAlmacen(models.Model):
         on_delete=models.PROTECT,
         related_name='productos'
     )
+    # Se calcula en save() a partir de cantidad y stock_minimo (ver calcular_estado)
     estado = models.CharField(max_length=4, choices=ESTADO_CHOICES, default='DISP')
+    stock_minimo = models.PositiveIntegerField(null=True, blank=True)
     fecha_ingreso = models.DateTimeField(auto_now_add=True)
     ultima_actualizacion = models.DateTimeField(auto_now=True)
     observaciones = models.TextField(blank=True, null=True)
 
+    CODIGOS_ALMACEN = {
+        'AG': '01',
+        'AD': '02',
+        'IU': '03',
+    }
+
+    @classmethod
+    def generar_codigo(cls, ubicacion_almacen):
+        """Reserva el siguiente código del almacén (ver SecuenciaProducto)"""
+        codigo_almacen = cls.CODIGOS_ALMACEN.get(ubicacion_almacen, '00')
+        return f"{codigo_almacen}-{SecuenciaProducto.reservar(ubicacion_almacen):04d}"
+
+    @property
+    def umbral_stock_bajo(self):
+        """stock_minimo del producto, si no el de su unidad, si no STOCK_MINIMO_DEFECTO"""
+        if self.stock_minimo is not None:
+            return self.stock_minimo
+        if self.unidad_id and self.unidad.stock_minimo is not None:
+            return self.unidad.stock_minimo
+        return settings.STOCK_MINIMO_DEFECTO
+
+    def calcular_estado(self):
+        cantidad = int(self.cantidad or 0)
+        if cantidad <= 0:
+            return 'AGOT'
+        if cantidad <= self.umbral_stock_bajo:
+            return 'BAJO'
+        return 'DISP'
+
     def save(self, *args, **kwargs):
+        self.estado = self.calcular_estado()
+
         if not self.codigo_almacen:
-            codigos = {
-                'AG': '01',
-                'AD': '02',
-                'IU': '03',
-            }
-            self.codigo_almacen = codigos.get(self.ubicacion_almacen, '00')
+            self.codigo_almacen = self.CODIGOS_ALMACEN.get(self.ubicacion_almacen, '00')
         
         if not self.codigo_producto:
-            ultimo_producto = ProductoAlmacen.objects.filter(
-                ubicacion_almacen=self.ubicacion_almacen
-            ).order_by('-id_producto').first()
-            
-            if ultimo_producto and ultimo_producto.codigo_producto:
-                try:
-                    ultimo_numero = int(ultimo_producto.codigo_producto.split('-')[1])
-                    nuevo_numero = ultimo_numero + 1
-                except:
-                    nuevo_numero = 1
-            else:
-                nuevo_numero = 1
-            
-            self.codigo_producto = f"{self.codigo_almacen}-{nuevo_numero:04d}"
+            self.codigo_producto = self.generar_codigo(self.ubicacion_almacen)
         
         super().save(*args, **kwargs)
 
@@ -84,6 +107,71 @@ class ProductoAlmacen(models.Model):
         db_table = 'app1_productoalmacen'
         verbose_name = 'Producto de Almacén'
         verbose_name_plural = 'Productos de Almacén'
+        # Índices para los listados paginados por cursor (ver paginacion.py)
+        indexes = [
+            models.Index(fields=['ubicacion_almacen', '-fecha_ingreso', '-id_producto'], name='prod_ubic_fecha_idx'),
+            models.Index(fields=['ubicacion_almacen', 'estado', '-fecha_ingreso', '-id_producto'], name='prod_ubic_estado_idx'),
+            models.Index(fields=['ubicacion_almacen', 'estante'], name='prod_ubic_estante_idx'),
+            models.Index(fields=['ubicacion_almacen', 'nombre', 'id_producto'], name='prod_ubic_nombre_idx'),
+            models.Index(fields=['ubicacion_almacen', 'cantidad', 'id_producto'], name='prod_ubic_cantidad_idx'),
+            models.Index(fields=['ubicacion_almacen', 'codigo_producto', 'id_producto'], name='prod_ubic_codigo_idx'),
+        ]
+
+
+class SecuenciaProducto(models.Model):
+    """
+    Último número de código_producto asignado por almacén.
+
+    Una fila por ubicacion_almacen que se incrementa con un UPDATE atómico,
+    así dos altas simultáneas nunca reciben el mismo código.
+    """
+    ubicacion_almacen = models.CharField(max_length=2, choices=ProductoAlmacen.UBICACION_CHOICES, primary_key=True)
+    ultimo_numero = models.PositiveIntegerField(default=0)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.ubicacion_almacen}: {self.ultimo_numero}"
+
+    @classmethod
+    def reservar(cls, ubicacion_almacen):
+        """Reserva el siguiente número del almacén y lo devuelve"""
+        with transaction.atomic():
+            actualizados = cls.objects.filter(ubicacion_almacen=ubicacion_almacen).update(
+                ultimo_numero=models.F('ultimo_numero') + 1,
+                fecha_modificacion=timezone.now(),
+            )
+            if not actualizados:
+                inicial = cls._ultimo_numero_existente(ubicacion_almacen)
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(ubicacion_almacen=ubicacion_almacen, ultimo_numero=inicial + 1)
+                except IntegrityError:
+                    # Otro proceso creó la secuencia primero: incrementar la suya
+                    cls.objects.filter(ubicacion_almacen=ubicacion_almacen).update(
+                        ultimo_numero=models.F('ultimo_numero') + 1,
+                        fecha_modificacion=timezone.now(),
+                    )
+            return cls.objects.filter(ubicacion_almacen=ubicacion_almacen).values_list('ultimo_numero', flat=True).get()
+
+    @staticmethod
+    def _ultimo_numero_existente(ubicacion_almacen):
+        """Mayor sufijo numérico ya usado en el almacén (solo al crear la secuencia)"""
+        prefijo = f"{ProductoAlmacen.CODIGOS_ALMACEN.get(ubicacion_almacen, '00')}-"
+        codigos = ProductoAlmacen.objects.filter(
+            codigo_producto__startswith=prefijo
+        ).values_list('codigo_producto', flat=True)
+
+        ultimo = 0
+        for codigo in codigos.iterator():
+            sufijo = codigo[len(prefijo):]
+            if sufijo.isdigit():
+                ultimo = max(ultimo, int(sufijo))
+        return ultimo
+
+    class Meta:
+        db_table = 'app1_secuenciaproducto'
+        verbose_name = 'Secuencia de Códigos'
+        verbose_name_plural = 'Secuencias de Códigos'
 
 
 class MovimientoInventario(models.Model):
@@ -116,41 +204,202 @@ class MovimientoInventario(models.Model):
         ordering = ['-fecha_movimiento']
 
 
+class PuntoControlStock(models.Model):
+    """
+    Stock de un producto al cierre de un día, consolidado desde
+    MovimientoInventario (ver historial_stock.py).
+
+    ultimo_movimiento_id es el último movimiento incluido: el stock en
+    cualquier momento posterior se obtiene sumando solo los movimientos con
+    id mayor.
+    """
+    producto = models.ForeignKey(ProductoAlmacen, on_delete=models.CASCADE, related_name='puntos_control')
+    fecha = models.DateField()
+    cantidad = models.PositiveIntegerField()
+    ultimo_movimiento_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"{self.producto_id} @ {self.fecha}: {self.cantidad}"
+
+    class Meta:
+        db_table = 'app1_puntocontrolstock'
+        verbose_name = 'Punto de Control de Stock'
+        verbose_name_plural = 'Puntos de Control de Stock'
+        ordering = ['producto', 'fecha']
+        unique_together = ['producto', 'fecha']
+        indexes = [
+            models.Index(fields=['ultimo_movimiento_id'], name='ptocontrol_ultmov_idx'),
+        ]
+
+
+class ReabastecimientoProducto(models.Model):
+    """
+    Ritmo de consumo (SALIDA / PRESTAMO) precalculado por producto y días
+    estimados hasta agotar stock. Lo mantiene reabastecimiento.py de forma
+    incremental; los listados de inventario lo leen con un LEFT JOIN.
+    """
+    producto = models.OneToOneField(
+        ProductoAlmacen,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='reabastecimiento'
+    )
+    consumo_total = models.PositiveIntegerField(default=0)
+    fecha_primer_consumo = models.DateTimeField(null=True, blank=True)
+    fecha_ultimo_consumo = models.DateTimeField(null=True, blank=True)
+    consumo_diario = models.FloatField(default=0)
+    dias_hasta_agotar = models.FloatField(null=True, blank=True)
+    punto_reorden = models.PositiveIntegerField(default=0)
+    requiere_reposicion = models.BooleanField(default=False, db_index=True)
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.producto_id}: {self.consumo_diario:.2f}/día"
+
+    class Meta:
+        db_table = 'app1_reabastecimientoproducto'
+        verbose_name = 'Reabastecimiento de Producto'
+        verbose_name_plural = 'Reabastecimiento de Productos'
+
+
+class ProcesoIncremental(models.Model):
+    """Último id procesado por cada cálculo incremental (p. ej. 'reabastecimiento')"""
+    nombre = models.CharField(max_length=50, primary_key=True)
+    ultimo_id = models.BigIntegerField(default=0)
+    fecha_ejecucion = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.nombre}: {self.ultimo_id}"
+
+    class Meta:
+        db_table = 'app1_procesoincremental'
+        verbose_name = 'Proceso Incremental'
+        verbose_name_plural = 'Procesos Incrementales'
+
+
+class PedidoCompraQuerySet(models.QuerySet):
+    def con_resumen(self):
+        """
+        Anota la cotización seleccionada (id, proveedor y monto) con
+        subconsultas, en la misma consulta que los pedidos. Los conteos y el
+        monto total ya están guardados en el pedido (ver ajustar_totales).
+        """
+        # Mismo criterio que cotizaciones.filter(estado='SELEC').first()
+        seleccionada = Cotizacion.objects.filter(pedido=models.OuterRef('pk'), estado='SELEC').order_by('-fecha_creacion')
+        return self.annotate(
+            seleccionada_id=models.Subquery(seleccionada.values('id_cotizacion')[:1]),
+            seleccionada_proveedor=models.Subquery(seleccionada.values('proveedor')[:1]),
+            seleccionada_monto=models.Subquery(seleccionada.values('monto')[:1]),
+        )
+
+    def totales_calculados(self):
+        """Anota los totales calculados desde items y cotizaciones (calc_*)"""
+        return self.annotate(**{
+            f'calc_{campo}': expresion for campo, expresion in _expresiones_totales().items()
+        })
+
+    def recalcular_totales(self):
+        """
+        Recalcula en un solo UPDATE los totales guardados de los pedidos del
+        queryset. Devuelve cuántos estaban desfasados.
+        """
+        desfasados = self.totales_calculados().exclude(
+            total_items=models.F('calc_total_items'),
+            total_cotizaciones=models.F('calc_total_cotizaciones'),
+            total_general=Round(models.F('calc_total_general'), 2),
+        ).count()
+        self.update(**_expresiones_totales())
+        return desfasados
+
+
+def _expresiones_totales():
+    """Subconsultas correlacionadas con el valor real de cada total del pedido"""
+    decimal = models.DecimalField(max_digits=14, decimal_places=2)
+    items = ItemPedido.objects.filter(pedido=models.OuterRef('pk')).order_by().values('pedido')
+    cotizaciones = Cotizacion.objects.filter(pedido=models.OuterRef('pk')).order_by().values('pedido')
+    monto = models.Sum(models.F('cantidad_solicitada') * models.F('precio_unitario'), output_field=decimal)
+    return {
+        'total_items': Coalesce(models.Subquery(items.annotate(n=models.Count('pk')).values('n')), 0),
+        'total_general': Coalesce(
+            models.Subquery(items.annotate(total=monto).values('total')),
+            models.Value(0, output_field=decimal),
+        ),
+        'total_cotizaciones': Coalesce(models.Subquery(cotizaciones.annotate(n=models.Count('pk')).values('n')), 0),
+    }
+
+
 class PedidoCompra(models.Model):
     ESTADO_CHOICES = [
         ('PEND', 'Pendiente'),
         ('COMP', 'Completado'),
         ('ENTR', 'Entregado'),
     ]
+
+    # Totales guardados: solo cambian con ajustar_totales (F()) o con
+    # recalcular_totales, nunca con un save() del pedido
+    CAMPOS_TOTALES = ('total_items', 'total_general', 'total_cotizaciones')
     
     id_pedido = models.AutoField(primary_key=True)
     nombre = models.CharField(max_length=200)
     descripcion = models.TextField(blank=True, null=True)
-    archivo = models.FileField(upload_to='pedidos_compra/', null=True, blank=True)
+    archivo = models.FileField(
+        upload_to='pedidos_compra/', storage=documentos, max_length=LONGITUD_NOMBRE, null=True, blank=True
+    )
     estado = models.CharField(max_length=4, choices=ESTADO_CHOICES, default='PEND')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
     
-    documento_entrega = models.FileField(upload_to='documentos_entrega/', null=True, blank=True)
+    documento_entrega = models.FileField(
+        upload_to='documentos_entrega/', storage=documentos, max_length=LONGITUD_NOMBRE, null=True, blank=True
+    )
     fecha_entrega = models.DateTimeField(null=True, blank=True)
+
+    total_items = models.PositiveIntegerField(default=0, editable=False)
+    total_general = models.DecimalField(max_digits=14, decimal_places=2, default=0, editable=False, db_index=True)
+    total_cotizaciones = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = PedidoCompraQuerySet.as_manager()
     
     def __str__(self):
         return f"PC-{self.id_pedido:04d} - {self.nombre}"
-    
-    def total_cotizaciones(self):
-        return self.cotizaciones.count()
+
+    def save(self, *args, **kwargs):
+        # Un pedido leído antes de que se agregara un item no debe pisar sus
+        # totales al guardarse
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CAMPOS_TOTALES
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def ajustar_totales(cls, id_pedido, items=0, monto=0, cotizaciones=0):
+        """Suma las diferencias a los totales guardados con un UPDATE atómico"""
+        cls.objects.filter(pk=id_pedido).update(
+            total_items=models.F('total_items') + items,
+            total_general=models.F('total_general') + Decimal(str(monto)),
+            total_cotizaciones=models.F('total_cotizaciones') + cotizaciones,
+        )
     
     def cotizacion_seleccionada(self):
-        return self.cotizaciones.filter(estado='SELEC').first()
-    
-    def total_items(self):
-        return self.items.count()
-    
-    def total_general(self):
-        total = 0
-        for item in self.items.all():
-            total += item.subtotal()
-        return total
+        """La cotización ganadora; usa las anotaciones de con_resumen() si están"""
+        if hasattr(self, 'seleccionada_id'):
+            if self.seleccionada_id is None:
+                return None
+            # Instancia con los campos anotados; el resto se carga si se pide.
+            # SQLite no redondea los decimales de una subconsulta: 10 -> 10.00
+            monto = Decimal(self.seleccionada_monto).quantize(Decimal('0.01'))
+            cotizacion = Cotizacion.from_db(
+                self._state.db,
+                ['id_cotizacion', 'pedido_id', 'proveedor', 'monto', 'estado'],
+                [self.seleccionada_id, self.pk, self.seleccionada_proveedor, monto, 'SELEC'],
+            )
+            cotizacion.pedido = self
+            return cotizacion
+        if not hasattr(self, '_cotizacion_seleccionada'):
+            self._cotizacion_seleccionada = self.cotizaciones.filter(estado='SELEC').first()
+        return self._cotizacion_seleccionada
     
     class Meta:
         db_table = 'pedidos_compra'
@@ -193,7 +442,9 @@ class Cotizacion(models.Model):
     proveedor = models.CharField(max_length=200)
     monto = models.DecimalField(max_digits=10, decimal_places=2)
     descripcion = models.TextField(blank=True, null=True)
-    documento = models.FileField(upload_to='cotizaciones/', null=False, blank=False)
+    documento = models.FileField(
+        upload_to='cotizaciones/', storage=documentos, max_length=LONGITUD_NOMBRE, null=False, blank=False
+    )
     estado = models.CharField(max_length=5, choices=ESTADO_CHOICES, default='PEND')
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
@@ -208,6 +459,134 @@ class Cotizacion(models.Model):
         ordering = ['-fecha_creacion']
 
 
+class PrecioCotizacion(models.Model):
+    """
+    Precio unitario que una cotización ofrece para un item del pedido. Las
+    cotizaciones sin precios por item solo tienen su monto global (ver
+    comparacion_cotizaciones.py).
+    """
+    cotizacion = models.ForeignKey(Cotizacion, on_delete=models.CASCADE, related_name='precios')
+    item = models.ForeignKey(ItemPedido, on_delete=models.CASCADE, related_name='precios_cotizados')
+    precio_unitario = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"COT-{self.cotizacion_id:04d} item {self.item_id}: {self.precio_unitario}"
+
+    class Meta:
+        db_table = 'precios_cotizacion'
+        verbose_name = 'Precio Cotizado'
+        verbose_name_plural = 'Precios Cotizados'
+        unique_together = ['cotizacion', 'item']
+
+
+class ContenidoArchivo(models.Model):
+    """
+    Documento subido guardado una sola vez por su SHA-256, con cuántos
+    campos lo usan (ver almacenamiento.py). Se borra, junto con el archivo,
+    cuando ya no lo usa ninguno.
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    tamano = models.PositiveBigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.referencias} ref.)"
+
+    class Meta:
+        db_table = 'contenido_archivos'
+        verbose_name = 'Contenido de Archivo'
+        verbose_name_plural = 'Contenidos de Archivos'
+
+
+# ==============================================================================
+# RESÚMENES DE COMPRAS - los mantiene analitica_compras.py por mes
+# ==============================================================================
+
+class MesCompraPendiente(models.Model):
+    """
+    Mes (día 1, hora local) con pedidos creados, modificados o eliminados
+    cuyos resúmenes de compras falta recalcular. Lo marcan las señales.
+    """
+    mes = models.DateField(primary_key=True)
+
+    def __str__(self):
+        return self.mes.strftime('%Y-%m')
+
+    class Meta:
+        db_table = 'app1_mescomprapendiente'
+        verbose_name = 'Mes de Compras Pendiente'
+        verbose_name_plural = 'Meses de Compras Pendientes'
+
+
+class GastoProveedorMes(models.Model):
+    """Gasto por proveedor y mes: la cotización seleccionada de cada pedido del mes"""
+    mes = models.DateField()
+    proveedor = models.CharField(max_length=200)
+    pedidos = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} {self.proveedor}: {self.monto}"
+
+    class Meta:
+        db_table = 'app1_gastoproveedormes'
+        verbose_name = 'Gasto por Proveedor'
+        verbose_name_plural = 'Gastos por Proveedor'
+        ordering = ['mes', 'proveedor']
+        unique_together = ['mes', 'proveedor']
+
+
+class GastoAlmacenMes(models.Model):
+    """Monto pedido (cantidad x precio de los items) por almacén y mes"""
+    mes = models.DateField()
+    ubicacion_almacen = models.CharField(max_length=2, choices=ProductoAlmacen.UBICACION_CHOICES)
+    items = models.PositiveIntegerField(default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} {self.ubicacion_almacen}: {self.monto}"
+
+    class Meta:
+        db_table = 'app1_gastoalmacenmes'
+        verbose_name = 'Gasto por Almacén'
+        verbose_name_plural = 'Gastos por Almacén'
+        ordering = ['mes', 'ubicacion_almacen']
+        unique_together = ['mes', 'ubicacion_almacen']
+
+
+class PrecioProductoMes(models.Model):
+    """Precios unitarios pedidos de un producto en un mes (historial de precios)"""
+    producto = models.ForeignKey(ProductoAlmacen, on_delete=models.CASCADE, related_name='precios_mes')
+    mes = models.DateField()
+    pedidos = models.PositiveIntegerField(default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+    monto = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    precio_min = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    precio_max = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    @property
+    def precio_promedio(self):
+        """Precio promedio ponderado por cantidad"""
+        if not self.cantidad:
+            return Decimal('0.00')
+        return (self.monto / self.cantidad).quantize(Decimal('0.01'))
+
+    def __str__(self):
+        return f"{self.producto_id} {self.mes:%Y-%m}: {self.precio_min}-{self.precio_max}"
+
+    class Meta:
+        db_table = 'app1_precioproductomes'
+        verbose_name = 'Precio de Producto por Mes'
+        verbose_name_plural = 'Precios de Productos por Mes'
+        ordering = ['producto', 'mes']
+        unique_together = ['producto', 'mes']
+
+
 class Salon(models.Model):
     TURNO_CHOICES = [
         ('Mañana', 'Mañana'),
@@ -432,4 +811,78 @@ class HistorialEntrega(models.Model):
         verbose_name_plural = 'Historial de Entregas'
 
     def __str__(self):
-        return f"{self.accion} - {self.entrega.alumno.nombre} - {self.fecha}"
\ No newline at end of file
+        return f"{self.accion} - {self.entrega.alumno.nombre} - {self.fecha}"
+
+
+class VersionRecurso(models.Model):
+    """
+    Contador de versión por recurso (p. ej. 'salon:3:alumnos') que se
+    incrementa con señales cada vez que sus datos cambian. Permite responder
+    ETag / Last-Modified con una lectura por clave sin ejecutar la consulta
+    costosa del endpoint (ver versiones.py).
+    """
+    clave = models.CharField(max_length=100, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    fecha_modificacion = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        return f"{self.clave} v{self.version}"
+
+    class Meta:
+        db_table = 'app1_versionrecurso'
+        verbose_name = 'Versión de Recurso'
+        verbose_name_plural = 'Versiones de Recursos'
+
+
+class TrabajoImportacion(models.Model):
+    """
+    Importación de Excel que se ejecuta en segundo plano (ver trabajos.py).
+    Guarda el archivo subido, el avance por bloques (para reanudar si se
+    interrumpe) y el resumen final.
+    """
+    TIPO_CHOICES = [
+        ('PRODUCTOS', 'Productos'),
+        ('ALUMNOS', 'Alumnos'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('PEND', 'Pendiente'),
+        ('PROC', 'Procesando'),
+        ('COMP', 'Completado'),
+        ('ERROR', 'Error'),
+    ]
+
+    tipo = models.CharField(max_length=10, choices=TIPO_CHOICES)
+    archivo = models.FileField(upload_to='importaciones/')
+    nombre_archivo = models.CharField(max_length=255)
+    # SHA-256 del archivo: detecta en una consulta si ya se importó el mismo contenido
+    hash_contenido = models.CharField(max_length=64, blank=True, db_index=True)
+    salon = models.ForeignKey('Salon', on_delete=models.CASCADE, null=True, blank=True, related_name='importaciones')
+    usuario = models.CharField(max_length=100, blank=True, null=True)
+    estado = models.CharField(max_length=5, choices=ESTADO_CHOICES, default='PEND', db_index=True)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    # Punto de control: última fila del Excel ya confirmada en la base
+    ultima_fila = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    errores = models.PositiveIntegerField(default=0)
+    resumen = models.JSONField(default=dict, blank=True)
+    mensaje_error = models.TextField(blank=True, null=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    # Último bloque confirmado: si deja de avanzar, el worker que lo procesaba murió
+    fecha_avance = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.nombre_archivo} ({self.get_estado_display()})"
+
+    @property
+    def terminado(self):
+        return self.estado in ('COMP', 'ERROR')
+
+    class Meta:
+        db_table = 'app1_trabajoimportacion'
+        ordering = ['-fecha_creacion']
+        verbose_name = 'Trabajo de Importación'
+        verbose_name_plural = 'Trabajos de Importación'
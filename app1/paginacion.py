@@ -0,0 +1,173 @@
+"""
+Listados de inventario paginados por cursor (keyset) con filtros en servidor.
+
+En lugar de OFFSET, cada página se pide "después de" o "antes de" la última
+fila vista (valor del campo de orden + id_producto), así el costo de la
+consulta no depende de cuántas páginas haya delante.
+"""
+import base64
+import json
+from urllib.parse import urlencode
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .models import ProductoAlmacen, Unidad
+
+TAMANO_PAGINA = 50
+
+# clave -> (campo, descendente, etiqueta)
+ORDENAMIENTOS = {
+    'recientes': ('fecha_ingreso', True, 'Más recientes'),
+    'antiguos': ('fecha_ingreso', False, 'Más antiguos'),
+    'nombre': ('nombre', False, 'Nombre (A-Z)'),
+    'nombre_desc': ('nombre', True, 'Nombre (Z-A)'),
+    'cantidad': ('cantidad', False, 'Menor cantidad'),
+    'cantidad_desc': ('cantidad', True, 'Mayor cantidad'),
+    'codigo': ('codigo_producto', False, 'Código'),
+}
+ORDEN_DEFECTO = 'recientes'
+
+FILTROS = ('q', 'estado', 'estante', 'unidad', 'orden')
+
+
+def _codificar_cursor(producto, campo):
+    valor = getattr(producto, campo)
+    if campo == 'fecha_ingreso':
+        valor = valor.isoformat()
+    crudo = json.dumps([valor, producto.id_producto]).encode('utf-8')
+    return base64.urlsafe_b64encode(crudo).decode('ascii').rstrip('=')
+
+
+def _decodificar_cursor(cursor, campo):
+    """Devuelve (valor, id_producto) o None si el cursor no es válido"""
+    try:
+        relleno = '=' * (-len(cursor) % 4)
+        valor, pk = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+        if campo == 'fecha_ingreso':
+            valor = parse_datetime(valor)
+            if valor is None:
+                return None
+        elif campo == 'cantidad':
+            valor = int(valor)
+        else:
+            valor = str(valor)
+        return valor, int(pk)
+    except (ValueError, TypeError, json.JSONDecodeError):
+        return None
+
+
+def leer_filtros(params):
+    """Normaliza los filtros del querystring"""
+    filtros = {clave: params.get(clave, '').strip() for clave in FILTROS}
+    if filtros['orden'] not in ORDENAMIENTOS:
+        filtros['orden'] = ORDEN_DEFECTO
+    if filtros['estado'] not in dict(ProductoAlmacen.ESTADO_CHOICES):
+        filtros['estado'] = ''
+    if not filtros['unidad'].isdigit():
+        filtros['unidad'] = ''
+    return filtros
+
+
+def filtrar_productos(queryset, filtros):
+    """Aplica en SQL los filtros de estado, estante, unidad y texto"""
+    if filtros['estado']:
+        queryset = queryset.filter(estado=filtros['estado'])
+    if filtros['estante']:
+        queryset = queryset.filter(estante__iexact=filtros['estante'])
+    if filtros['unidad']:
+        queryset = queryset.filter(unidad_id=int(filtros['unidad']))
+    if filtros['q']:
+        texto = filtros['q']
+        queryset = queryset.filter(
+            Q(nombre__icontains=texto) |
+            Q(codigo_producto__icontains=texto) |
+            Q(descripcion__icontains=texto)
+        )
+    return queryset
+
+
+def paginar_keyset(queryset, orden, despues=None, antes=None, tamano=TAMANO_PAGINA):
+    """
+    Devuelve una página del queryset ordenado por (campo, id_producto).
+
+    `despues` pide la página siguiente a un cursor y `antes` la anterior.
+    Se lee una fila extra para saber si hay más páginas sin hacer COUNT.
+    """
+    campo, descendente, _ = ORDENAMIENTOS[orden]
+
+    cursor = None
+    hacia_atras = False
+    if antes:
+        cursor = _decodificar_cursor(antes, campo)
+        hacia_atras = cursor is not None
+    if cursor is None and despues:
+        cursor = _decodificar_cursor(despues, campo)
+
+    # Recorrer hacia atrás es recorrer con el orden invertido
+    invertido = descendente != hacia_atras
+    if invertido:
+        queryset = queryset.order_by(f'-{campo}', '-id_producto')
+    else:
+        queryset = queryset.order_by(campo, 'id_producto')
+
+    if cursor is not None:
+        valor, pk = cursor
+        op = 'lt' if invertido else 'gt'
+        queryset = queryset.filter(
+            Q(**{f'{campo}__{op}': valor}) |
+            Q(**{campo: valor, f'id_producto__{op}': pk})
+        )
+
+    filas = list(queryset[:tamano + 1])
+    hay_mas = len(filas) > tamano
+    filas = filas[:tamano]
+
+    if hacia_atras:
+        filas.reverse()
+        hay_anterior = hay_mas
+        hay_siguiente = True
+    else:
+        hay_anterior = cursor is not None
+        hay_siguiente = hay_mas
+
+    return {
+        'productos': filas,
+        'hay_anterior': hay_anterior and bool(filas),
+        'hay_siguiente': hay_siguiente and bool(filas),
+        'cursor_anterior': _codificar_cursor(filas[0], campo) if filas else '',
+        'cursor_siguiente': _codificar_cursor(filas[-1], campo) if filas else '',
+    }
+
+
+def contexto_inventario(request, ubicacion, tamano=TAMANO_PAGINA):
+    """Contexto común de los listados de inventario de un almacén"""
+    filtros = leer_filtros(request.GET)
+
+    productos = ProductoAlmacen.objects.filter(
+        ubicacion_almacen=ubicacion
+    ).select_related('unidad', 'reabastecimiento')
+    productos = filtrar_productos(productos, filtros)
+
+    pagina = paginar_keyset(
+        productos,
+        filtros['orden'],
+        despues=request.GET.get('despues'),
+        antes=request.GET.get('antes'),
+        tamano=tamano,
+    )
+
+    activos = {clave: valor for clave, valor in filtros.items() if valor}
+    if activos.get('orden') == ORDEN_DEFECTO:
+        del activos['orden']
+
+    return {
+        **pagina,
+        'total_pagina': len(pagina['productos']),
+        'filtros': filtros,
+        'hay_filtros': any(clave != 'orden' for clave in activos),
+        'filtros_querystring': urlencode(activos),
+        'ordenamientos': [(clave, etiqueta) for clave, (_, _, etiqueta) in ORDENAMIENTOS.items()],
+        'estados': ProductoAlmacen.ESTADO_CHOICES,
+        'unidades': Unidad.objects.filter(activo=True).order_by('nombre'),
+    }
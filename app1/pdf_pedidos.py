@@ -0,0 +1,155 @@
+"""
+PDF de los pedidos de compra guardados.
+
+Arma los datos del pedido desde la base y los genera con servicio_pdf. El
+PDF se cachea en disco con el nombre PC-<id>-<versión>.pdf, donde la
+versión es la de VersionRecurso (clave_pedido), que las señales incrementan
+al cambiar el pedido, sus items o sus cotizaciones, y también el código,
+nombre o unidad de sus productos (ver invalidar_items). La caché está fuera
+de MEDIA_ROOT para que un servidor que publique /media/ no la exponga. Un
+acierto de caché se
+sirve leyendo solo el contador y el archivo, sin consultar el pedido ni
+ejecutar reportlab.
+"""
+import glob
+import os
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import servicio_pdf, versiones
+from .models import ItemPedido, PedidoCompra
+
+
+def datos_pedido(pedido):
+    """(info, productos) de un pedido guardado para renderizar"""
+    fecha = lambda valor: timezone.localtime(valor).strftime('%d/%m/%Y %H:%M') if valor else '—'
+    info = [
+        ['Código:', f'PC-{pedido.id_pedido:04d}'],
+        ['Nombre del Pedido:', pedido.nombre],
+        ['Estado:', pedido.get_estado_display()],
+        ['Fecha de Creación:', fecha(pedido.fecha_creacion)],
+        ['Última Modificación:', fecha(pedido.fecha_modificacion)],
+        ['Descripción:', pedido.descripcion if pedido.descripcion else 'Sin descripción'],
+    ]
+    cotizacion = pedido.cotizacion_seleccionada()
+    if cotizacion:
+        info.append(['Cotización Seleccionada:', f'{cotizacion.proveedor} - S/. {cotizacion.monto:.2f}'])
+    if pedido.fecha_entrega:
+        info.append(['Fecha de Entrega:', fecha(pedido.fecha_entrega)])
+
+    productos = [
+        {
+            'codigo': item.producto.codigo_producto,
+            'nombre': item.producto.nombre,
+            'cantidad': item.cantidad_solicitada,
+            'unidad': item.producto.unidad.abreviatura or item.producto.unidad.nombre,
+            'precio': item.precio_unitario,
+        }
+        for item in pedido.items.select_related('producto__unidad')
+    ]
+    return info, productos
+
+
+# ==============================================================================
+# CACHÉ EN DISCO
+# ==============================================================================
+
+def _directorio():
+    return settings.PDF_PEDIDOS_DIR
+
+
+def version(id_pedido):
+    """Versión actual del pedido (etag de VersionRecurso) y su fecha"""
+    return versiones.leer([versiones.clave_pedido(id_pedido)])
+
+
+def ruta_cache(id_pedido, etag):
+    return os.path.join(_directorio(), f'PC-{id_pedido:04d}-{etag[:16]}.pdf')
+
+
+def obtener(id_pedido):
+    """
+    Ruta del PDF del pedido en su versión actual; lo genera si no está en
+    caché. Lanza PedidoCompra.DoesNotExist si el pedido no existe.
+    """
+    # La versión se lee antes que los datos: si el pedido cambia mientras
+    # se genera, el archivo queda con la versión vieja y no se vuelve a usar
+    etag, _ = version(id_pedido)
+    ruta = ruta_cache(id_pedido, etag)
+    if os.path.exists(ruta):
+        return ruta
+
+    pedido = PedidoCompra.objects.con_resumen().get(id_pedido=id_pedido)
+    _guardar(id_pedido, ruta, servicio_pdf.generar(*datos_pedido(pedido)))
+    return ruta
+
+
+def obtener_varios(pedidos):
+    """
+    Genera (pedido, ruta del PDF) para cada pedido, en orden. `pedidos` debe
+    venir de con_resumen(). Las versiones se leen en una sola consulta y los
+    PDF que no están en caché se generan en paralelo en el pool de
+    servicio_pdf, con hasta 2 * PDF_WORKERS en curso por delante del que se
+    está entregando.
+    """
+    pedidos = list(pedidos)
+    etags = versiones.leer_por_clave([versiones.clave_pedido(pedido.pk) for pedido in pedidos])
+    hilos_max = max(1, settings.PDF_WORKERS)
+    en_curso = deque()
+
+    def entregar():
+        pedido, ruta, futuro = en_curso.popleft()
+        if futuro is not None:
+            _guardar(pedido.pk, ruta, futuro.result())
+        return pedido, ruta
+
+    # Los hilos solo esperan al pool de procesos: no tocan la base
+    hilos = ThreadPoolExecutor(max_workers=hilos_max, thread_name_prefix='pdf_pedidos')
+    try:
+        for pedido in pedidos:
+            ruta = ruta_cache(pedido.pk, etags[versiones.clave_pedido(pedido.pk)])
+            futuro = None
+            if not os.path.exists(ruta):
+                futuro = hilos.submit(servicio_pdf.generar, *datos_pedido(pedido))
+            en_curso.append((pedido, ruta, futuro))
+            if len(en_curso) > 2 * hilos_max:
+                yield entregar()
+        while en_curso:
+            yield entregar()
+    finally:
+        hilos.shutdown(wait=False, cancel_futures=True)
+
+
+def _guardar(id_pedido, ruta, contenido):
+    os.makedirs(_directorio(), exist_ok=True)
+    # Escritura atómica: un lector concurrente nunca ve un PDF a medias
+    descriptor, temporal = tempfile.mkstemp(dir=_directorio(), suffix='.tmp')
+    with os.fdopen(descriptor, 'wb') as archivo:
+        archivo.write(contenido)
+    os.replace(temporal, ruta)
+    borrar_cache(id_pedido, excepto=ruta)
+
+
+def invalidar_items(items):
+    """
+    Incrementa la versión de los pedidos de esos items (queryset de
+    ItemPedido): su PDF muestra el código, nombre y unidad del producto.
+    """
+    pedidos = items.order_by().values_list('pedido_id', flat=True).distinct()
+    claves = [versiones.clave_pedido(id_pedido) for id_pedido in pedidos]
+    if claves:
+        versiones.incrementar(*claves)
+
+
+def borrar_cache(id_pedido, excepto=None):
+    """Elimina los PDF en caché del pedido (salvo `excepto`)"""
+    for ruta in glob.glob(os.path.join(_directorio(), f'PC-{id_pedido:04d}-*.pdf')):
+        if ruta != excepto:
+            try:
+                os.remove(ruta)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,159 @@
+"""
+Punto de reorden por producto a partir de la velocidad de consumo.
+
+`actualizar_reabastecimiento()` lee solo los movimientos SALIDA / PRESTAMO
+con id mayor al último procesado, los agrega por producto con pandas (un
+groupby por lote, sin bucles por producto) y acumula el resultado en
+ReabastecimientoProducto. Después recalcula en bloque el consumo diario,
+los días hasta agotar y la marca de reposición de todos los productos con
+consumo.
+"""
+import math
+
+import pandas as pd
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import MovimientoInventario, ProductoAlmacen, ReabastecimientoProducto, ProcesoIncremental
+
+PROCESO = 'reabastecimiento'
+TIPOS_CONSUMO = ('SALIDA', 'PRESTAMO')
+TAMANO_LOTE = 50000
+
+_COLUMNAS_MOVIMIENTO = ['id', 'producto_id', 'cantidad', 'fecha_movimiento']
+
+
+def _fecha(valor):
+    return None if pd.isna(valor) else valor.to_pydatetime()
+
+
+def _consumo_por_producto(desde_id, hasta_id, tamano_lote):
+    """
+    Consumo nuevo agregado por producto (consumo, primer y último consumo)
+    recorriendo (desde_id, hasta_id] por lotes de ids.
+    """
+    parciales = []
+    ultimo_id = desde_id
+    while ultimo_id < hasta_id:
+        lote = list(
+            MovimientoInventario.objects.filter(
+                id__gt=ultimo_id, id__lte=hasta_id, tipo_movimiento__in=TIPOS_CONSUMO
+            ).order_by('id').values_list(*_COLUMNAS_MOVIMIENTO)[:tamano_lote]
+        )
+        if not lote:
+            break
+        df = pd.DataFrame.from_records(lote, columns=_COLUMNAS_MOVIMIENTO)
+        ultimo_id = int(df['id'].iloc[-1])
+        df['cantidad'] = df['cantidad'].abs()
+        parciales.append(df.groupby('producto_id').agg(
+            consumo=('cantidad', 'sum'),
+            primer=('fecha_movimiento', 'min'),
+            ultimo=('fecha_movimiento', 'max'),
+        ))
+        if len(lote) < tamano_lote:
+            break
+
+    if not parciales:
+        return pd.DataFrame(columns=['consumo', 'primer', 'ultimo'])
+    return pd.concat(parciales).groupby(level=0).agg({'consumo': 'sum', 'primer': 'min', 'ultimo': 'max'})
+
+
+def _acumular(nuevo):
+    """Suma el consumo nuevo al ya guardado y devuelve las filas a escribir"""
+    existentes = pd.DataFrame.from_records(
+        ReabastecimientoProducto.objects.filter(producto_id__in=list(nuevo.index)).values_list(
+            'producto_id', 'consumo_total', 'fecha_primer_consumo', 'fecha_ultimo_consumo'
+        ),
+        columns=['producto_id', 'consumo', 'primer', 'ultimo'],
+    ).set_index('producto_id')
+    return pd.concat([existentes, nuevo]).groupby(level=0).agg({'consumo': 'sum', 'primer': 'min', 'ultimo': 'max'})
+
+
+def _recalcular_indicadores(ahora, dias_reposicion):
+    """Consumo diario, días hasta agotar y punto de reorden, vectorizado sobre toda la tabla"""
+    df = pd.DataFrame.from_records(
+        ReabastecimientoProducto.objects.values_list(
+            'producto_id', 'consumo_total', 'fecha_primer_consumo', 'fecha_ultimo_consumo', 'producto__cantidad'
+        ),
+        columns=['producto_id', 'consumo', 'primer', 'ultimo', 'cantidad'],
+    )
+    if df.empty:
+        return []
+
+    dias_activos = ((pd.Timestamp(ahora) - pd.to_datetime(df['primer'], utc=True)).dt.total_seconds() / 86400).clip(lower=1)
+    df['consumo_diario'] = df['consumo'] / dias_activos
+    df['dias_hasta_agotar'] = (df['cantidad'] / df['consumo_diario']).where(df['consumo_diario'] > 0)
+    df['punto_reorden'] = (df['consumo_diario'] * dias_reposicion).apply(math.ceil)
+    df['requiere_reposicion'] = (df['consumo_diario'] > 0) & (df['cantidad'] <= df['punto_reorden'])
+
+    return [
+        ReabastecimientoProducto(
+            producto_id=int(fila.producto_id),
+            consumo_total=int(fila.consumo),
+            fecha_primer_consumo=_fecha(fila.primer),
+            fecha_ultimo_consumo=_fecha(fila.ultimo),
+            consumo_diario=float(fila.consumo_diario),
+            dias_hasta_agotar=None if pd.isna(fila.dias_hasta_agotar) else float(fila.dias_hasta_agotar),
+            punto_reorden=int(fila.punto_reorden),
+            requiere_reposicion=bool(fila.requiere_reposicion),
+            fecha_calculo=ahora,
+        )
+        for fila in df.itertuples(index=False)
+    ]
+
+
+def actualizar_reabastecimiento(tamano_lote=TAMANO_LOTE, dias_reposicion=None):
+    """
+    Procesa los movimientos nuevos y recalcula los indicadores. Devuelve
+    (productos con consumo nuevo, productos recalculados).
+    """
+    if dias_reposicion is None:
+        dias_reposicion = settings.DIAS_REPOSICION
+    ahora = timezone.now()
+
+    with transaction.atomic():
+        proceso, _ = ProcesoIncremental.objects.select_for_update().get_or_create(nombre=PROCESO)
+        hasta_id = MovimientoInventario.objects.aggregate(ultimo=Max('id'))['ultimo'] or 0
+
+        nuevo = _consumo_por_producto(proceso.ultimo_id, hasta_id, tamano_lote)
+        if not nuevo.empty:
+            acumulado = _acumular(nuevo)
+            ReabastecimientoProducto.objects.bulk_create(
+                [
+                    ReabastecimientoProducto(
+                        producto_id=int(producto_id),
+                        consumo_total=int(fila.consumo),
+                        fecha_primer_consumo=_fecha(fila.primer),
+                        fecha_ultimo_consumo=_fecha(fila.ultimo),
+                    )
+                    for producto_id, fila in acumulado.iterrows()
+                ],
+                update_conflicts=True,
+                unique_fields=['producto'],
+                update_fields=['consumo_total', 'fecha_primer_consumo', 'fecha_ultimo_consumo'],
+            )
+
+        filas = _recalcular_indicadores(ahora, dias_reposicion)
+        ReabastecimientoProducto.objects.bulk_update(
+            filas,
+            ['consumo_diario', 'dias_hasta_agotar', 'punto_reorden', 'requiere_reposicion', 'fecha_calculo'],
+            batch_size=500,
+        )
+
+        proceso.ultimo_id = hasta_id
+        proceso.fecha_ejecucion = ahora
+        proceso.save()
+
+    return len(nuevo), len(filas)
+
+
+def productos_para_reponer(ubicacion=None):
+    """Productos marcados para reponer, los más urgentes primero"""
+    productos = ProductoAlmacen.objects.filter(
+        reabastecimiento__requiere_reposicion=True
+    ).select_related('unidad', 'reabastecimiento').order_by('reabastecimiento__dias_hasta_agotar')
+    if ubicacion:
+        productos = productos.filter(ubicacion_almacen=ubicacion)
+    return productos
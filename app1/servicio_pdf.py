@@ -0,0 +1,313 @@
+"""
+Servicio de generación de PDF de pedidos de compra.
+
+El maquetado con reportlab es CPU puro y no toca la base: se ejecuta en un
+pool de procesos (PDF_WORKERS) para que un pedido de miles de líneas no
+ocupe el hilo del request ni compita por el GIL con los demás. Con
+PDF_WORKERS = 0 se genera en el mismo proceso.
+
+Este módulo no importa modelos: los procesos hijos solo cargan reportlab.
+La tabla de productos es una LongTable que repite el encabezado en cada
+página.
+"""
+import io
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from functools import lru_cache
+from threading import Lock
+
+from django.conf import settings
+
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.lib.units import inch
+from reportlab.lib.utils import simpleSplit
+from reportlab.platypus import SimpleDocTemplate, Table, LongTable, TableStyle, Paragraph, Spacer, PageBreak
+
+ENCABEZADOS = ['N°', 'Código', 'Producto', 'Cantidad', 'Unidad', 'Precio Unit.', 'Subtotal']
+ANCHOS_PRODUCTOS = [0.4*inch, 1*inch, 2.5*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch]
+
+# Márgenes de la página y relleno del marco de SimpleDocTemplate (sus
+# valores por defecto, fijados aquí porque _tramos calcula con ellos)
+MARGEN = inch
+RELLENO_MARCO = 6
+ANCHO_MARCO = letter[0] - 2 * MARGEN - 2 * RELLENO_MARCO
+ALTO_MARCO = letter[1] - 2 * MARGEN - 2 * RELLENO_MARCO
+
+# Relleno izquierdo y derecho de las celdas de Table (por defecto)
+RELLENO_CELDA = 6
+# Ancho útil de la columna Producto: los nombres más largos se parten en líneas
+ANCHO_NOMBRE = ANCHOS_PRODUCTOS[2] - 2 * RELLENO_CELDA
+
+# Hasta este número de líneas la tabla va entera y reportlab la parte;
+# más allá se reparte por página de antemano (ver _tramos)
+FILAS_SIN_TRAMOS = 500
+
+
+@lru_cache(maxsize=None)
+def _estilos():
+    """Estilos de párrafo y de tabla (se crean una vez por proceso)"""
+    muestras = getSampleStyleSheet()
+    return {
+        'titulo': ParagraphStyle(
+            'CustomTitle',
+            parent=muestras['Heading1'],
+            fontSize=20,
+            textColor=colors.HexColor('#148129'),
+            spaceAfter=30,
+            alignment=TA_CENTER
+        ),
+        'subtitulo': muestras['Heading2'],
+        'normal': muestras['Normal'],
+        'info': TableStyle([
+            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f5f5f5')),
+            ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
+            ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
+            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, 0), (-1, -1), 10),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
+            ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ]),
+        'productos': _estilo_productos(con_total=True),
+        'productos_parcial': _estilo_productos(con_total=False),
+    }
+
+
+def _estilo_productos(con_total):
+    """Estilo de la tabla de productos; sin total para los tramos intermedios"""
+    fin = -2 if con_total else -1
+    comandos = [
+        # Header
+        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#148129')),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 10),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+
+        # Body
+        ('TEXTCOLOR', (0, 1), (-1, fin), colors.black),
+        ('ALIGN', (0, 1), (0, fin), 'CENTER'),  # N°
+        ('ALIGN', (1, 1), (1, fin), 'LEFT'),    # Código
+        ('ALIGN', (2, 1), (2, fin), 'LEFT'),    # Producto
+        ('ALIGN', (3, 1), (3, fin), 'CENTER'),  # Cantidad
+        ('ALIGN', (4, 1), (4, fin), 'CENTER'),  # Unidad
+        ('ALIGN', (5, 1), (-1, fin), 'RIGHT'),  # Precios
+        ('FONTNAME', (0, 1), (-1, fin), 'Helvetica'),
+        ('FONTSIZE', (0, 1), (-1, fin), 9),
+    ]
+    if con_total:
+        comandos += [
+            # Total row
+            ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#f5f5f5')),
+            ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
+            ('FONTSIZE', (0, -1), (-1, -1), 11),
+            ('ALIGN', (0, -1), (-2, -1), 'RIGHT'),
+            ('ALIGN', (-1, -1), (-1, -1), 'RIGHT'),
+        ]
+    comandos += [
+        # Grid
+        ('GRID', (0, 0), (-1, -1), 1, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+    ]
+    return TableStyle(comandos)
+
+
+def _encabezado(info):
+    estilos = _estilos()
+    info_table = Table([list(fila) for fila in info], colWidths=[2*inch, 4.5*inch])
+    info_table.setStyle(estilos['info'])
+    return [
+        Paragraph("PEDIDO DE COMPRA", estilos['titulo']),
+        info_table,
+        Spacer(1, 20),
+        Paragraph("PRODUCTOS SOLICITADOS", estilos['subtitulo']),
+        Spacer(1, 10),
+    ]
+
+
+def _documento(destino):
+    return SimpleDocTemplate(
+        destino, pagesize=letter,
+        leftMargin=MARGEN, rightMargin=MARGEN, topMargin=MARGEN, bottomMargin=MARGEN,
+    )
+
+
+def _alto(elementos):
+    """Alto (puntos) que ocupan `elementos` al comienzo de una página"""
+    total = 0
+    for numero, elemento in enumerate(elementos):
+        # Arriba del marco no se deja el espacio previo del primero
+        if numero:
+            total += elemento.getSpaceBefore()
+        total += elemento.wrap(ANCHO_MARCO, ALTO_MARCO)[1] + elemento.getSpaceAfter()
+    return total
+
+
+@lru_cache(maxsize=None)
+def _altos_filas():
+    """Alto (puntos) del encabezado, de una fila y de cada línea adicional de la tabla"""
+    def alto(filas):
+        tabla = Table(filas, colWidths=ANCHOS_PRODUCTOS)
+        tabla.setStyle(_estilos()['productos_parcial'])
+        return tabla.wrap(ANCHO_MARCO, ALTO_MARCO)[1]
+
+    una, dos = alto([ENCABEZADOS, ['1'] * 7]), alto([ENCABEZADOS, ['1'] * 7, ['1'] * 7])
+    dos_lineas = alto([ENCABEZADOS, ['1'] * 2 + ['1\n1'] + ['1'] * 4])
+    return una - (dos - una), dos - una, dos_lineas - una
+
+
+def _celda_nombre(nombre):
+    """El nombre partido en líneas que caben en la columna Producto"""
+    return '\n'.join(simpleSplit(nombre, 'Helvetica', 9, ANCHO_NOMBRE)) or nombre
+
+
+def _tramos(filas, info):
+    """
+    Reparte las filas en tramos que llenan una página cada uno.
+
+    Partir una sola tabla de miles de filas cuesta O(n) por página (reportlab
+    vuelve a crear la tabla con el resto), o sea O(n²) en total. Se mide el
+    alto de cada fila (una línea, o las que ocupe un nombre largo) y se llenan
+    la primera página (debajo del encabezado del pedido) y las siguientes; si
+    aun así un tramo no entrara, LongTable lo parte como siempre.
+    """
+    alto_encabezado, alto_fila, alto_linea = _altos_filas()
+    disponible = ALTO_MARCO - _alto(_encabezado(info)) - alto_encabezado
+    if disponible < alto_fila:
+        # El encabezado del pedido llena la primera página
+        disponible = ALTO_MARCO - alto_encabezado
+
+    tramos = [[]]
+    usado = 0
+    for fila in filas:
+        alto = alto_fila + fila[2].count('\n') * alto_linea
+        if tramos[-1] and usado + alto > disponible:
+            tramos.append([])
+            usado = 0
+            disponible = ALTO_MARCO - alto_encabezado
+        tramos[-1].append(fila)
+        usado += alto
+    return tramos
+
+
+def renderizar(destino, info, productos):
+    """
+    Escribe el PDF en `destino` (archivo o respuesta). `info` son filas
+    (etiqueta, valor) del encabezado; `productos` son dicts con codigo,
+    nombre, cantidad, unidad y precio.
+    """
+    estilos = _estilos()
+    doc = _documento(destino)
+    elements = _encabezado(info)
+
+    filas = []
+    total_general = 0
+    for i, producto in enumerate(productos, 1):
+        subtotal = producto['cantidad'] * producto['precio']
+        total_general += subtotal
+        filas.append([
+            str(i),
+            producto['codigo'],
+            _celda_nombre(producto['nombre']),
+            str(producto['cantidad']),
+            producto['unidad'],
+            f"S/. {producto['precio']:.2f}",
+            f"S/. {subtotal:.2f}"
+        ])
+    fila_total = ['', '', '', '', '', 'TOTAL:', f"S/. {total_general:.2f}"]
+
+    # LongTable con repeatRows: si la tabla se parte, cada página repite el
+    # encabezado
+    if len(filas) <= FILAS_SIN_TRAMOS:
+        products_table = LongTable([ENCABEZADOS] + filas + [fila_total], colWidths=ANCHOS_PRODUCTOS, repeatRows=1)
+        products_table.setStyle(estilos['productos'])
+        elements.append(products_table)
+    else:
+        tramos = _tramos(filas, info)
+        for numero, tramo in enumerate(tramos, 1):
+            ultimo = numero == len(tramos)
+            datos = [ENCABEZADOS] + tramo + ([fila_total] if ultimo else [])
+            tabla = LongTable(datos, colWidths=ANCHOS_PRODUCTOS, repeatRows=1)
+            tabla.setStyle(estilos['productos' if ultimo else 'productos_parcial'])
+            elements.append(tabla)
+            if not ultimo:
+                elements.append(PageBreak())
+    elements.append(Spacer(1, 30))
+
+    footer_text = f"Total de productos: {len(productos)} | Total general: S/. {total_general:.2f}"
+    elements.append(Paragraph(footer_text, estilos['normal']))
+
+    doc.build(elements)
+
+
+def renderizar_bytes(info, productos):
+    """El PDF completo como bytes (función de nivel de módulo para el pool)"""
+    contenido = io.BytesIO()
+    renderizar(contenido, info, productos)
+    return contenido.getvalue()
+
+
+def datos_navegador(data):
+    """(info, productos) del PDF del wizard a partir del JSON que envía el navegador"""
+    descripcion = data.get('descripcion', '')
+    info = [
+        ['Nombre del Pedido:', data.get('nombre', 'Pedido de Compra')],
+        ['Fecha de Generación:', datetime.now().strftime('%d/%m/%Y %H:%M')],
+        ['Descripción:', descripcion if descripcion else 'Sin descripción'],
+    ]
+    return info, data.get('productos', [])
+
+
+# ==============================================================================
+# POOL DE PROCESOS
+# ==============================================================================
+
+_pool = None
+_pool_lock = Lock()
+
+
+def _ejecutor():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: los hijos no heredan conexiones ni hilos del servidor
+            _pool = ProcessPoolExecutor(
+                max_workers=settings.PDF_WORKERS,
+                mp_context=multiprocessing.get_context('spawn'),
+            )
+        return _pool
+
+
+def _descartar_pool(roto):
+    global _pool
+    with _pool_lock:
+        if _pool is roto:
+            _pool = None
+    roto.shutdown(wait=False, cancel_futures=True)
+
+
+def generar(info, productos):
+    """Genera el PDF en el pool (o en este proceso si PDF_WORKERS = 0) y devuelve sus bytes"""
+    if not settings.PDF_WORKERS:
+        return renderizar_bytes(info, productos)
+    pool = _ejecutor()
+    try:
+        return pool.submit(renderizar_bytes, info, productos).result(timeout=settings.PDF_TIMEOUT)
+    except BrokenProcessPool:
+        # Un hijo murió (p. ej. por memoria): se crea otro pool y se reintenta una vez
+        _descartar_pool(pool)
+        return _ejecutor().submit(renderizar_bytes, info, productos).result(timeout=settings.PDF_TIMEOUT)
+
+
+def cerrar():
+    """Detiene el pool (se vuelve a crear en el siguiente generar)"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown(wait=True)
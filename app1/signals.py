@@ -0,0 +1,219 @@
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+
+from . import almacenamiento, analitica_compras, busqueda, pdf_pedidos, versiones
+from .estados_stock import recalcular_estados
+from .models import (
+    ProductoAlmacen, Alumno, Salon, PedidoCompra, ItemPedido, Cotizacion, Unidad, UtilEscolar, EntregaUtil
+)
+
+
+# ÍNDICE DE BÚSQUEDA - mantener busqueda_fts al día con cada alta, cambio o baja
+
+@receiver(post_save, sender=ProductoAlmacen)
+@receiver(post_save, sender=Alumno)
+@receiver(post_save, sender=Salon)
+@receiver(post_save, sender=PedidoCompra)
+def indexar_busqueda(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    busqueda.indexar(instance)
+
+
+@receiver(post_delete, sender=ProductoAlmacen)
+@receiver(post_delete, sender=Alumno)
+@receiver(post_delete, sender=Salon)
+@receiver(post_delete, sender=PedidoCompra)
+def desindexar_busqueda(sender, instance, **kwargs):
+    busqueda.desindexar(instance)
+
+
+# ESTADO DE STOCK - un cambio en el umbral de la unidad afecta a sus productos
+
+@receiver(post_save, sender=Unidad)
+def recalcular_estados_unidad(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    recalcular_estados(ProductoAlmacen.objects.filter(unidad=instance))
+
+
+# VERSIONES - invalidar los ETag de los endpoints JSON consultados por polling
+
+@receiver(post_init, sender=Alumno)
+@receiver(post_init, sender=UtilEscolar)
+def recordar_salon(sender, instance, **kwargs):
+    # Al cambiar de salón también queda desactualizado el salón anterior
+    instance._salon_guardado = instance.__dict__.get('salon_id')
+
+
+def _salones(instance):
+    salones = {instance.salon_id, instance._salon_guardado} - {None}
+    instance._salon_guardado = instance.salon_id
+    return salones
+
+
+@receiver(post_save, sender=Alumno)
+@receiver(post_delete, sender=Alumno)
+def version_alumnos_salon(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    claves = [versiones.clave_alumnos_salon(salon_id) for salon_id in _salones(instance)]
+    if claves:
+        versiones.incrementar(*claves)
+
+
+@receiver(post_save, sender=EntregaUtil)
+@receiver(post_delete, sender=EntregaUtil)
+def version_entregas_alumno(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    versiones.incrementar(versiones.clave_entregas_alumno(instance.alumno_id))
+
+
+@receiver(post_save, sender=UtilEscolar)
+@receiver(post_delete, sender=UtilEscolar)
+def version_utiles_salon(sender, instance, created=False, raw=False, **kwargs):
+    # El útil, su nombre y su cantidad forman parte del estado de cada alumno
+    salones = _salones(instance)
+    if raw or created:
+        return
+    alumnos = Alumno.objects.filter(salon_id__in=salones).values_list('pk', flat=True)
+    claves = [versiones.clave_entregas_alumno(alumno_id) for alumno_id in alumnos]
+    if claves:
+        versiones.incrementar(*claves)
+
+
+# PDF DE PEDIDOS - el PDF en caché depende del pedido, sus items y cotizaciones
+
+@receiver(post_save, sender=PedidoCompra)
+def version_pedido(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    versiones.incrementar(versiones.clave_pedido(instance.pk))
+
+
+@receiver(post_save, sender=ItemPedido)
+@receiver(post_delete, sender=ItemPedido)
+@receiver(post_save, sender=Cotizacion)
+@receiver(post_delete, sender=Cotizacion)
+def version_pedido_detalle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    versiones.incrementar(versiones.clave_pedido(instance.pedido_id))
+
+
+@receiver(post_delete, sender=PedidoCompra)
+def borrar_pdf_pedido(sender, instance, **kwargs):
+    pdf_pedidos.borrar_cache(instance.pk)
+
+
+# Datos del producto que aparecen en el PDF del pedido
+CAMPOS_PDF_PRODUCTO = ('codigo_producto', 'nombre', 'unidad_id')
+
+
+def _datos_pdf(instance):
+    # Sin pasar por el descriptor: en post_init no debe cargar campos diferidos
+    return tuple(instance.__dict__.get(campo) for campo in CAMPOS_PDF_PRODUCTO)
+
+
+@receiver(post_init, sender=ProductoAlmacen)
+def recordar_datos_pdf(sender, instance, **kwargs):
+    instance._datos_pdf = _datos_pdf(instance)
+
+
+@receiver(post_save, sender=ProductoAlmacen)
+def version_pedidos_producto(sender, instance, created, raw=False, **kwargs):
+    # Los cambios de stock (lo más frecuente) no tocan el PDF: solo código, nombre o unidad
+    actuales = _datos_pdf(instance)
+    if not (raw or created) and actuales != instance._datos_pdf:
+        pdf_pedidos.invalidar_items(ItemPedido.objects.filter(producto=instance))
+    instance._datos_pdf = actuales
+
+
+@receiver(post_save, sender=Unidad)
+def version_pedidos_unidad(sender, instance, created, raw=False, **kwargs):
+    if raw or created:
+        return
+    pdf_pedidos.invalidar_items(ItemPedido.objects.filter(producto__unidad=instance))
+
+
+# ANALÍTICA DE COMPRAS - marcar el mes del pedido para recalcular sus resúmenes
+
+@receiver(post_save, sender=PedidoCompra)
+@receiver(post_delete, sender=PedidoCompra)
+def marcar_mes_pedido(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    analitica_compras.marcar(instance.fecha_creacion)
+
+
+@receiver(post_save, sender=ItemPedido)
+@receiver(post_delete, sender=ItemPedido)
+@receiver(post_save, sender=Cotizacion)
+@receiver(post_delete, sender=Cotizacion)
+def marcar_mes_detalle(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    analitica_compras.marcar_pedido(instance.pedido_id)
+
+
+# DOCUMENTOS - liberar la referencia al contenido al borrar o reemplazar un documento
+
+CAMPOS_DOCUMENTO = {
+    PedidoCompra: ('archivo', 'documento_entrega'),
+    Cotizacion: ('documento',),
+}
+
+
+def _nombre_documento(instance, campo):
+    # Sin pasar por el descriptor: en post_init no debe cargar campos diferidos
+    valor = instance.__dict__.get(campo)
+    return getattr(valor, 'name', valor) or None
+
+
+def _liberar(nombre):
+    if almacenamiento.sha256_de(nombre):
+        transaction.on_commit(lambda: almacenamiento.documentos.delete(nombre))
+
+
+@receiver(post_init, sender=PedidoCompra)
+@receiver(post_init, sender=Cotizacion)
+def recordar_documentos(sender, instance, **kwargs):
+    instance._documentos_guardados = {
+        campo: _nombre_documento(instance, campo) for campo in CAMPOS_DOCUMENTO[sender]
+    }
+
+
+@receiver(pre_save, sender=PedidoCompra)
+@receiver(pre_save, sender=Cotizacion)
+def marcar_documentos_subidos(sender, instance, raw=False, **kwargs):
+    # Un archivo sin confirmar se guarda en este save() y suma una referencia,
+    # aunque su nombre coincida con el anterior (mismo contenido y nombre)
+    instance._documentos_subidos = {
+        campo for campo in CAMPOS_DOCUMENTO[sender]
+        if campo in instance.__dict__ and getattr(instance, campo) and not getattr(instance, campo)._committed
+    }
+
+
+@receiver(post_save, sender=PedidoCompra)
+@receiver(post_save, sender=Cotizacion)
+def liberar_documentos_reemplazados(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    subidos = getattr(instance, '_documentos_subidos', set())
+    for campo, anterior in instance._documentos_guardados.items():
+        if campo not in instance.__dict__:
+            continue
+        actual = _nombre_documento(instance, campo)
+        if anterior and (campo in subidos or anterior != actual):
+            _liberar(anterior)
+        instance._documentos_guardados[campo] = actual
+    instance._documentos_subidos = set()
+
+
+@receiver(post_delete, sender=PedidoCompra)
+@receiver(post_delete, sender=Cotizacion)
+def liberar_documentos(sender, instance, **kwargs):
+    for campo in CAMPOS_DOCUMENTO[sender]:
+        _liberar(_nombre_documento(instance, campo))
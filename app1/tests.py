@@ -1,3 +1,429 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from app1 import almacenamiento, descargas, lector_excel, paginacion, trabajos, validacion_excel
+from app1.importacion import COLUMNAS_REQUERIDAS, TAMANO_LOTE
+from app1.models import (
+    ContenidoArchivo, Cotizacion, ItemPedido, PedidoCompra, ProductoAlmacen, SecuenciaProducto, TrabajoImportacion,
+    Unidad,
+)
+
+
+def _excel(*filas):
+    libro = openpyxl.Workbook()
+    hoja = libro.active
+    for fila in filas:
+        hoja.append(fila)
+    archivo = io.BytesIO()
+    libro.save(archivo)
+    archivo.seek(0)
+    return archivo
+
+
+class ValidacionExcelTests(TestCase):
+
+    def test_solo_encabezado(self):
+        df = validacion_excel.leer_dataframe(_excel(COLUMNAS_REQUERIDAS + ['stock_minimo']))
+        errores, resumen = validacion_excel.validar(df)
+        self.assertEqual(resumen['filas'], 0)
+        self.assertEqual(resumen['errores'], 0)
+        self.assertTrue(errores.empty)
+
+    def test_codigos_existentes_por_lotes(self):
+        unidad = Unidad.objects.create(nombre='Unidad', abreviatura='und')
+        ProductoAlmacen.objects.create(
+            codigo_producto='EXISTE', codigo_almacen='01', nombre='P', ubicacion_almacen='AG', cantidad=1, unidad=unidad
+        )
+        filas = [['01', 'EXISTE', 'P', 1, 'und']]
+        filas += [['01', f'NUEVO{i}', 'P', 1, 'und'] for i in range(TAMANO_LOTE)]
+        df = validacion_excel.leer_dataframe(_excel(COLUMNAS_REQUERIDAS, *filas))
+        with self.assertNumQueries(2):
+            _, resumen = validacion_excel.validar(df)
+        self.assertEqual(resumen['existentes'], 1)
+        self.assertEqual(resumen['nuevos'], TAMANO_LOTE)
+
+
+class PaginacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        unidad = Unidad.objects.create(nombre='Unidad')
+        # Cantidades, nombres y fechas repetidos: el desempate es id_producto
+        for i, cantidad in enumerate([3, 1, 2, 1, 3, 2, 1]):
+            ProductoAlmacen.objects.create(
+                codigo_producto=f'01-{7 - i:04d}', nombre=f'P{i % 3}', ubicacion_almacen='AG',
+                cantidad=cantidad, unidad=unidad,
+            )
+        ProductoAlmacen.objects.create(codigo_producto='02-0001', nombre='P0', ubicacion_almacen='AD', unidad=unidad)
+        ProductoAlmacen.objects.filter(cantidad=1).update(fecha_ingreso='2025-01-01T00:00:00Z')
+
+    def _esperado(self, orden):
+        campo, descendente, _ = paginacion.ORDENAMIENTOS[orden]
+        productos = ProductoAlmacen.objects.filter(ubicacion_almacen='AG')
+        return [
+            p.pk for p in sorted(productos, key=lambda p: (getattr(p, campo), p.pk), reverse=descendente)
+        ]
+
+    def _paginas(self, orden, tamano=3):
+        productos = ProductoAlmacen.objects.filter(ubicacion_almacen='AG')
+        paginas = [paginacion.paginar_keyset(productos, orden, tamano=tamano)]
+        while paginas[-1]['hay_siguiente']:
+            paginas.append(paginacion.paginar_keyset(
+                productos, orden, despues=paginas[-1]['cursor_siguiente'], tamano=tamano
+            ))
+        return paginas
+
+    def test_hacia_adelante_recorre_todo_en_orden(self):
+        for orden in paginacion.ORDENAMIENTOS:
+            with self.subTest(orden=orden):
+                paginas = self._paginas(orden)
+                ids = [p.pk for pagina in paginas for p in pagina['productos']]
+                self.assertEqual(ids, self._esperado(orden))
+                self.assertFalse(paginas[0]['hay_anterior'])
+                self.assertTrue(all(pagina['hay_anterior'] for pagina in paginas[1:]))
+
+    def test_hacia_atras_devuelve_la_pagina_anterior(self):
+        productos = ProductoAlmacen.objects.filter(ubicacion_almacen='AG')
+        for orden in paginacion.ORDENAMIENTOS:
+            with self.subTest(orden=orden):
+                paginas = self._paginas(orden)
+                for anterior, pagina in zip(paginas, paginas[1:]):
+                    atras = paginacion.paginar_keyset(productos, orden, antes=pagina['cursor_anterior'], tamano=3)
+                    self.assertEqual(atras['productos'], anterior['productos'])
+                    self.assertTrue(atras['hay_siguiente'])
+                    self.assertEqual(atras['hay_anterior'], anterior is not paginas[0])
+
+    def test_cursor_invalido_vuelve_al_principio(self):
+        productos = ProductoAlmacen.objects.filter(ubicacion_almacen='AG')
+        pagina = paginacion.paginar_keyset(productos, 'cantidad', despues='no-es-un-cursor', tamano=3)
+        self.assertEqual([p.pk for p in pagina['productos']], self._esperado('cantidad')[:3])
+        self.assertFalse(pagina['hay_anterior'])
+
+
+class SecuenciaProductoTests(TestCase):
+
+    def setUp(self):
+        self.unidad = Unidad.objects.create(nombre='Unidad')
+
+    def _producto(self, ubicacion='AG', **campos):
+        return ProductoAlmacen.objects.create(nombre='P', ubicacion_almacen=ubicacion, unidad=self.unidad, **campos)
+
+    def test_codigos_consecutivos_por_almacen(self):
+        codigos = [self._producto().codigo_producto, self._producto().codigo_producto, self._producto('AD').codigo_producto]
+        self.assertEqual(codigos, ['01-0001', '01-0002', '02-0001'])
+
+    def test_continua_desde_el_mayor_codigo_existente(self):
+        self._producto(codigo_producto='01-0041')
+        self._producto(codigo_producto='01-ABC')
+        self.assertEqual(self._producto().codigo_producto, '01-0042')
+
+    def test_otro_proceso_crea_la_secuencia_primero(self):
+        original = SecuenciaProducto._ultimo_numero_existente
+
+        def otro_proceso(ubicacion_almacen):
+            # Mientras este proceso busca el mayor código, otro crea la fila
+            SecuenciaProducto.objects.create(ubicacion_almacen=ubicacion_almacen, ultimo_numero=10)
+            return original(ubicacion_almacen)
+
+        with mock.patch.object(SecuenciaProducto, '_ultimo_numero_existente', side_effect=otro_proceso):
+            self.assertEqual(SecuenciaProducto.reservar('AG'), 11)
+        self.assertEqual(SecuenciaProducto.reservar('AG'), 12)
+
+
+def _media_temporal(test):
+    """MEDIA_ROOT en una carpeta temporal que se borra al terminar el test"""
+    media = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, media, ignore_errors=True)
+    ajustes = override_settings(MEDIA_ROOT=media)
+    ajustes.enable()
+    test.addCleanup(ajustes.disable)
+
+
+class TrabajosImportacionTests(TestCase):
+
+    def setUp(self):
+        _media_temporal(self)
+        Unidad.objects.create(nombre='Unidad', abreviatura='und')
+
+    def _archivo(self, *codigos):
+        filas = [['01', codigo, 'P', 2, 'und'] for codigo in codigos]
+        return SimpleUploadedFile('productos.xlsx', _excel(COLUMNAS_REQUERIDAS, *filas).getvalue())
+
+    def _crear(self, archivo, **opciones):
+        with self.captureOnCommitCallbacks() as encolados:
+            trabajo, duplicado = trabajos.crear_trabajo('PRODUCTOS', archivo, **opciones)
+        return trabajo, duplicado, len(encolados)
+
+    def test_mismo_contenido_es_duplicado(self):
+        primero, duplicado, encolados = self._crear(self._archivo('A', 'B'))
+        self.assertEqual((duplicado, encolados), (False, 1))
+        segundo, duplicado, encolados = self._crear(self._archivo('A', 'B'))
+        self.assertEqual((segundo.pk, duplicado, encolados), (primero.pk, True, 0))
+        forzado, duplicado, _ = self._crear(self._archivo('A', 'B'), forzar=True)
+        self.assertNotEqual(forzado.pk, primero.pk)
+        self.assertFalse(duplicado)
+
+    def test_reanuda_con_error_o_abandonado(self):
+        trabajo, _, _ = self._crear(self._archivo('A'))
+        hace_rato = timezone.now() - timedelta(hours=1)
+        casos = [
+            ('ERROR', None, False),
+            ('PROC', hace_rato, False),
+            ('PROC', timezone.now(), True),
+            ('COMP', None, True),
+        ]
+        for estado, fecha_avance, esperado in casos:
+            with self.subTest(estado=estado, fecha_avance=fecha_avance):
+                TrabajoImportacion.objects.filter(pk=trabajo.pk).update(
+                    estado=estado, fecha_inicio=fecha_avance, fecha_avance=fecha_avance, ultima_fila=3
+                )
+                otro, duplicado, encolados = self._crear(self._archivo('A'))
+                self.assertEqual(otro.pk, trabajo.pk)
+                self.assertEqual((duplicado, encolados), (esperado, 0 if esperado else 1))
+                self.assertEqual(otro.estado, estado if esperado else 'PEND')
+                self.assertEqual(otro.ultima_fila, 3)
+
+    def test_reintentar_solo_reencola_abandonados(self):
+        vivo, _, _ = self._crear(self._archivo('A'))
+        muerto, _, _ = self._crear(self._archivo('B'))
+        TrabajoImportacion.objects.filter(pk=vivo.pk).update(estado='PROC', fecha_avance=timezone.now())
+        TrabajoImportacion.objects.filter(pk=muerto.pk).update(
+            estado='PROC', fecha_avance=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(trabajos.reencolar(TrabajoImportacion.objects.all()), 1)
+        self.assertEqual(TrabajoImportacion.objects.get(pk=vivo.pk).estado, 'PROC')
+        self.assertEqual(TrabajoImportacion.objects.get(pk=muerto.pk).estado, 'PEND')
+
+    def test_continua_desde_ultima_fila(self):
+        trabajo, _, _ = self._crear(self._archivo('A', 'B', 'C'))
+        # Las filas 2 y 3 (A y B) ya se confirmaron antes de la interrupción
+        ProductoAlmacen.objects.create(
+            codigo_producto='A', nombre='P', ubicacion_almacen='AG', cantidad=2, unidad=Unidad.objects.get()
+        )
+        TrabajoImportacion.objects.filter(pk=trabajo.pk).update(ultima_fila=3)
+
+        self.assertTrue(trabajos.ejecutar(trabajo.pk))
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, 'COMP')
+        self.assertEqual(trabajo.ultima_fila, 4)
+        self.assertEqual(trabajo.creados, 1)
+        self.assertEqual(set(ProductoAlmacen.objects.values_list('codigo_producto', 'cantidad')), {('A', 2), ('C', 2)})
+
+    def test_worker_reemplazado_no_escribe(self):
+        trabajo, _, _ = self._crear(self._archivo('A', 'B'))
+        leer_bloques = lector_excel.leer_bloques
+
+        def bloques(*args, **kwargs):
+            # Otro worker da el trabajo por abandonado y lo retoma
+            TrabajoImportacion.objects.filter(pk=trabajo.pk).update(fecha_inicio=timezone.now() + timedelta(hours=1))
+            return leer_bloques(*args, **kwargs)
+
+        with mock.patch.object(lector_excel, 'leer_bloques', side_effect=bloques), \
+                self.assertLogs('app1.trabajos', 'WARNING'):
+            self.assertFalse(trabajos.ejecutar(trabajo.pk))
+        self.assertFalse(ProductoAlmacen.objects.exists())
+        trabajo.refresh_from_db()
+        self.assertEqual((trabajo.estado, trabajo.ultima_fila), ('PROC', 0))
+
+
+class TotalesPedidoTests(TestCase):
+
+    def setUp(self):
+        unidad = Unidad.objects.create(nombre='Unidad')
+        self.producto = ProductoAlmacen.objects.create(nombre='P', ubicacion_almacen='AG', unidad=unidad)
+        self.pedido = PedidoCompra.objects.create(nombre='Pedido')
+
+    def _item(self, cantidad, precio):
+        return ItemPedido.objects.create(
+            pedido=self.pedido, producto=self.producto, cantidad_solicitada=cantidad, precio_unitario=Decimal(precio)
+        )
+
+    def test_ajustar_totales_suma_diferencias(self):
+        PedidoCompra.ajustar_totales(self.pedido.pk, items=2, monto=Decimal('10.50'), cotizaciones=1)
+        PedidoCompra.ajustar_totales(self.pedido.pk, items=-1, monto=Decimal('-0.25'))
+        pedido = PedidoCompra.objects.get(pk=self.pedido.pk)
+        self.assertEqual((pedido.total_items, pedido.total_general, pedido.total_cotizaciones), (1, Decimal('10.25'), 1))
+
+    def test_save_no_pisa_los_totales(self):
+        leido = PedidoCompra.objects.get(pk=self.pedido.pk)
+        PedidoCompra.ajustar_totales(self.pedido.pk, items=1, monto=5)
+        leido.nombre = 'Otro nombre'
+        leido.save()
+        self.assertEqual(PedidoCompra.objects.get(pk=self.pedido.pk).total_items, 1)
+
+    def test_recalcular_totales_corrige_desfase(self):
+        # Items y cotización creados sin ajustar_totales: los totales quedan desfasados
+        self._item(3, '1.10')
+        self._item(2, '0.35')
+        Cotizacion.objects.create(pedido=self.pedido, proveedor='Proveedor', monto=Decimal('4'), documento='cot.pdf')
+        al_dia = PedidoCompra.objects.create(nombre='Sin items')
+
+        pedidos = PedidoCompra.objects.all()
+        self.assertEqual(pedidos.recalcular_totales(), 1)
+        self.assertEqual(pedidos.recalcular_totales(), 0)
+        pedido = PedidoCompra.objects.get(pk=self.pedido.pk)
+        self.assertEqual((pedido.total_items, pedido.total_general, pedido.total_cotizaciones), (2, Decimal('4.00'), 1))
+        al_dia.refresh_from_db()
+        self.assertEqual((al_dia.total_items, al_dia.total_general), (0, Decimal('0')))
+
+
+class DescargasTests(SimpleTestCase):
+    CONTENIDO = bytes(range(256)) * 4
+
+    def setUp(self):
+        descriptor, ruta = tempfile.mkstemp(suffix='.pdf')
+        with os.fdopen(descriptor, 'wb') as archivo:
+            archivo.write(self.CONTENIDO)
+        self.addCleanup(os.remove, ruta)
+        self.campo = SimpleNamespace(name='contenido/ab/cd/hash/documento.pdf', path=ruta)
+
+    def _get(self, **cabeceras):
+        respuesta = descargas.servir(RequestFactory().get('/', **cabeceras), self.campo)
+        self.addCleanup(respuesta.close)
+        return respuesta
+
+    def _cuerpo(self, respuesta):
+        return b''.join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+
+    def test_rangos(self):
+        casos = {
+            'bytes=0-9': [(0, 9)],
+            'bytes=10-': [(10, 1023)],
+            'bytes=-100': [(924, 1023)],
+            'bytes=0-9, 5-20, 100-199': [(0, 20), (100, 199)],
+            'bytes=1000-5000': [(1000, 1023)],
+            'bytes=2000-': [],
+            'bytes=9-0': None,
+            'lineas=0-9': None,
+            'bytes=-': None,
+        }
+        for cabecera, esperado in casos.items():
+            with self.subTest(cabecera=cabecera):
+                self.assertEqual(descargas._rangos(cabecera, len(self.CONTENIDO)), esperado)
+
+    def test_sin_rango(self):
+        respuesta = self._get()
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Accept-Ranges'], 'bytes')
+        self.assertEqual(respuesta['Content-Type'], 'application/pdf')
+        self.assertIn('documento.pdf', respuesta['Content-Disposition'])
+        self.assertEqual(self._cuerpo(respuesta), self.CONTENIDO)
+
+    def test_un_rango(self):
+        respuesta = self._get(HTTP_RANGE='bytes=100-199')
+        self.assertEqual(respuesta.status_code, 206)
+        self.assertEqual(respuesta['Content-Range'], 'bytes 100-199/1024')
+        self.assertEqual(respuesta['Content-Length'], '100')
+        self.assertEqual(self._cuerpo(respuesta), self.CONTENIDO[100:200])
+
+    def test_varios_rangos(self):
+        respuesta = self._get(HTTP_RANGE='bytes=0-1,1000-')
+        self.assertEqual(respuesta.status_code, 206)
+        tipo, _, separador = respuesta['Content-Type'].partition('; boundary=')
+        self.assertEqual(tipo, 'multipart/byteranges')
+        cuerpo = self._cuerpo(respuesta)
+        self.assertEqual(int(respuesta['Content-Length']), len(cuerpo))
+        partes = cuerpo.split(f'--{separador}'.encode())
+        self.assertEqual(partes[-1], b'--\r\n')
+        self.assertIn(b'Content-Range: bytes 0-1/1024\r\n\r\n' + self.CONTENIDO[:2] + b'\r\n', partes[1])
+        self.assertIn(b'Content-Range: bytes 1000-1023/1024\r\n\r\n' + self.CONTENIDO[1000:] + b'\r\n', partes[2])
+
+    def test_rango_fuera_del_archivo(self):
+        respuesta = self._get(HTTP_RANGE='bytes=5000-6000')
+        self.assertEqual(respuesta.status_code, 416)
+        self.assertEqual(respuesta['Content-Range'], 'bytes */1024')
+
+    def test_if_range(self):
+        etag = self._get()['ETag']
+        respuesta = self._get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE=etag)
+        self.assertEqual(respuesta.status_code, 206)
+        respuesta = self._get(HTTP_RANGE='bytes=0-9', HTTP_IF_RANGE='"viejo"')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self._cuerpo(respuesta), self.CONTENIDO)
+
+    def test_revalidacion(self):
+        inicial = self._get()
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH=inicial['ETag']).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_MODIFIED_SINCE=inicial['Last-Modified']).status_code, 304)
+        self.assertEqual(self._get(HTTP_IF_NONE_MATCH='"otro"').status_code, 200)
+
+
+class AlmacenamientoContenidoTests(TestCase):
+
+    def setUp(self):
+        _media_temporal(self)
+        self.pedido = PedidoCompra.objects.create(nombre='Pedido')
+
+    def _cotizacion(self, contenido, nombre='cotizacion.pdf'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Cotizacion.objects.create(
+                pedido=self.pedido, proveedor='Proveedor', monto=1, documento=ContentFile(contenido, name=nombre)
+            )
+
+    def _referencias(self, cotizacion):
+        sha256 = almacenamiento.sha256_de(cotizacion.documento.name)
+        return ContenidoArchivo.objects.filter(pk=sha256).values_list('referencias', flat=True).first()
+
+    def test_mismo_contenido_se_guarda_una_vez(self):
+        primera = self._cotizacion(b'mismo', 'a.pdf')
+        segunda = self._cotizacion(b'mismo', 'b.pdf')
+        self.assertEqual(primera.documento.path, segunda.documento.path)
+        self.assertEqual(self._referencias(primera), 2)
+        self.assertEqual(os.path.basename(segunda.documento.name), 'b.pdf')
+        with primera.documento.open('rb') as archivo:
+            self.assertEqual(archivo.read(), b'mismo')
+
+    def test_borrar_libera_la_referencia(self):
+        primera = self._cotizacion(b'mismo')
+        segunda = self._cotizacion(b'mismo')
+        ruta = primera.documento.path
+        with self.captureOnCommitCallbacks(execute=True):
+            primera.delete()
+        self.assertEqual(self._referencias(segunda), 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            segunda.delete()
+        self.assertFalse(ContenidoArchivo.objects.exists())
+        self.assertFalse(os.path.exists(ruta))
+
+    def test_reemplazar_libera_el_anterior(self):
+        cotizacion = self._cotizacion(b'viejo')
+        ruta_vieja = cotizacion.documento.path
+        with self.captureOnCommitCallbacks(execute=True):
+            cotizacion.documento = ContentFile(b'nuevo', name='cotizacion.pdf')
+            cotizacion.save()
+        self.assertEqual(self._referencias(cotizacion), 1)
+        self.assertEqual(ContenidoArchivo.objects.count(), 1)
+        self.assertFalse(os.path.exists(ruta_vieja))
+
+    def test_volver_a_subir_lo_mismo_no_suma(self):
+        cotizacion = self._cotizacion(b'igual')
+        with self.captureOnCommitCallbacks(execute=True):
+            cotizacion.documento = ContentFile(b'igual', name='cotizacion.pdf')
+            cotizacion.save()
+        self.assertEqual(self._referencias(cotizacion), 1)
+
+    def test_recontar_borra_huerfanos(self):
+        cotizacion = self._cotizacion(b'en uso')
+        # Subida cuya transacción se revirtió: el archivo queda sin fila
+        huerfano = almacenamiento.documentos.save('otro.pdf', ContentFile(b'revertido'))
+        ContenidoArchivo.objects.filter(pk=almacenamiento.sha256_de(huerfano)).delete()
+        ruta = almacenamiento.documentos.path(huerfano)
+
+        self.assertEqual(almacenamiento.recontar([cotizacion.documento.name]), (0, 0, []))
+        self.assertTrue(os.path.exists(ruta))
+        with mock.patch.object(almacenamiento, 'ANTIGUEDAD_HUERFANOS', -60):
+            self.assertEqual(almacenamiento.recontar([cotizacion.documento.name]), (0, 1, []))
+        self.assertFalse(os.path.exists(ruta))
+        self.assertTrue(os.path.exists(cotizacion.documento.path))
@@ -0,0 +1,237 @@
+"""
+Ejecución de importaciones de Excel en segundo plano.
+
+La vista guarda el archivo en un TrabajoImportacion y lo encola; un hilo
+del pool lo procesa fuera del request.
+
+Cada archivo se identifica por el SHA-256 de su contenido: si el mismo
+archivo ya se importó (o se está importando) no se vuelve a procesar, lo que
+evita duplicar el stock al subirlo dos veces.
+
+La importación se confirma por bloques y, en la misma transacción de cada
+bloque, se guarda el punto de control (última fila confirmada y contadores).
+Si el proceso se interrumpe, el trabajo se reanuda desde esa fila en lugar
+de empezar de nuevo (ver el comando procesar_importaciones).
+
+Un trabajo "Procesando" solo se da por abandonado cuando lleva
+IMPORTACION_ABANDONO segundos sin confirmar un bloque (fecha_avance); el
+worker que lo tomó deja de escribir en cuanto otro lo reanuda.
+"""
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import importacion, lector_excel
+from .models import TrabajoImportacion
+
+logger = logging.getLogger(__name__)
+
+# Cuántos errores de fila se guardan en el resumen (el total va en `errores`)
+MAX_ERRORES_RESUMEN = 200
+
+_pool = None
+
+
+def _ejecutor():
+    global _pool
+    if _pool is None:
+        _pool = ThreadPoolExecutor(max_workers=settings.IMPORTACION_WORKERS, thread_name_prefix='importacion')
+    return _pool
+
+
+class TrabajoReanudado(Exception):
+    """Otro worker reanudó el trabajo: este debe dejarlo sin escribir nada"""
+
+
+def reanudables():
+    """Trabajos con error o abandonados a medio procesar (filtro Q)"""
+    limite = timezone.now() - timedelta(seconds=settings.IMPORTACION_ABANDONO)
+    return Q(estado='ERROR') | (Q(estado='PROC') & (Q(fecha_avance__isnull=True) | Q(fecha_avance__lt=limite)))
+
+
+def reencolar(trabajos):
+    """Pasa a pendientes los trabajos reanudables; continúan desde ultima_fila"""
+    return trabajos.filter(reanudables()).update(
+        estado='PEND', fecha_inicio=None, fecha_avance=None, fecha_fin=None, mensaje_error=None
+    )
+
+
+def hash_archivo(archivo):
+    """SHA-256 del archivo subido, leído por bloques"""
+    sha = hashlib.sha256()
+    for bloque in archivo.chunks():
+        sha.update(bloque)
+    archivo.seek(0)
+    return sha.hexdigest()
+
+
+def crear_trabajo(tipo, archivo, usuario=None, salon=None, forzar=False):
+    """
+    Guarda el archivo y encola su importación. Devuelve (trabajo, duplicado).
+
+    Si el mismo contenido ya se importó o está en curso devuelve ese trabajo
+    sin encolar nada, salvo que se pida `forzar`. Si la importación anterior
+    falló o quedó abandonada, se reanuda desde su punto de control en lugar
+    de crear otra (así no se repiten los bloques ya confirmados).
+    """
+    hash_contenido = hash_archivo(archivo)
+    anterior = TrabajoImportacion.objects.filter(
+        tipo=tipo, salon=salon, hash_contenido=hash_contenido
+    ).order_by('-fecha_creacion').first()
+
+    if anterior and reencolar(TrabajoImportacion.objects.filter(pk=anterior.pk)):
+        anterior.refresh_from_db()
+        encolar(anterior)
+        return anterior, False
+    if anterior and not forzar:
+        return anterior, True
+
+    trabajo = TrabajoImportacion.objects.create(
+        tipo=tipo,
+        archivo=archivo,
+        nombre_archivo=archivo.name,
+        hash_contenido=hash_contenido,
+        salon=salon,
+        usuario=usuario,
+    )
+    encolar(trabajo)
+    return trabajo, False
+
+
+def encolar(trabajo):
+    """Programa el trabajo para cuando se confirme la transacción actual"""
+    transaction.on_commit(lambda: _ejecutor().submit(_ejecutar_en_hilo, trabajo.pk))
+
+
+def _ejecutar_en_hilo(trabajo_id):
+    try:
+        ejecutar(trabajo_id)
+    finally:
+        connection.close()
+
+
+def _contadores(resultado):
+    return {
+        'filas_procesadas': resultado['filas'],
+        'creados': resultado['creados'],
+        'actualizados': resultado.get('actualizados', 0),
+        'errores': len(resultado.get('errores', [])) + resultado.get('errores_omitidos', 0),
+    }
+
+
+def _recortar_errores(resultado):
+    """Mantiene acotada la lista de errores guardada en cada punto de control"""
+    errores = resultado.get('errores')
+    if errores and len(errores) > MAX_ERRORES_RESUMEN:
+        resultado['errores_omitidos'] = resultado.get('errores_omitidos', 0) + len(errores) - MAX_ERRORES_RESUMEN
+        del errores[MAX_ERRORES_RESUMEN:]
+
+
+def ejecutar(trabajo_id):
+    """
+    Procesa un trabajo pendiente, desde su último punto de control si ya
+    había avanzado. Devuelve False si otro worker ya lo tomó.
+    """
+    close_old_connections()
+    ahora = timezone.now()
+    tomados = TrabajoImportacion.objects.filter(pk=trabajo_id, estado='PEND').update(
+        estado='PROC', fecha_inicio=ahora, fecha_avance=ahora
+    )
+    if not tomados:
+        return False
+    trabajo = TrabajoImportacion.objects.select_related('salon').get(pk=trabajo_id)
+    reanudado = trabajo.resumen if trabajo.ultima_fila else None
+
+    def al_avanzar(resultado, ultima_fila):
+        # Se ejecuta dentro de la transacción del bloque; si otro worker
+        # reanudó el trabajo (fecha_inicio distinta) el bloque se revierte
+        _recortar_errores(resultado)
+        propio = TrabajoImportacion.objects.filter(pk=trabajo.pk, estado='PROC', fecha_inicio=trabajo.fecha_inicio)
+        if not propio.update(ultima_fila=ultima_fila, fecha_avance=timezone.now(), resumen=resultado,
+                             **_contadores(resultado)):
+            raise TrabajoReanudado(trabajo.pk)
+
+    try:
+        with trabajo.archivo.open('rb') as archivo:
+            if trabajo.tipo == 'ALUMNOS':
+                bloques = lector_excel.leer_bloques(
+                    archivo,
+                    fila_inicio=max(importacion.FILA_INICIO_ALUMNOS, trabajo.ultima_fila + 1),
+                    encabezado=None,
+                )
+                resultado = importacion.importar_alumnos(
+                    trabajo.salon, bloques, al_avanzar=al_avanzar, resultado=reanudado
+                )
+            else:
+                bloques = lector_excel.leer_bloques(
+                    archivo,
+                    fila_inicio=max(2, trabajo.ultima_fila + 1),
+                    requeridas=importacion.COLUMNAS_REQUERIDAS,
+                )
+                resultado = importacion.importar_productos(
+                    bloques,
+                    usuario=trabajo.usuario or 'Sistema',
+                    al_avanzar=al_avanzar,
+                    por_bloque=True,
+                    resultado=reanudado,
+                )
+    except TrabajoReanudado:
+        logger.warning('La importación %s fue reanudada por otro worker', trabajo.pk)
+        return False
+    except Exception as e:
+        if not isinstance(e, lector_excel.ErrorArchivo):
+            logger.exception('Error en la importación %s', trabajo.pk)
+        # Los contadores quedan como en el último bloque confirmado
+        trabajo.refresh_from_db()
+        trabajo.estado = 'ERROR'
+        trabajo.mensaje_error = str(e)
+    else:
+        trabajo.refresh_from_db()
+        _recortar_errores(resultado)
+        for campo, valor in _contadores(resultado).items():
+            setattr(trabajo, campo, valor)
+        trabajo.resumen = resultado
+        trabajo.estado = 'COMP'
+
+    trabajo.fecha_fin = timezone.now()
+    trabajo.save()
+    return True
+
+
+def procesar_pendientes():
+    """Ejecuta en este proceso los trabajos pendientes (p. ej. tras un reinicio)"""
+    procesados = 0
+    for trabajo_id in TrabajoImportacion.objects.filter(estado='PEND').order_by('pk').values_list('pk', flat=True):
+        if ejecutar(trabajo_id):
+            procesados += 1
+    return procesados
+
+
+def progreso(trabajo):
+    """Estado del trabajo para la API"""
+    datos = {
+        'id': trabajo.pk,
+        'tipo': trabajo.tipo,
+        'archivo': trabajo.nombre_archivo,
+        'estado': trabajo.estado,
+        'estado_display': trabajo.get_estado_display(),
+        'terminado': trabajo.terminado,
+        'filas_procesadas': trabajo.filas_procesadas,
+        'ultima_fila': trabajo.ultima_fila,
+        'creados': trabajo.creados,
+        'actualizados': trabajo.actualizados,
+        'errores': trabajo.errores,
+        'fecha_creacion': trabajo.fecha_creacion.isoformat(),
+        'fecha_inicio': trabajo.fecha_inicio.isoformat() if trabajo.fecha_inicio else None,
+        'fecha_fin': trabajo.fecha_fin.isoformat() if trabajo.fecha_fin else None,
+    }
+    if trabajo.terminado:
+        datos['resumen'] = trabajo.resumen
+        datos['mensaje_error'] = trabajo.mensaje_error
+    return datos
@@ -1,5 +1,3 @@
-from django.conf import settings
-from django.conf.urls.static import static
 from django.urls import path
 from .view import views, Entregautiles
 
@@ -19,18 +17,31 @@ urlpatterns = [
     path('almacenes/agregar-producto/', views.agregar_producto, name='agregar_producto'),
     path('almacenes/crear-unidad/', views.crear_unidad, name='crear_unidad'),
     path('almacenes/importar-excel/', views.importar_excel, name='importar_excel'),
+    path('almacenes/importar-excel/validar/', views.validar_excel, name='validar_excel'),
     path('almacenes/descargar-plantilla/', views.descargar_plantilla, name='descargar_plantilla'),
+    path('exportar/<str:recurso>/<str:formato>/', views.exportar, name='exportar'),
     path('api/ultimo-producto/', views.api_ultimo_producto, name='api_ultimo_producto'),
+    path('api/productos/<int:id_producto>/stock/', views.api_historial_stock, name='api_historial_stock'),
+    path('api/productos/<int:id_producto>/precios/', views.api_precios_producto, name='api_precios_producto'),
+
+    # BÚSQUEDA GLOBAL
+    path('api/buscar/', views.api_buscar, name='api_buscar'),
+    path('api/importaciones/<int:trabajo_id>/', views.api_importacion, name='api_importacion'),
 
     # PEDIDOS DE COMPRA
     path('pedidos-compra/', views.PedidosCompra, name='PedidosCompra'),
     path('pedidos-compra/crear/', views.CrearPedidoCompra, name='CrearPedidoCompra'),
+    path('pedidos-compra/exportar-zip/', views.ExportarPedidosZip, name='ExportarPedidosZip'),
+    path('pedidos-compra/analitica/', views.AnaliticaCompras, name='AnaliticaCompras'),
     path('pedidos-compra/<int:id_pedido>/', views.DetallePedido, name='DetallePedido'),
     path('pedidos-compra/<int:id_pedido>/editar/', views.EditarPedido, name='EditarPedido'),
     path('pedidos-compra/<int:id_pedido>/eliminar/', views.EliminarPedido, name='EliminarPedido'),
 
     # PDF (CORREGIDO: SIN id_pedido)
     path('pedidos-compra/generar-pdf/', views.GenerarPDFPedido, name='GenerarPDFPedido'),
+    path('pedidos-compra/<int:id_pedido>/pdf/', views.PDFPedido, name='PDFPedido'),
+    path('pedidos-compra/<int:id_pedido>/archivo/', views.ver_archivo_pedido, name='ver_archivo_pedido'),
+    path('pedidos-compra/<int:id_pedido>/documento-entrega/', views.ver_documento_entrega, name='ver_documento_entrega'),
 
     # Items del pedido
     path('pedidos-compra/<int:id_pedido>/items/agregar/', views.AgregarItemPedido, name='AgregarItemPedido'),
@@ -41,6 +52,7 @@ urlpatterns = [
     # Cotizaciones
     path('pedidos-compra/<int:id_pedido>/cotizaciones/', views.CotizacionesPedido, name='CotizacionesPedido'),
     path('pedidos-compra/<int:id_pedido>/cotizaciones/agregar/', views.AgregarCotizacion, name='AgregarCotizacion'),
+    path('pedidos-compra/<int:id_pedido>/cotizaciones/comparar/', views.CompararCotizaciones, name='CompararCotizaciones'),
     path('cotizaciones/<int:id_cotizacion>/seleccionar/', views.SeleccionarCotizacion, name='SeleccionarCotizacion'),
     path('documento/<int:cotizacion_id>/', views.ver_documento, name='ver_documento'),
 
@@ -74,7 +86,3 @@ urlpatterns = [
     path('api/alumnos/<int:alumno_id>/estado/', Entregautiles.api_estado_alumno, name='api_estado_alumno'),
     path('api/entregas/<int:entrega_id>/toggle/', Entregautiles.api_toggle_entrega_util, name='api_toggle_entrega_util'),
 ]
-
-# ARCHIVOS MEDIA (DESARROLLO)
-if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,169 @@
+"""
+Validación en seco del Excel de productos.
+
+Revisa el archivo completo con operaciones vectorizadas de pandas (una
+máscara por regla, sin recorrer filas) y no escribe nada en la base: solo
+busca en lotes cuáles de sus códigos ya existen. El resultado se puede
+descargar como un libro con cada celda errónea marcada y una columna con
+los errores de la fila, para corregir todo el archivo de una vez.
+"""
+import openpyxl
+import pandas as pd
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import PatternFill, Font
+
+from . import lector_excel
+from .importacion import COLUMNAS_REQUERIDAS, CODIGO_A_UBICACION, ESTADOS_VALIDOS, TAMANO_LOTE
+from .models import ProductoAlmacen
+
+COLUMNA_ERRORES = 'errores'
+
+_RELLENO_ERROR = PatternFill(start_color='FDE2E2', end_color='FDE2E2', fill_type='solid')
+_FUENTE_ERROR = Font(color='991B1B')
+_RELLENO_ENCABEZADO = PatternFill(start_color='148129', end_color='148129', fill_type='solid')
+_FUENTE_ENCABEZADO = Font(color='FFFFFF', bold=True)
+
+
+def leer_dataframe(archivo):
+    """DataFrame del Excel indexado por número de fila (valores tal como vienen)"""
+    numeros, filas = [], []
+    for bloque in lector_excel.leer_bloques(archivo, requeridas=COLUMNAS_REQUERIDAS):
+        for numero, fila in bloque:
+            numeros.append(numero)
+            filas.append(fila)
+    if not filas:
+        # Solo encabezado: sin filas pandas no sabría las columnas que validar() espera
+        return pd.DataFrame(columns=list(COLUMNAS_REQUERIDAS), index=pd.Index([], name='fila'), dtype=object)
+    return pd.DataFrame(filas, index=pd.Index(numeros, name='fila'), dtype=object)
+
+
+def _texto(serie):
+    texto = serie.astype(str).str.strip()
+    return texto.mask(serie.isna() | texto.str.lower().eq('nan') | texto.str.lower().eq('none'), '')
+
+
+def _errores(mascara, columna, mensajes):
+    """Filas de error para las filas marcadas; `mensajes` es un texto o una Serie"""
+    if isinstance(mensajes, pd.Series):
+        mensajes = mensajes[mascara]
+    return pd.DataFrame({'fila': mascara.index[mascara], 'columna': columna, 'mensaje': mensajes})
+
+
+def _codigos_existentes(codigos):
+    """
+    Cuáles de los códigos del archivo ya existen (se actualizarían en vez de
+    crearse), en lotes de TAMANO_LOTE para no pasar el límite de variables
+    de SQLite
+    """
+    codigos = list(codigos)
+    existentes = set()
+    for inicio in range(0, len(codigos), TAMANO_LOTE):
+        existentes.update(ProductoAlmacen.objects.filter(
+            codigo_producto__in=codigos[inicio:inicio + TAMANO_LOTE]
+        ).values_list('codigo_producto', flat=True))
+    return existentes
+
+
+def validar(df):
+    """
+    Devuelve (errores, resumen). `errores` es un DataFrame con una fila por
+    celda y regla incumplida (fila, columna, mensaje).
+    """
+    partes = []
+    textos = {col: _texto(df[col]) for col in df.columns}
+
+    vacios = {}
+    for col in COLUMNAS_REQUERIDAS:
+        vacios[col] = textos[col].eq('')
+        partes.append(_errores(vacios[col], col, f"El campo '{col}' es obligatorio"))
+
+    # Código de almacén: '1' cuenta como '01' (Excel lo guarda como número)
+    codigo_almacen = textos['codigo_almacen'].where(
+        ~textos['codigo_almacen'].str.isdigit(), textos['codigo_almacen'].str.zfill(2)
+    )
+    invalido = ~vacios['codigo_almacen'] & ~codigo_almacen.isin(list(CODIGO_A_UBICACION))
+    partes.append(_errores(
+        invalido, 'codigo_almacen',
+        "Código de almacén '" + textos['codigo_almacen'] + "' no válido (debe ser 01, 02 o 03)",
+    ))
+
+    cantidad = pd.to_numeric(df['cantidad'], errors='coerce')
+    partes.append(_errores(~vacios['cantidad'] & cantidad.isna(), 'cantidad', 'Cantidad inválida'))
+    partes.append(_errores(cantidad < 0, 'cantidad', 'La cantidad no puede ser negativa'))
+
+    if 'stock_minimo' in df.columns:
+        stock_minimo = pd.to_numeric(df['stock_minimo'], errors='coerce')
+        con_valor = textos['stock_minimo'].ne('')
+        partes.append(_errores(
+            con_valor & (stock_minimo.isna() | (stock_minimo < 0)), 'stock_minimo', 'Stock mínimo inválido'
+        ))
+
+    if 'estado' in df.columns:
+        estado = textos['estado'].str.upper()
+        partes.append(_errores(
+            ~estado.isin(ESTADOS_VALIDOS), 'estado',
+            "Estado '" + textos['estado'] + "' no válido (debe ser DISP, AGOT o BAJO)",
+        ))
+
+    codigo = textos['codigo_producto']
+    repetido = ~vacios['codigo_producto'] & codigo.duplicated(keep=False)
+    if repetido.any():
+        filas_por_codigo = codigo[repetido].groupby(codigo[repetido]).transform(
+            lambda serie: ', '.join(str(numero) for numero in serie.index)
+        )
+        partes.append(_errores(
+            repetido, 'codigo_producto', 'Código repetido en el archivo (filas ' + filas_por_codigo + ')'
+        ))
+
+    errores = pd.concat(partes, ignore_index=True).sort_values(['fila', 'columna'], kind='stable')
+
+    existentes = _codigos_existentes(codigo[~vacios['codigo_producto']].unique())
+    validas = ~df.index.isin(errores['fila'].unique())
+    ya_existe = codigo.isin(existentes)
+
+    resumen = {
+        'filas': len(df),
+        'filas_con_error': int((~validas).sum()),
+        'errores': len(errores),
+        'nuevos': int((validas & ~ya_existe).sum()),
+        'existentes': int((validas & ya_existe).sum()),
+        'errores_por_columna': errores['columna'].value_counts().to_dict(),
+    }
+    return errores, resumen
+
+
+def _celda(hoja, valor, fuente=None, relleno=None):
+    celda = WriteOnlyCell(hoja, value=valor)
+    if fuente:
+        celda.font = fuente
+    if relleno:
+        celda.fill = relleno
+    return celda
+
+
+def guardar_libro_anotado(df, errores, destino):
+    """
+    Escribe en `destino` el archivo original con las celdas erróneas
+    resaltadas y una columna final con los errores de cada fila.
+    """
+    por_celda = set(zip(errores['fila'], errores['columna']))
+    por_fila = errores.groupby('fila')['mensaje'].agg('; '.join).to_dict()
+
+    libro = openpyxl.Workbook(write_only=True)
+    hoja = libro.create_sheet('Validación')
+    columnas = list(df.columns)
+    hoja.append([
+        _celda(hoja, titulo, _FUENTE_ENCABEZADO, _RELLENO_ENCABEZADO) for titulo in columnas + [COLUMNA_ERRORES]
+    ])
+
+    for numero, valores in zip(df.index, df.itertuples(index=False, name=None)):
+        fila = []
+        for columna, valor in zip(columnas, valores):
+            if (numero, columna) in por_celda:
+                fila.append(_celda(hoja, valor, _FUENTE_ERROR, _RELLENO_ERROR))
+            else:
+                fila.append(valor)
+        fila.append(_celda(hoja, por_fila[numero], _FUENTE_ERROR) if numero in por_fila else None)
+        hoja.append(fila)
+
+    libro.save(destino)
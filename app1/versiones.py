@@ -0,0 +1,87 @@
+"""
+Validadores HTTP (ETag / Last-Modified) baratos para los endpoints JSON.
+
+Cada recurso tiene un contador en VersionRecurso que las señales
+incrementan al cambiar sus datos. Los decoradores de este módulo resuelven
+el ETag con una sola lectura de esos contadores, de modo que una petición
+sin cambios recibe 304 sin ejecutar la consulta del endpoint.
+"""
+import hashlib
+
+from django.db.models import F
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from .models import VersionRecurso
+
+
+def incrementar(*claves):
+    """Marca como modificados los recursos indicados"""
+    ahora = timezone.now()
+    VersionRecurso.objects.bulk_create(
+        [VersionRecurso(clave=clave, fecha_modificacion=ahora) for clave in claves],
+        ignore_conflicts=True,
+    )
+    VersionRecurso.objects.filter(clave__in=claves).update(
+        version=F('version') + 1,
+        fecha_modificacion=ahora,
+    )
+
+
+def leer(claves):
+    """(etag, última modificación) de un conjunto de recursos"""
+    versiones = {
+        clave: (version, fecha)
+        for clave, version, fecha in VersionRecurso.objects.filter(
+            clave__in=claves
+        ).values_list('clave', 'version', 'fecha_modificacion')
+    }
+    firma = ';'.join(f'{clave}={versiones.get(clave, (0, None))[0]}' for clave in claves)
+    fechas = [fecha for _, fecha in versiones.values()]
+    return _etag(firma), max(fechas) if fechas else None
+
+
+def leer_por_clave(claves):
+    """{clave: etag} de varios recursos en una consulta; igual a leer([clave])[0]"""
+    versiones = dict(VersionRecurso.objects.filter(clave__in=claves).values_list('clave', 'version'))
+    return {clave: _etag(f'{clave}={versiones.get(clave, 0)}') for clave in claves}
+
+
+def _etag(firma):
+    return hashlib.md5(firma.encode('utf-8')).hexdigest()
+
+
+def condicional(validadores):
+    """
+    Igual que django.views.decorators.http.condition, pero `validadores`
+    devuelve (etag, last_modified) en una sola llamada y se evalúa una vez
+    por petición.
+    """
+    def _validadores(request, *args, **kwargs):
+        if not hasattr(request, '_validadores_version'):
+            request._validadores_version = validadores(request, *args, **kwargs)
+        return request._validadores_version
+
+    return condition(
+        etag_func=lambda request, *args, **kwargs: _validadores(request, *args, **kwargs)[0],
+        last_modified_func=lambda request, *args, **kwargs: _validadores(request, *args, **kwargs)[1],
+    )
+
+
+def por_version(claves):
+    """`claves(*args, **kwargs)` devuelve las claves de VersionRecurso de la vista"""
+    return condicional(lambda request, *args, **kwargs: leer(claves(*args, **kwargs)))
+
+
+# Claves de los recursos versionados
+
+def clave_alumnos_salon(salon_id):
+    return f'salon:{salon_id}:alumnos'
+
+
+def clave_entregas_alumno(alumno_id):
+    return f'alumno:{alumno_id}:entregas'
+
+
+def clave_pedido(pedido_id):
+    return f'pedido:{pedido_id}'
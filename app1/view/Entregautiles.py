@@ -2,25 +2,24 @@ import json
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views.generic import ListView
 from django.views.decorators.http import require_GET, require_POST
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.cache import cache_control
 from django.http import JsonResponse
 from django.contrib import messages
 from django.utils import timezone
 from django.urls import reverse
-import openpyxl
 import pandas as pd
 from django.db import models
 from ..models import Salon, Alumno, UtilEscolar, EntregaUtil, HistorialEntrega, ProductoAlmacen, Unidad, MovimientoInventario
 from ..forms import SalonForm, UtilEscolarForm, EntregaUtilForm
+from .. import trabajos, versiones
+from ..paginacion import contexto_inventario
 
 # INVENTARIO DE UTILES - USANDO ProductoAlmacen (igual que AG)
 
 def inventario_utiles(request):
-    """Vista de inventario del Almacen de Utiles - Filtra por ubicacion_almacen='IU'"""
-    productos = ProductoAlmacen.objects.filter(ubicacion_almacen='IU').order_by('-fecha_ingreso')
-    context = {
-        'productos': productos,
-        'total_productos': productos.count()
-    }
+    """Vista de inventario del Almacen de Utiles - Filtra por ubicacion_almacen='IU' (paginada por cursor)"""
+    context = contexto_inventario(request, 'IU')
     return render(request, 'almacenes/almutiles/inventarioutiles.html', context)
 
 
@@ -35,7 +34,7 @@ def agregar_producto_utiles(request):
                 estante=request.POST.get('estante'),
                 cantidad=request.POST.get('cantidad'),
                 unidad_id=request.POST.get('unidad'),
-                estado=request.POST.get('estado'),
+                stock_minimo=request.POST.get('stock_minimo') or None,
                 observaciones=request.POST.get('observaciones', '')
             )
             
@@ -152,11 +151,17 @@ def detalle_salon(request, pk):
         alumno.entregas_json = json.dumps(entregas_data)
         alumnos_con_entregas.append(alumno)
     
+    # Importación de alumnos en curso o recién terminada
+    trabajo = None
+    if request.GET.get('trabajo', '').isdigit():
+        trabajo = salon.importaciones.filter(pk=request.GET['trabajo']).first()
+    
     return render(request, 'almacenes/almutiles/Entrega_Utiles/detalle_salon.html', {
         'salon': salon,
         'alumnos': alumnos_con_entregas,
         'utiles': utiles,
-        'total_utiles': utiles.count()
+        'total_utiles': utiles.count(),
+        'trabajo': trabajo,
     })
 
 
@@ -173,76 +178,21 @@ def importar_excel_alumnos(request, pk):
         messages.error(request, 'Solo se permiten archivos Excel (.xlsx, .xls).')
         return redirect('detalle_salon', pk=salon.pk)
 
-    try:
-        wb = openpyxl.load_workbook(archivo)
-        ws = wb.active
-
-        creados = 0
-        duplicados = 0
-        ignorados = 0
-
-        for row_idx, row in enumerate(ws.iter_rows(min_row=6, values_only=True), start=6):
-            if not row or len(row) < 12:
-                ignorados += 1
-                continue
-
-            aula = str(row[4]).strip().upper() if row[4] else ''
-            nombre = str(row[8]).strip() if row[8] else ''
-            dni = str(row[10]).strip() if row[10] else ''
-            sexo = str(row[11]).strip().upper() if row[11] else ''
-
-            if aula != salon.nombre.upper():
-                ignorados += 1
-                continue
-
-            if not nombre or not dni:
-                ignorados += 1
-                continue
-
-            if sexo not in ('M', 'F'):
-                sexo = ''
-
-            if Alumno.objects.filter(dni=dni).exists():
-                duplicados += 1
-                continue
-
-            alumno = Alumno.objects.create(
-                salon=salon,
-                nombre=nombre,
-                dni=dni,
-                sexo=sexo,
-            )
-            
-            # Crear entregas con cantidad_entregada = 0
-            for util in salon.utiles.all():
-                EntregaUtil.objects.create(
-                    alumno=alumno,
-                    util=util,
-                    cantidad_entregada=0,
-                    entregado=False
-                )
-            
-            creados += 1
-
-        wb.close()
-
-        msg_parts = []
-        if creados:
-            msg_parts.append(f'{creados} alumno{"s" if creados != 1 else ""} importado{"s" if creados != 1 else ""}')
-        if duplicados:
-            msg_parts.append(f'{duplicados} duplicado{"s" if duplicados != 1 else ""} ignorado{"s" if duplicados != 1 else ""}')
-        if ignorados:
-            msg_parts.append(f'{ignorados} fila{"s" if ignorados != 1 else ""} ignorada{"s" if ignorados != 1 else ""}')
-
-        if creados > 0:
-            messages.success(request, ' | '.join(msg_parts))
-        else:
-            messages.warning(request, f'No se importaron alumnos. {" | ".join(msg_parts)}')
-
-    except Exception as e:
-        messages.error(request, f'Error al procesar el archivo: {str(e)}')
+    # Guardar el archivo y procesarlo en segundo plano (ver trabajos.py)
+    trabajo, duplicado = trabajos.crear_trabajo(
+        'ALUMNOS',
+        archivo,
+        usuario=request.user.username if request.user.is_authenticated else 'Sistema',
+        salon=salon,
+        forzar=bool(request.POST.get('forzar')),
+    )
+    if duplicado:
+        messages.warning(
+            request,
+            f'Este archivo ya se importó el {timezone.localtime(trabajo.fecha_creacion):%d/%m/%Y %H:%M}; no se volvió a procesar.'
+        )
 
-    return redirect('detalle_salon', pk=salon.pk)
+    return redirect(f"{reverse('detalle_salon', kwargs={'pk': salon.pk})}?trabajo={trabajo.pk}")
 
 
 # UTILES ESCOLARES
@@ -392,6 +342,9 @@ def editar_entregas_alumno(request, alumno_id):
 # API ENDPOINTS (AJAX)
 
 @require_GET
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@versiones.por_version(lambda salon_id: [versiones.clave_alumnos_salon(salon_id)])
 def api_alumnos_salon(request, salon_id):
     salon = get_object_or_404(Salon, pk=salon_id)
     alumnos = salon.alumnos.all().values(
@@ -430,6 +383,9 @@ def api_toggle_entrega_util(request, entrega_id):
 
 
 @require_GET
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@versiones.por_version(lambda alumno_id: [versiones.clave_entregas_alumno(alumno_id)])
 def api_estado_alumno(request, alumno_id):
     """
     Retorna estado y progreso como X/Y (suma de cantidades) + entregas JSON
@@ -1,38 +1,44 @@
 import os
 import json
 import mimetypes
-import pandas as pd
 import openpyxl
 from datetime import datetime
+from decimal import Decimal
+from urllib.parse import urlencode
 
+from django.conf import settings
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
 from django.contrib.auth import logout
 from django.contrib import messages
-from django.http import JsonResponse, HttpResponse, FileResponse, Http404
-from django.views.decorators.http import require_POST, require_http_methods
+from django.http import JsonResponse, HttpResponse, Http404, StreamingHttpResponse
+from django.views.decorators.http import require_GET, require_POST, require_http_methods
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.clickjacking import xframe_options_exempt
 from django.views.decorators.cache import cache_control
-from django.db import models
+from django.views.decorators.gzip import gzip_page
+from django.db import models, transaction
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, PageBreak
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
-
 from ..models import (
     ProductoAlmacen, 
     Unidad, 
     MovimientoInventario, 
     PedidoCompra,
     ItemPedido, 
-    Cotizacion
+    Cotizacion,
+    PrecioCotizacion,
+    TrabajoImportacion
+)
+from .. import (
+    almacenamiento, analitica_compras, busqueda, comparacion_cotizaciones, descargas, exportacion,
+    importacion, lector_excel, pdf_pedidos, servicio_pdf, trabajos, validacion_excel, versiones, zip_pedidos,
 )
+from ..historial_stock import stock_en_fecha, serie_stock
+from ..paginacion import contexto_inventario
 
 
 # ==============================================================================
@@ -70,12 +76,8 @@ def logout_view(request):
 # ==============================================================================
 
 def InventrioAG(request):
-    """Vista de inventario del Almacén General"""
-    productos = ProductoAlmacen.objects.filter(ubicacion_almacen='AG').order_by('-fecha_ingreso')
-    context = {
-        'productos': productos,
-        'total_productos': productos.count()
-    }
+    """Vista de inventario del Almacén General (paginada por cursor)"""
+    context = contexto_inventario(request, 'AG')
     return render(request, 'almacenes/almgeneral/InventarioAG.html', context)
 
 
@@ -90,16 +92,6 @@ def agregar_producto(request):
     """Agregar un nuevo producto al inventario"""
     if request.method == 'POST':
         try:
-            # DEBUG: Ver qué datos llegan
-            print("=== DATOS RECIBIDOS ===")
-            print(f"Nombre: {request.POST.get('nombre')}")
-            print(f"Descripción: {request.POST.get('descripcion')}")
-            print(f"Ubicación: {request.POST.get('ubicacion_almacen')}")
-            print(f"Estante: {request.POST.get('estante')}")
-            print(f"Cantidad: {request.POST.get('cantidad')}")
-            print(f"Unidad: {request.POST.get('unidad')}")
-            print(f"Estado: {request.POST.get('estado')}")
-            
             producto = ProductoAlmacen.objects.create(
                 nombre=request.POST.get('nombre'),
                 descripcion=request.POST.get('descripcion'),
@@ -107,16 +99,14 @@ def agregar_producto(request):
                 estante=request.POST.get('estante'),
                 cantidad=request.POST.get('cantidad'),
                 unidad=request.POST.get('unidad'),
-                estado=request.POST.get('estado'),
+                stock_minimo=request.POST.get('stock_minimo') or None,
                 observaciones=request.POST.get('observaciones', '')
             )
             
-            print(f"✓ Producto creado: {producto.id_producto} - {producto.nombre}")
             messages.success(request, f'Producto "{producto.nombre}" agregado exitosamente')
             return redirect('InventarioAG')  # ← IMPORTANTE: debe coincidir con el name en urls.py
             
         except Exception as e:
-            print(f"✗ ERROR: {str(e)}")
             messages.error(request, f'Error al agregar producto: {str(e)}')
     
     unidades = Unidad.objects.all().order_by('nombre')
@@ -170,230 +160,24 @@ def crear_unidad(request):
 def importar_excel(request):
     """Importar productos desde archivo Excel - TODOS LOS ALMACENES"""
     if request.method == 'POST' and request.FILES.get('archivo_excel'):
-        try:
-            archivo = request.FILES['archivo_excel']
-            
-            # Leer el Excel
-            df = pd.read_excel(archivo)
-            
-            # Validar columnas OBLIGATORIAS
-            columnas_requeridas = ['codigo_almacen', 'codigo_producto', 'nombre', 'cantidad', 'unidad', 'estado']
-            columnas_faltantes = [col for col in columnas_requeridas if col not in df.columns]
-            
-            if columnas_faltantes:
-                messages.error(request, f'Faltan columnas obligatorias: {", ".join(columnas_faltantes)}')
-                return redirect('importar_excel')
-            
-            productos_creados = 0
-            productos_actualizados = 0
-            unidades_creadas = 0
-            errores = []
-            
-            # Mapeo de códigos de almacén a ubicación
-            codigo_a_ubicacion = {
-                '01': 'AG',
-                '02': 'AD',
-                '03': 'IU',
-            }
-            
-            # Contadores por almacén
-            stats_por_almacen = {
-                'AG': {'creados': 0, 'actualizados': 0},
-                'AD': {'creados': 0, 'actualizados': 0},
-                'IU': {'creados': 0, 'actualizados': 0},
-            }
-            
-            for index, row in df.iterrows():
-                try:
-                    # Validar código de almacén
-                    codigo_almacen = str(row['codigo_almacen']).strip()
-                    if codigo_almacen not in codigo_a_ubicacion:
-                        errores.append(f"Fila {index+2}: Código de almacén '{codigo_almacen}' no válido (debe ser 01, 02 o 03)")
-                        continue
-                    
-                    ubicacion = codigo_a_ubicacion[codigo_almacen]
-                    
-                    # Validar código de producto
-                    codigo_producto = str(row['codigo_producto']).strip()
-                    if not codigo_producto or codigo_producto == 'nan':
-                        errores.append(f"Fila {index+2}: El código de producto es obligatorio")
-                        continue
-                    
-                    # Validar nombre
-                    nombre = str(row['nombre']).strip()
-                    if not nombre or nombre == 'nan':
-                        errores.append(f"Fila {index+2}: El nombre es obligatorio")
-                        continue
-                    
-                    # Validar cantidad
-                    try:
-                        cantidad = int(row['cantidad'])
-                        if cantidad < 0:
-                            errores.append(f"Fila {index+2}: La cantidad no puede ser negativa")
-                            continue
-                    except:
-                        errores.append(f"Fila {index+2}: Cantidad inválida")
-                        continue
-                    
-                    # PROCESAR UNIDAD DE MEDIDA
-                    unidad_str = str(row['unidad']).strip()
-                    if not unidad_str or unidad_str.upper() == 'NAN':
-                        errores.append(f"Fila {index+2}: La unidad es obligatoria")
-                        continue
-                    
-                    # Buscar o crear la unidad (auto-crear si no existe)
-                    unidad_obj = Unidad.objects.filter(
-                        models.Q(nombre__iexact=unidad_str) |
-                        models.Q(abreviatura__iexact=unidad_str)
-                    ).first()
-                    
-                    if not unidad_obj:
-                        # Crear nueva unidad automáticamente
-                        unidad_obj = Unidad.objects.create(
-                            nombre=unidad_str,
-                            abreviatura=unidad_str[:10] if len(unidad_str) <= 10 else '',
-                            activo=True
-                        )
-                        unidades_creadas += 1
-                    
-                    # Validar estado
-                    estado = str(row['estado']).upper().strip()
-                    if estado not in ['DISP', 'AGOT', 'BAJO']:
-                        errores.append(f"Fila {index+2}: Estado '{estado}' no válido (debe ser DISP, AGOT o BAJO)")
-                        continue
-                    
-                    # Campos opcionales
-                    descripcion = str(row.get('descripcion', '')).strip()
-                    if descripcion == 'nan':
-                        descripcion = ''
-                    
-                    estante = str(row.get('estante', '')).strip()
-                    if estante == 'nan':
-                        estante = ''
-                    
-                    observaciones = str(row.get('observaciones', '')).strip()
-                    if observaciones == 'nan':
-                        observaciones = ''
-                    
-                    # BUSCAR SI EL PRODUCTO YA EXISTE
-                    producto_existente = ProductoAlmacen.objects.filter(codigo_producto=codigo_producto).first()
-                    
-                    if producto_existente:
-                        # ACTUALIZAR producto existente
-                        cantidad_anterior = producto_existente.cantidad
-                        estante_anterior = producto_existente.estante
-                        
-                        # Sumar la cantidad
-                        producto_existente.cantidad += cantidad
-                        
-                        # Actualizar estante si cambió
-                        if estante and estante != producto_existente.estante:
-                            producto_existente.estante = estante
-                        
-                        # Actualizar unidad si cambió
-                        if producto_existente.unidad != unidad_obj:
-                            producto_existente.unidad = unidad_obj
-                        
-                        # Actualizar otros campos
-                        producto_existente.estado = estado
-                        if observaciones:
-                            if producto_existente.observaciones:
-                                producto_existente.observaciones += f"\n[{pd.Timestamp.now().strftime('%Y-%m-%d %H:%M')}] {observaciones}"
-                            else:
-                                producto_existente.observaciones = observaciones
-                        
-                        producto_existente.save()
-                        
-                        # Registrar el movimiento en el historial
-                        MovimientoInventario.objects.create(
-                            producto=producto_existente,
-                            tipo_movimiento='ENTRADA',
-                            cantidad=cantidad,
-                            cantidad_anterior=cantidad_anterior,
-                            cantidad_nueva=producto_existente.cantidad,
-                            estante_anterior=estante_anterior,
-                            estante_nuevo=producto_existente.estante,
-                            observacion=f"Importación Excel: {observaciones}" if observaciones else "Importación Excel",
-                            usuario=request.user.username if request.user.is_authenticated else 'Sistema'
-                        )
-                        
-                        productos_actualizados += 1
-                        stats_por_almacen[ubicacion]['actualizados'] += 1
-                        
-                    else:
-                        # CREAR nuevo producto CON LA UBICACIÓN CORRECTA
-                        nuevo_producto = ProductoAlmacen.objects.create(
-                            codigo_producto=codigo_producto,
-                            nombre=nombre,
-                            descripcion=descripcion,
-                            ubicacion_almacen=ubicacion,  # 🔥 ASIGNA LA UBICACIÓN CORRECTA
-                            estante=estante if estante else None,
-                            cantidad=cantidad,
-                            unidad=unidad_obj,
-                            estado=estado,
-                            observaciones=observaciones if observaciones else None
-                        )
-                        
-                        # Registrar el movimiento inicial
-                        MovimientoInventario.objects.create(
-                            producto=nuevo_producto,
-                            tipo_movimiento='ENTRADA',
-                            cantidad=cantidad,
-                            cantidad_anterior=0,
-                            cantidad_nueva=cantidad,
-                            estante_anterior=None,
-                            estante_nuevo=estante if estante else None,
-                            observacion=f"Creación inicial: {observaciones}" if observaciones else "Creación inicial",
-                            usuario=request.user.username if request.user.is_authenticated else 'Sistema'
-                        )
-                        
-                        productos_creados += 1
-                        stats_por_almacen[ubicacion]['creados'] += 1
-                    
-                except Exception as e:
-                    errores.append(f"Fila {index+2}: {str(e)}")
-            
-            # Mensajes de resultado DETALLADOS
-            if productos_creados > 0:
-                messages.success(request, f'✅ Se crearon {productos_creados} productos nuevos en total')
-                
-                # Desglose por almacén
-                if stats_por_almacen['AG']['creados'] > 0:
-                    messages.info(request, f"📦 Almacén General: {stats_por_almacen['AG']['creados']} productos creados")
-                if stats_por_almacen['AD']['creados'] > 0:
-                    messages.info(request, f"⚽ Almacén de Deporte: {stats_por_almacen['AD']['creados']} productos creados")
-                if stats_por_almacen['IU']['creados'] > 0:
-                    messages.info(request, f"📚 Almacén de Útiles: {stats_por_almacen['IU']['creados']} productos creados")
-            
-            if productos_actualizados > 0:
-                messages.success(request, f'✅ Se actualizaron {productos_actualizados} productos existentes')
-                
-                if stats_por_almacen['AG']['actualizados'] > 0:
-                    messages.info(request, f"📦 Almacén General: {stats_por_almacen['AG']['actualizados']} productos actualizados")
-                if stats_por_almacen['AD']['actualizados'] > 0:
-                    messages.info(request, f"⚽ Almacén de Deporte: {stats_por_almacen['AD']['actualizados']} productos actualizados")
-                if stats_por_almacen['IU']['actualizados'] > 0:
-                    messages.info(request, f"📚 Almacén de Útiles: {stats_por_almacen['IU']['actualizados']} productos actualizados")
-            
-            if unidades_creadas > 0:
-                messages.info(request, f'ℹ️ Se crearon {unidades_creadas} nuevas unidades de medida')
-            
-            if errores:
-                messages.warning(request, f'⚠️ Se encontraron {len(errores)} errores')
-                for error in errores[:10]:
-                    messages.error(request, error)
-            
-            # Redirigir según el parámetro 'redirect_to'
-            redirect_url = request.POST.get('redirect_to', 'InventarioAG')
-            
-            if productos_creados > 0 or productos_actualizados > 0:
-                return redirect(redirect_url)
-            else:
-                return redirect('importar_excel')
-            
-        except Exception as e:
-            messages.error(request, f'❌ Error al procesar el archivo: {str(e)}')
-            return redirect('importar_excel')
+        archivo = request.FILES['archivo_excel']
+        redirect_to = request.POST.get('redirect_to', 'InventarioAG')
+        
+        # Guardar el archivo y procesarlo en segundo plano (ver trabajos.py)
+        trabajo, duplicado = trabajos.crear_trabajo(
+            'PRODUCTOS',
+            archivo,
+            usuario=request.user.username if request.user.is_authenticated else 'Sistema',
+            forzar=bool(request.POST.get('forzar')),
+        )
+        if duplicado:
+            messages.warning(
+                request,
+                f"⚠️ Este archivo ya se importó el {timezone.localtime(trabajo.fecha_creacion):%d/%m/%Y %H:%M}; "
+                f"no se volvió a importar para no duplicar el stock"
+            )
+        
+        return redirect(f"{reverse('importar_excel')}?{urlencode({'trabajo': trabajo.pk, 'redirect_to': redirect_to})}")
     
     # GET: Mostrar formulario con unidades disponibles
     unidades_disponibles = Unidad.objects.filter(activo=True).order_by('nombre')
@@ -401,11 +185,57 @@ def importar_excel(request):
     # Obtener desde dónde se llamó para redirigir correctamente
     redirect_to = request.GET.get('redirect_to', 'InventarioAG')
     
+    # Importación en curso o recién terminada
+    trabajo = None
+    if request.GET.get('trabajo', '').isdigit():
+        trabajo = TrabajoImportacion.objects.filter(pk=request.GET['trabajo'], tipo='PRODUCTOS').first()
+    
     return render(request, 'almacenes/importar_excel.html', {
         'unidades_disponibles': unidades_disponibles,
-        'redirect_to': redirect_to
+        'redirect_to': redirect_to,
+        'stock_minimo_defecto': settings.STOCK_MINIMO_DEFECTO,
+        'stock_minimo_unidades': importacion.stock_minimo_unidades(),
+        'trabajo': trabajo,
     })
 
+@require_POST
+def validar_excel(request):
+    """Validación en seco del Excel de productos: no importa nada"""
+    redirect_to = request.POST.get('redirect_to', 'InventarioAG')
+    url_formulario = f"{reverse('importar_excel')}?{urlencode({'redirect_to': redirect_to})}"
+    
+    archivo = request.FILES.get('archivo_excel')
+    if not archivo:
+        messages.error(request, 'Selecciona un archivo Excel para validar')
+        return redirect(url_formulario)
+    
+    try:
+        df = validacion_excel.leer_dataframe(archivo)
+        errores, resumen = validacion_excel.validar(df)
+    except lector_excel.ErrorArchivo as e:
+        messages.error(request, str(e))
+        return redirect(url_formulario)
+    
+    if not resumen['filas']:
+        messages.warning(request, 'El archivo no tiene filas de datos, solo el encabezado')
+        return redirect(url_formulario)
+    
+    if not resumen['errores']:
+        messages.success(
+            request,
+            f"✅ El archivo no tiene errores: se crearían {resumen['nuevos']} productos "
+            f"y se actualizarían {resumen['existentes']}"
+        )
+        return redirect(url_formulario)
+    
+    # Con errores: devolver el mismo archivo con las celdas marcadas
+    nombre = f"errores_{os.path.splitext(archivo.name)[0]}.xlsx"
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    response['X-Filas-Con-Error'] = resumen['filas_con_error']
+    validacion_excel.guardar_libro_anotado(df, errores, response)
+    return response
+
 def descargar_plantilla(request):
     """Descargar plantilla Excel para importación de productos"""
     # Crear workbook
@@ -414,7 +244,7 @@ def descargar_plantilla(request):
     ws.title = "Plantilla Productos"
     
     # Headers - ORDEN CORRECTO
-    headers = ['codigo_almacen', 'codigo_producto', 'nombre', 'descripcion', 'cantidad', 'unidad', 'estado', 'estante', 'observaciones']
+    headers = ['codigo_almacen', 'codigo_producto', 'nombre', 'descripcion', 'cantidad', 'unidad', 'stock_minimo', 'estante', 'observaciones']
     
     # Estilo de headers
     header_fill = PatternFill(start_color="148129", end_color="148129", fill_type="solid")
@@ -441,7 +271,7 @@ def descargar_plantilla(request):
         'Opcional',
         'Obligatorio (número)',
         'Ej: Unidad, Caja, Kg',
-        'DISP, AGOT o BAJO',
+        'Opcional (umbral stock bajo)',
         'Opcional (Ej: A1, B2)',
         'Opcional'
     ]
@@ -453,17 +283,17 @@ def descargar_plantilla(request):
     
     # Datos de ejemplo
     ejemplos = [
-        ['01', 'PRD-001', 'Balón de Fútbol', 'Balón profesional N°5', 50, 'Unidad', 'DISP', 'A1', 'Stock nuevo'],
-        ['01', 'PRD-002', 'Papel Bond A4', 'Paquete de 500 hojas', 100, 'Paquete', 'DISP', 'B2', ''],
-        ['02', 'PRD-003', 'Raqueta Tenis', '', 15, 'Unidad', 'BAJO', 'C1', 'Reabastecer'],
-        ['03', 'PRD-004', 'Marcadores', 'Caja de 12 permanentes', 30, 'Caja', 'DISP', '', ''],
+        ['01', 'PRD-001', 'Balón de Fútbol', 'Balón profesional N°5', 50, 'Unidad', 10, 'A1', 'Stock nuevo'],
+        ['01', 'PRD-002', 'Papel Bond A4', 'Paquete de 500 hojas', 100, 'Paquete', '', 'B2', ''],
+        ['02', 'PRD-003', 'Raqueta Tenis', '', 15, 'Unidad', 20, 'C1', 'Reabastecer'],
+        ['03', 'PRD-004', 'Marcadores', 'Caja de 12 permanentes', 30, 'Caja', '', '', ''],
     ]
     
     for row_idx, ejemplo in enumerate(ejemplos, 3):
         for col_idx, value in enumerate(ejemplo, 1):
             cell = ws.cell(row=row_idx, column=col_idx, value=value)
             cell.border = border
-            if col_idx in [1, 2, 7]:  # Códigos y estado
+            if col_idx in [1, 2]:  # Códigos
                 cell.font = Font(bold=True)
     
     # Ajustar anchos
@@ -479,20 +309,93 @@ def descargar_plantilla(request):
     return response
 
 
+@require_GET
+def exportar(request, recurso, formato):
+    """Descarga por streaming de productos, movimientos o pedidos (csv, jsonl, xlsx)"""
+    if recurso not in exportacion.EXPORTACIONES or formato not in exportacion.FORMATOS:
+        raise Http404("Exportación no disponible")
+
+    contenido, content_type, nombre = exportacion.generar(recurso, formato, request.GET)
+
+    response = StreamingHttpResponse(contenido, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
 # ==============================================================================
 # PEDIDOS DE COMPRA - GESTIÓN PRINCIPAL
 # ==============================================================================
 
+ORDENES_PEDIDOS = {
+    'monto_desc': '-total_general',
+    'monto_asc': 'total_general',
+}
+
+
 def PedidosCompra(request):
     """Lista de todos los pedidos de compra"""
+    # Los totales están guardados en el pedido: ordenar por monto usa su índice
+    orden = request.GET.get('orden', '')
     pedidos = PedidoCompra.objects.all()
+    if orden in ORDENES_PEDIDOS:
+        pedidos = pedidos.order_by(ORDENES_PEDIDOS[orden], '-fecha_creacion')
+    pedidos = list(pedidos)
     context = {
         'pedidos': pedidos,
-        'total_pedidos': pedidos.count()
+        'total_pedidos': len(pedidos),
+        'orden': orden,
     }
     return render(request, 'almacenes/almgeneral/PedidosCompra.html', context)
 
 
+@require_GET
+def ExportarPedidosZip(request):
+    """ZIP por streaming de los pedidos filtrados (desde, hasta, estado) con sus documentos"""
+    pedidos = zip_pedidos.pedidos_filtrados(request.GET)
+    if not pedidos.exists():
+        messages.warning(request, 'No hay pedidos de compra con esos filtros para exportar')
+        return redirect('PedidosCompra')
+
+    response = StreamingHttpResponse(zip_pedidos.generar(pedidos), content_type='application/zip')
+    response['Content-Disposition'] = f'attachment; filename="{zip_pedidos.nombre_archivo()}"'
+    response['Cache-Control'] = 'no-store'
+    return response
+
+
+@require_GET
+def AnaliticaCompras(request):
+    """Panel de compras: gasto por proveedor y por almacén, e historial de precios de un producto"""
+    # Solo recalcula los meses con cambios; si no hay ninguno es una consulta
+    analitica_compras.actualizar()
+    desde, hasta = analitica_compras.periodo(
+        analitica_compras.parse_mes(request.GET.get('desde')),
+        analitica_compras.parse_mes(request.GET.get('hasta')),
+    )
+    codigo = request.GET.get('producto', '').strip()
+    producto = None
+    if codigo:
+        producto = ProductoAlmacen.objects.select_related('unidad').filter(codigo_producto=codigo).first()
+        if not producto:
+            messages.warning(request, f'No existe un producto con el código {codigo}')
+
+    proveedores = analitica_compras.gasto_por_proveedor(desde, hasta)
+    gasto_almacen = analitica_compras.gasto_por_almacen(desde, hasta)
+    context = {
+        'desde': desde,
+        'hasta': hasta,
+        'proveedores': proveedores,
+        'total_proveedores': sum((fila['total'] for fila in proveedores), Decimal('0.00')),
+        'almacenes': [nombre for _, nombre in ProductoAlmacen.UBICACION_CHOICES],
+        'gasto_almacen': gasto_almacen,
+        'total_almacenes': sum((fila['total'] for fila in gasto_almacen), Decimal('0.00')),
+        'codigo_producto': codigo,
+        'producto': producto,
+        'precios': analitica_compras.historial_precios(producto, desde, hasta) if producto else [],
+    }
+    return render(request, 'almacenes/almgeneral/AnaliticaCompras.html', context)
+
+
 def CrearPedidoCompra(request):
     """Crear nuevo pedido de compra (Wizard)"""
     if request.method == 'POST':
@@ -526,23 +429,34 @@ def CrearPedidoCompra(request):
                     messages.error(request, 'Solo se permiten archivos PDF o Word (.pdf, .doc, .docx)')
                     return redirect('CrearPedidoCompra')
             
-            # Crear pedido
-            pedido = PedidoCompra.objects.create(
-                nombre=nombre,
-                descripcion=descripcion,
-                archivo=archivo if archivo else None
-            )
+            # Validar todas las líneas antes de escribir nada
+            lineas, errores = _lineas_pedido(productos)
+            total_general = sum((linea['cantidad'] * linea['precio'] for linea in lineas), Decimal('0.00'))
+            if total_general >= _maximo(PedidoCompra, 'total_general'):
+                errores.append('el total del pedido es demasiado grande')
+            if errores:
+                messages.error(request, 'No se creó el pedido: ' + '; '.join(errores))
+                return redirect('CrearPedidoCompra')
             
-            # Crear items del pedido
-            for producto_data in productos:
-                producto = ProductoAlmacen.objects.get(id_producto=producto_data['id'])
-                ItemPedido.objects.create(
-                    pedido=pedido,
-                    producto=producto,
-                    cantidad_solicitada=producto_data['cantidad'],
-                    precio_unitario=producto_data['precio'],
-                    observaciones=''
+            # Pedido e items en una transacción: si algo falla no queda a medias
+            with transaction.atomic():
+                pedido = PedidoCompra.objects.create(
+                    nombre=nombre,
+                    descripcion=descripcion,
+                    archivo=archivo if archivo else None,
+                    total_items=len(lineas),
+                    total_general=total_general,
                 )
+                ItemPedido.objects.bulk_create([
+                    ItemPedido(
+                        pedido=pedido,
+                        producto=linea['producto'],
+                        cantidad_solicitada=linea['cantidad'],
+                        precio_unitario=linea['precio'],
+                        observaciones=''
+                    )
+                    for linea in lineas
+                ])
             
             messages.success(request, f'Pedido "{pedido.nombre}" creado exitosamente con {len(productos)} productos')
             return redirect('PedidosCompra')
@@ -552,29 +466,62 @@ def CrearPedidoCompra(request):
             return redirect('CrearPedidoCompra')
     
     # GET request
-    productos = ProductoAlmacen.objects.all().order_by('nombre')
+    productos = ProductoAlmacen.objects.select_related('unidad').order_by('nombre')
     context = {
         'productos': productos,
     }
     return render(request, 'almacenes/almgeneral/Pedido_Compra/CrearPedidoCompra.html', context)
 
 
+def _lineas_pedido(productos):
+    """
+    Valida las líneas del wizard ([{'id', 'cantidad', 'precio'}, ...]) y
+    resuelve todos los productos con una sola consulta. Devuelve (lineas,
+    errores); cada línea trae el producto, la cantidad y el precio ya
+    convertidos.
+    """
+    lineas = []
+    errores = []
+    maximo = _maximo(ItemPedido, 'precio_unitario')
+    for numero, producto_data in enumerate(productos, start=1):
+        try:
+            id_producto = int(producto_data['id'])
+            cantidad = int(producto_data['cantidad'])
+        except (KeyError, TypeError, ValueError):
+            errores.append(f'línea {numero}: datos inválidos')
+            continue
+        precio = _precio(producto_data.get('precio'), maximo)
+        if cantidad <= 0:
+            errores.append(f'línea {numero}: la cantidad debe ser mayor a 0')
+        elif precio is None:
+            errores.append(f'línea {numero}: precio inválido')
+        else:
+            lineas.append({'id': id_producto, 'cantidad': cantidad, 'precio': precio})
+
+    encontrados = ProductoAlmacen.objects.in_bulk({linea['id'] for linea in lineas})
+    for linea in lineas:
+        linea['producto'] = encontrados.get(linea['id'])
+        if linea['producto'] is None:
+            errores.append(f'el producto {linea["id"]} ya no existe')
+    return lineas, errores
+
+
 def DetallePedido(request, id_pedido):
     """Ver detalles de un pedido específico"""
-    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
-    items = pedido.items.all()
+    pedido = get_object_or_404(PedidoCompra.objects.con_resumen(), id_pedido=id_pedido)
+    items = pedido.items.select_related('producto')
     
     context = {
         'pedido': pedido,
         'items': items,
-        'total_items': items.count(),
+        'total_items': pedido.total_items,
     }
     return render(request, 'almacenes/almgeneral/Pedido_Compra/DetallePedido.html', context)
 
 
 def EditarPedido(request, id_pedido):
     """Editar un pedido de compra existente"""
-    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
+    pedido = get_object_or_404(PedidoCompra.objects.con_resumen(), id_pedido=id_pedido)
     productos = ProductoAlmacen.objects.all().order_by('nombre')
     
     if request.method == 'POST':
@@ -623,6 +570,7 @@ def EditarPedido(request, id_pedido):
     
     context = {
         'pedido': pedido,
+        'items': pedido.items.select_related('producto'),
         'productos': productos,
     }
     return render(request, 'almacenes/almgeneral/Pedido_Compra/EditarPedido.html', context)
@@ -631,10 +579,7 @@ def EditarPedido(request, id_pedido):
 @require_http_methods(["GET", "POST"])
 def EliminarPedido(request, id_pedido):
     """Eliminar un pedido de compra"""
-    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
-    
-    # Calcular total de cotizaciones
-    pedido.total_cotizaciones = pedido.cotizaciones.count()
+    pedido = get_object_or_404(PedidoCompra.objects.con_resumen(), id_pedido=id_pedido)
     
     if request.method == 'POST':
         try:
@@ -677,14 +622,19 @@ def AgregarItemPedido(request, id_pedido):
         
         try:
             producto = ProductoAlmacen.objects.get(id_producto=producto_id)
+            precio = _precio(precio_unitario, _maximo(ItemPedido, 'precio_unitario'))
+            if precio is None:
+                raise ValueError('precio inválido')
             
-            ItemPedido.objects.create(
-                pedido=pedido,
-                producto=producto,
-                cantidad_solicitada=int(cantidad),
-                precio_unitario=float(precio_unitario),
-                observaciones=observaciones
-            )
+            with transaction.atomic():
+                item = ItemPedido.objects.create(
+                    pedido=pedido,
+                    producto=producto,
+                    cantidad_solicitada=int(cantidad),
+                    precio_unitario=precio,
+                    observaciones=observaciones
+                )
+                PedidoCompra.ajustar_totales(pedido.pk, items=1, monto=item.subtotal())
             
             messages.success(request, f'Producto "{producto.nombre}" agregado al pedido')
         except Exception as e:
@@ -706,12 +656,18 @@ def EditarItemPedido(request, id_pedido):
         
         try:
             producto = ProductoAlmacen.objects.get(id_producto=producto_id)
+            precio = _precio(precio_unitario, _maximo(ItemPedido, 'precio_unitario'))
+            if precio is None:
+                raise ValueError('precio inválido')
             
+            subtotal_anterior = item.subtotal()
             item.producto = producto
             item.cantidad_solicitada = int(cantidad)
-            item.precio_unitario = float(precio_unitario)
+            item.precio_unitario = precio
             item.observaciones = observaciones
-            item.save()
+            with transaction.atomic():
+                item.save()
+                PedidoCompra.ajustar_totales(item.pedido_id, monto=item.subtotal() - subtotal_anterior)
             
             messages.success(request, f'Producto "{producto.nombre}" actualizado')
         except Exception as e:
@@ -740,7 +696,9 @@ def EliminarItemPedido(request, item_id):
     """Eliminar un item del pedido"""
     try:
         item = ItemPedido.objects.get(id_item=item_id)
-        item.delete()
+        with transaction.atomic():
+            PedidoCompra.ajustar_totales(item.pedido_id, items=-1, monto=-item.subtotal())
+            item.delete()
         return JsonResponse({'success': True})
     except ItemPedido.DoesNotExist:
         return JsonResponse({'success': False, 'error': 'Item no encontrado'}, status=404)
@@ -756,127 +714,12 @@ def GenerarPDFPedido(request):
         try:
             data = json.loads(request.POST.get('data'))
             nombre = data.get('nombre', 'Pedido de Compra')
-            descripcion = data.get('descripcion', '')
-            productos = data.get('productos', [])
             
             # Crear respuesta HTTP
             response = HttpResponse(content_type='application/pdf')
             response['Content-Disposition'] = f'attachment; filename="Pedido_{nombre.replace(" ", "_")}.pdf"'
             
-            # Crear PDF
-            doc = SimpleDocTemplate(response, pagesize=letter)
-            elements = []
-            styles = getSampleStyleSheet()
-            
-            # Estilo personalizado para el título
-            title_style = ParagraphStyle(
-                'CustomTitle',
-                parent=styles['Heading1'],
-                fontSize=20,
-                textColor=colors.HexColor('#148129'),
-                spaceAfter=30,
-                alignment=TA_CENTER
-            )
-            
-            # Título
-            title = Paragraph(f"PEDIDO DE COMPRA", title_style)
-            elements.append(title)
-            
-            # Información del pedido
-            info_data = [
-                ['Nombre del Pedido:', nombre],
-                ['Fecha de Generación:', datetime.now().strftime('%d/%m/%Y %H:%M')],
-                ['Descripción:', descripcion if descripcion else 'Sin descripción'],
-            ]
-            
-            info_table = Table(info_data, colWidths=[2*inch, 4.5*inch])
-            info_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f5f5f5')),
-                ('TEXTCOLOR', (0, 0), (-1, -1), colors.black),
-                ('ALIGN', (0, 0), (0, -1), 'RIGHT'),
-                ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, -1), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, -1), 12),
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-            ]))
-            
-            elements.append(info_table)
-            elements.append(Spacer(1, 20))
-            
-            # Título de tabla de productos
-            subtitle = Paragraph("PRODUCTOS SOLICITADOS", styles['Heading2'])
-            elements.append(subtitle)
-            elements.append(Spacer(1, 10))
-            
-            # Tabla de productos
-            table_data = [
-                ['N°', 'Código', 'Producto', 'Cantidad', 'Unidad', 'Precio Unit.', 'Subtotal']
-            ]
-            
-            total_general = 0
-            
-            for i, producto in enumerate(productos, 1):
-                subtotal = producto['cantidad'] * producto['precio']
-                total_general += subtotal
-                
-                table_data.append([
-                    str(i),
-                    producto['codigo'],
-                    producto['nombre'],
-                    str(producto['cantidad']),
-                    producto['unidad'],
-                    f"S/. {producto['precio']:.2f}",
-                    f"S/. {subtotal:.2f}"
-                ])
-            
-            # Agregar fila de total
-            table_data.append([
-                '', '', '', '', '', 'TOTAL:', f"S/. {total_general:.2f}"
-            ])
-            
-            products_table = Table(table_data, colWidths=[0.4*inch, 1*inch, 2.5*inch, 0.8*inch, 0.8*inch, 1*inch, 1*inch])
-            products_table.setStyle(TableStyle([
-                # Header
-                ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#148129')),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, 0), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 10),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                
-                # Body
-                ('TEXTCOLOR', (0, 1), (-1, -2), colors.black),
-                ('ALIGN', (0, 1), (0, -2), 'CENTER'),  # N°
-                ('ALIGN', (1, 1), (1, -2), 'LEFT'),    # Código
-                ('ALIGN', (2, 1), (2, -2), 'LEFT'),    # Producto
-                ('ALIGN', (3, 1), (3, -2), 'CENTER'),  # Cantidad
-                ('ALIGN', (4, 1), (4, -2), 'CENTER'),  # Unidad
-                ('ALIGN', (5, 1), (-1, -2), 'RIGHT'),  # Precios
-                ('FONTNAME', (0, 1), (-1, -2), 'Helvetica'),
-                ('FONTSIZE', (0, 1), (-1, -2), 9),
-                
-                # Total row
-                ('BACKGROUND', (0, -1), (-1, -1), colors.HexColor('#f5f5f5')),
-                ('FONTNAME', (0, -1), (-1, -1), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, -1), (-1, -1), 11),
-                ('ALIGN', (0, -1), (-2, -1), 'RIGHT'),
-                ('ALIGN', (-1, -1), (-1, -1), 'RIGHT'),
-                
-                # Grid
-                ('GRID', (0, 0), (-1, -1), 1, colors.grey),
-                ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ]))
-            
-            elements.append(products_table)
-            elements.append(Spacer(1, 30))
-            
-            # Footer
-            footer_text = f"Total de productos: {len(productos)} | Total general: S/. {total_general:.2f}"
-            footer = Paragraph(footer_text, styles['Normal'])
-            elements.append(footer)
-            
-            # Generar PDF
-            doc.build(elements)
+            response.write(servicio_pdf.generar(*servicio_pdf.datos_navegador(data)))
             
             return response
             
@@ -887,19 +730,30 @@ def GenerarPDFPedido(request):
     return redirect('CrearPedidoCompra')
 
 
+@require_GET
+@versiones.por_version(lambda id_pedido: [versiones.clave_pedido(id_pedido)])
+def PDFPedido(request, id_pedido):
+    """PDF de un pedido guardado, generado desde la base y cacheado por versión"""
+    try:
+        ruta = pdf_pedidos.obtener(id_pedido)
+    except PedidoCompra.DoesNotExist:
+        raise Http404('Pedido no encontrado')
+    return descargas.entregar(ruta, 'application/pdf', f'PC-{id_pedido:04d}.pdf')
+
+
 # ==============================================================================
 # COTIZACIONES
 # ==============================================================================
 
 def CotizacionesPedido(request, id_pedido):
     """Ver cotizaciones asociadas a un pedido"""
-    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
+    pedido = get_object_or_404(PedidoCompra.objects.con_resumen(), id_pedido=id_pedido)
     cotizaciones = pedido.cotizaciones.all()
     
     context = {
         'pedido': pedido,
         'cotizaciones': cotizaciones,
-        'total_cotizaciones': cotizaciones.count()
+        'total_cotizaciones': pedido.total_cotizaciones
     }
     return render(request, 'almacenes/almgeneral/Pedido_Compra/CotizacionesPedido.html', context)
 
@@ -910,7 +764,7 @@ def AgregarCotizacion(request, id_pedido):
     
     if request.method == 'POST':
         proveedor = request.POST.get('proveedor')
-        monto = request.POST.get('monto')
+        monto = request.POST.get('monto') or None
         descripcion = request.POST.get('descripcion', '')
         documento = request.FILES.get('documento')
         
@@ -918,7 +772,19 @@ def AgregarCotizacion(request, id_pedido):
             messages.error(request, 'El nombre del proveedor es obligatorio')
             return redirect('AgregarCotizacion', id_pedido=id_pedido)
         
-        if not monto:
+        precios, errores = _precios_cotizacion(request.POST, pedido)
+        if errores:
+            messages.error(request, 'Revisa los precios por item: ' + '; '.join(errores[:5]))
+            return redirect('AgregarCotizacion', id_pedido=id_pedido)
+        
+        # Con precios por item el monto puede quedar vacío: es su suma
+        if monto is None and precios:
+            monto = sum((precio * cantidad for precio, cantidad in precios.values()), Decimal('0.00'))
+            if monto >= _maximo(Cotizacion, 'monto'):
+                messages.error(request, 'La suma de los precios por item excede el monto máximo de una cotización')
+                return redirect('AgregarCotizacion', id_pedido=id_pedido)
+        
+        if monto is None:
             messages.error(request, 'El monto es obligatorio')
             return redirect('AgregarCotizacion', id_pedido=id_pedido)
         
@@ -934,14 +800,27 @@ def AgregarCotizacion(request, id_pedido):
             return redirect('AgregarCotizacion', id_pedido=id_pedido)
         
         try:
-            cotizacion = Cotizacion.objects.create(
-                pedido=pedido,
-                proveedor=proveedor,
-                monto=monto,
-                descripcion=descripcion,
-                documento=documento
-            )
+            with transaction.atomic():
+                cotizacion = Cotizacion.objects.create(
+                    pedido=pedido,
+                    proveedor=proveedor,
+                    monto=monto,
+                    descripcion=descripcion,
+                    documento=documento
+                )
+                PrecioCotizacion.objects.bulk_create([
+                    PrecioCotizacion(cotizacion=cotizacion, item_id=item_id, precio_unitario=precio)
+                    for item_id, (precio, _) in precios.items()
+                ])
+                PedidoCompra.ajustar_totales(pedido.pk, cotizaciones=1)
             messages.success(request, f'Cotización de "{proveedor}" agregada exitosamente')
+            # Mismo hash = mismo archivo: se guardó una sola vez en disco
+            sha256 = almacenamiento.sha256_de(cotizacion.documento.name)
+            repetida = sha256 and pedido.cotizaciones.filter(
+                documento__startswith=almacenamiento.directorio(sha256) + '/'
+            ).exclude(pk=cotizacion.pk).values_list('id_cotizacion', flat=True).first()
+            if repetida:
+                messages.warning(request, f'El documento es idéntico al de la cotización COT-{repetida:04d}')
             return redirect('CotizacionesPedido', id_pedido=id_pedido)
         except Exception as e:
             messages.error(request, f'Error al agregar cotización: {str(e)}')
@@ -949,10 +828,59 @@ def AgregarCotizacion(request, id_pedido):
     
     context = {
         'pedido': pedido,
+        'items': pedido.items.select_related('producto__unidad').order_by('id_item'),
     }
     return render(request, 'almacenes/almgeneral/Pedido_Compra/AgregarCotizacion.html', context)
 
 
+def _precios_cotizacion(datos, pedido):
+    """
+    Precios por item del formulario (campos precio_<id_item>; los vacíos se
+    omiten). Devuelve ({id_item: (precio, cantidad)}, errores).
+    """
+    precios = {}
+    errores = []
+    maximo = _maximo(PrecioCotizacion, 'precio_unitario')
+    for item_id, cantidad in pedido.items.values_list('id_item', 'cantidad_solicitada'):
+        valor = (datos.get(f'precio_{item_id}') or '').strip()
+        if not valor:
+            continue
+        precio = _precio(valor, maximo)
+        if precio is None:
+            errores.append(f'item {item_id}: precio inválido')
+        else:
+            precios[item_id] = (precio, cantidad)
+    return precios, errores
+
+
+def _maximo(modelo, campo):
+    """Primer valor que ya no cabe en el DecimalField (max_digits / decimal_places)"""
+    campo = modelo._meta.get_field(campo)
+    return Decimal(10) ** (campo.max_digits - campo.decimal_places)
+
+
+def _precio(valor, maximo):
+    """Precio redondeado a céntimos si está en [0, maximo); None si no es válido"""
+    try:
+        precio = Decimal(str(valor).strip()).quantize(Decimal('0.01'))
+    except ArithmeticError:
+        return None
+    if not precio.is_finite() or not 0 <= precio < maximo:
+        return None
+    return precio
+
+
+@require_GET
+def CompararCotizaciones(request, id_pedido):
+    """Matriz de precios por item y proveedor: mejor cotización completa, mejor división y ahorro"""
+    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
+    context = {
+        'pedido': pedido,
+        'comparacion': comparacion_cotizaciones.comparar(pedido),
+    }
+    return render(request, 'almacenes/almgeneral/Pedido_Compra/Compararcotizaciones.html', context)
+
+
 def SeleccionarCotizacion(request, id_cotizacion):
     """Seleccionar cotización ganadora"""
     cotizacion = get_object_or_404(Cotizacion, id_cotizacion=id_cotizacion)
@@ -981,7 +909,7 @@ def SeleccionarCotizacion(request, id_cotizacion):
 
 def MarcarEntregado(request, id_pedido):
     """Marcar pedido como entregado"""
-    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
+    pedido = get_object_or_404(PedidoCompra.objects.con_resumen(), id_pedido=id_pedido)
     
     if pedido.estado != 'COMP':
         messages.error(request, 'Solo puedes marcar como entregado pedidos que están COMPLETADOS')
@@ -1022,50 +950,49 @@ def MarcarEntregado(request, id_pedido):
 @xframe_options_exempt
 @cache_control(max_age=3600, public=True)
 def ver_documento(request, cotizacion_id):
-    """Vista para servir documentos sin servicios externos"""
+    """Vista para servir documentos sin servicios externos (con Range y 304)"""
     cotizacion = get_object_or_404(Cotizacion, id_cotizacion=cotizacion_id)
-    
-    if not cotizacion.documento:
-        raise Http404("Documento no encontrado")
-    
-    file_path = cotizacion.documento.path
-    
-    if not os.path.exists(file_path):
-        raise Http404("Archivo físico no encontrado")
-    
-    filename = os.path.basename(file_path)
-    extension = filename.split('.')[-1].lower()
-    
-    mime_types = {
-        'pdf': 'application/pdf',
-        'doc': 'application/msword',
-        'docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
-    }
-    
-    content_type = mime_types.get(extension, 'application/octet-stream')
-    
-    try:
-        response = FileResponse(open(file_path, 'rb'), content_type=content_type)
-        response['Content-Disposition'] = f'inline; filename="{filename}"'
-        response['X-Content-Type-Options'] = 'nosniff'
-        response['Accept-Ranges'] = 'bytes'
-        
-        if extension == 'pdf':
-            response['Content-Type'] = 'application/pdf'
-        
-        return response
-    except Exception as e:
-        raise Http404(f"Error: {str(e)}")
+    return descargas.servir(request, cotizacion.documento)
+
+
+@xframe_options_exempt
+@cache_control(max_age=3600, public=True)
+def ver_archivo_pedido(request, id_pedido):
+    """Archivo adjunto del pedido (con Range y 304)"""
+    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
+    return descargas.servir(request, pedido.archivo)
+
+
+@xframe_options_exempt
+@cache_control(max_age=3600, public=True)
+def ver_documento_entrega(request, id_pedido):
+    """Documento de entrega del pedido (con Range y 304)"""
+    pedido = get_object_or_404(PedidoCompra, id_pedido=id_pedido)
+    return descargas.servir(request, pedido.documento_entrega)
 
 
 # ==============================================================================
 # API / AJAX ENDPOINTS
 # ==============================================================================
 
+def _version_ultimo_producto(request):
+    """ETag / Last-Modified del último producto: una lectura por índice de la PK"""
+    ultimo = ProductoAlmacen.objects.order_by('-id_producto').values_list(
+        'id_producto', 'ultima_actualizacion'
+    ).first()
+    if ultimo is None:
+        return None, None
+    id_producto, actualizado = ultimo
+    return f'{id_producto}-{actualizado.timestamp()}', actualizado
+
+
+@gzip_page
+@cache_control(private=True, no_cache=True)
+@versiones.condicional(_version_ultimo_producto)
 def api_ultimo_producto(request):
     """API para obtener el último producto creado"""
     try:
-        ultimo_producto = ProductoAlmacen.objects.latest('id_producto')
+        ultimo_producto = ProductoAlmacen.objects.select_related('unidad').latest('id_producto')
         
         data = {
             'id_producto': ultimo_producto.id_producto,
@@ -1079,4 +1006,91 @@ def api_ultimo_producto(request):
         return JsonResponse(data)
         
     except ProductoAlmacen.DoesNotExist:
-        return JsonResponse({'error': 'No hay productos'}, status=404)
\ No newline at end of file
+        return JsonResponse({'error': 'No hay productos'}, status=404)
+
+@require_GET
+def api_buscar(request):
+    """Búsqueda global (productos, alumnos, salones, pedidos) ordenada por relevancia"""
+    texto = request.GET.get('q', '').strip()
+    tipo = request.GET.get('tipo') or None
+
+    if tipo and tipo not in busqueda.TIPOS:
+        return JsonResponse({'error': f'Tipo no válido: {tipo}'}, status=400)
+
+    try:
+        pagina = max(1, int(request.GET.get('pagina', 1)))
+    except ValueError:
+        pagina = 1
+
+    resultados, hay_siguiente = busqueda.buscar(texto, tipo=tipo, pagina=pagina)
+
+    return JsonResponse({
+        'q': texto,
+        'tipo': tipo,
+        'pagina': pagina,
+        'hay_siguiente': hay_siguiente,
+        'resultados': resultados,
+    })
+
+
+@require_GET
+def api_historial_stock(request, id_producto):
+    """
+    Stock histórico de un producto: ?fecha=AAAA-MM-DD para un día puntual o
+    ?desde=...&hasta=... para la serie diaria
+    """
+    producto = get_object_or_404(ProductoAlmacen, id_producto=id_producto)
+
+    fecha = parse_date(request.GET.get('fecha', ''))
+    desde = parse_date(request.GET.get('desde', ''))
+    hasta = parse_date(request.GET.get('hasta', '')) or timezone.localdate()
+
+    if fecha:
+        return JsonResponse({
+            'id_producto': producto.id_producto,
+            'fecha': fecha.isoformat(),
+            'cantidad': stock_en_fecha(producto, fecha),
+        })
+
+    if not desde:
+        return JsonResponse({'error': 'Indica ?fecha= o ?desde= (AAAA-MM-DD)'}, status=400)
+    if desde > hasta or (hasta - desde).days > 366:
+        return JsonResponse({'error': 'Rango de fechas no válido (máximo 366 días)'}, status=400)
+
+    serie = serie_stock(producto, desde, hasta)
+    return JsonResponse({
+        'id_producto': producto.id_producto,
+        'desde': desde.isoformat(),
+        'hasta': hasta.isoformat(),
+        'serie': [{'fecha': dia.isoformat(), 'cantidad': cantidad} for dia, cantidad in serie],
+    })
+
+
+@require_GET
+def api_precios_producto(request, id_producto):
+    """Historial mensual de precios pedidos de un producto (desde los resúmenes de compras)"""
+    producto = get_object_or_404(ProductoAlmacen, id_producto=id_producto)
+    analitica_compras.actualizar()
+    return JsonResponse({
+        'id_producto': producto.id_producto,
+        'codigo_producto': producto.codigo_producto,
+        'precios': [
+            {
+                'mes': precio.mes.strftime('%Y-%m'),
+                'pedidos': precio.pedidos,
+                'cantidad': precio.cantidad,
+                'monto': str(precio.monto),
+                'precio_min': str(precio.precio_min),
+                'precio_max': str(precio.precio_max),
+                'precio_promedio': str(precio.precio_promedio),
+            }
+            for precio in analitica_compras.historial_precios(producto)
+        ],
+    })
+
+
+@require_GET
+def api_importacion(request, trabajo_id):
+    """Avance y resumen de una importación en segundo plano"""
+    trabajo = get_object_or_404(TrabajoImportacion, pk=trabajo_id)
+    return JsonResponse(trabajos.progreso(trabajo))
@@ -0,0 +1,142 @@
+"""
+Exportación en ZIP de pedidos de compra con sus documentos, para auditoría.
+
+Por cada pedido filtrado (rango de fechas de creación y estado) el ZIP
+lleva una carpeta con el PDF del pedido, el archivo adjunto, los documentos
+de las cotizaciones y el documento de entrega, más un indice.csv con el
+resumen de todos los pedidos y los archivos que no se encontraron.
+
+El ZIP se escribe a medida que se envía: ZipFile escribe sobre un destino
+sin seek (usa descriptores de datos) y cada archivo se copia desde el
+storage por bloques, así que ni el ZIP ni los documentos se cargan enteros
+en memoria. Los PDF salen de la caché de pdf_pedidos; los que faltan se
+generan en paralelo mientras se envían los anteriores.
+"""
+import csv
+import io
+import os
+import zipfile
+
+from django.core.files import File
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.text import get_valid_filename
+
+from . import pdf_pedidos
+from .models import PedidoCompra
+
+TAMANO_CHUNK_ARCHIVO = 64 * 1024
+
+# Los documentos (PDF, docx) ya vienen comprimidos: el nivel 1 basta
+NIVEL_COMPRESION = 1
+
+COLUMNAS_INDICE = [
+    'codigo', 'pedido', 'estado', 'fecha_creacion', 'fecha_entrega',
+    'total_items', 'total_general', 'cotizaciones', 'archivos', 'faltantes',
+]
+
+
+def pedidos_filtrados(params):
+    """Pedidos del rango `desde`/`hasta` (fecha de creación) y `estado`"""
+    pedidos = PedidoCompra.objects.con_resumen().prefetch_related('cotizaciones').order_by('id_pedido')
+    desde = parse_date(params.get('desde') or '')
+    hasta = parse_date(params.get('hasta') or '')
+    if desde:
+        pedidos = pedidos.filter(fecha_creacion__date__gte=desde)
+    if hasta:
+        pedidos = pedidos.filter(fecha_creacion__date__lte=hasta)
+    if params.get('estado') in dict(PedidoCompra.ESTADO_CHOICES):
+        pedidos = pedidos.filter(estado=params['estado'])
+    return pedidos
+
+
+def nombre_archivo():
+    return f"pedidos_compra_{timezone.localtime().strftime('%Y%m%d_%H%M')}.zip"
+
+
+class _Salida:
+    """Destino write-only del ZipFile: guarda lo escrito hasta que se envía"""
+    def __init__(self):
+        self.bloques = []
+
+    def write(self, datos):
+        self.bloques.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self.bloques)
+        self.bloques.clear()
+        return datos
+
+
+def _documentos(pedido, ruta_pdf):
+    """(nombre dentro de la carpeta, función que abre el archivo) del pedido"""
+    codigo = f'PC-{pedido.id_pedido:04d}'
+    yield f'{codigo}.pdf', lambda: File(open(ruta_pdf, 'rb'))
+    if pedido.archivo:
+        yield f'pedido_{_base(pedido.archivo)}', _abridor(pedido.archivo)
+    for cotizacion in pedido.cotizaciones.all():
+        if cotizacion.documento:
+            yield (
+                f'cotizaciones/COT-{cotizacion.id_cotizacion:04d}_{_base(cotizacion.documento)}',
+                _abridor(cotizacion.documento),
+            )
+    if pedido.documento_entrega:
+        yield f'entrega_{_base(pedido.documento_entrega)}', _abridor(pedido.documento_entrega)
+
+
+def _base(campo):
+    return os.path.basename(campo.name)
+
+
+def _abridor(campo):
+    # Se abre una copia por storage para no dejar abierto el FieldFile del modelo
+    return lambda: campo.storage.open(campo.name, 'rb')
+
+
+def _fecha(valor):
+    return timezone.localtime(valor).strftime('%Y-%m-%d %H:%M') if valor else ''
+
+
+def generar(pedidos):
+    """Iterador de bytes del ZIP de los pedidos (ver pedidos_filtrados)"""
+    salida = _Salida()
+    indice = io.StringIO()
+    escritor = csv.writer(indice)
+    escritor.writerow(COLUMNAS_INDICE)
+
+    with zipfile.ZipFile(salida, 'w', compression=zipfile.ZIP_DEFLATED, compresslevel=NIVEL_COMPRESION) as archivo_zip:
+        for pedido, ruta_pdf in pdf_pedidos.obtener_varios(pedidos):
+            codigo = f'PC-{pedido.id_pedido:04d}'
+            carpeta = get_valid_filename(f'{codigo}_{pedido.nombre}')[:80]
+            incluidos, faltantes = 0, []
+
+            for nombre, abrir in _documentos(pedido, ruta_pdf):
+                try:
+                    origen = abrir()
+                except OSError:
+                    faltantes.append(nombre)
+                    continue
+                with origen:
+                    # El tamaño se conoce de antemano: ZIP64 solo si hace falta
+                    zip64 = origen.size * 1.05 > zipfile.ZIP64_LIMIT
+                    with archivo_zip.open(f'{carpeta}/{nombre}', 'w', force_zip64=zip64) as destino:
+                        for bloque in origen.chunks(TAMANO_CHUNK_ARCHIVO):
+                            destino.write(bloque)
+                            if salida.bloques:
+                                yield salida.vaciar()
+                incluidos += 1
+                yield salida.vaciar()
+
+            escritor.writerow([
+                codigo, pedido.nombre, pedido.get_estado_display(),
+                _fecha(pedido.fecha_creacion), _fecha(pedido.fecha_entrega),
+                pedido.total_items, pedido.total_general, pedido.total_cotizaciones,
+                incluidos, '; '.join(faltantes),
+            ])
+
+        archivo_zip.writestr('indice.csv', '\ufeff' + indice.getvalue())
+    yield salida.vaciar()